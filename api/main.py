@@ -9,6 +9,8 @@ from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import ORJSONResponse
 from api.routers import indicators
 from api.routers import sessions
+from api.services import executor
+from api.services import warmup
 
 app = FastAPI(
     title="Trading Indicators API",
@@ -37,11 +39,9 @@ app.include_router(profiler.router)
 
 @app.on_event("startup")
 async def startup_event():
-    """Run pre-warming logic on startup."""
-    print("Pre-warming cache...")
-    from api.services.profiler_service import ProfilerService
-    # Warm up for default ticker NQ1
-    ProfilerService.prewarm_cache("NQ1")
+    """Start background cache pre-warming (does not delay startup)."""
+    print("Pre-warming cache in the background...")
+    warmup.start()
 
 
 @app.get("/")
@@ -53,4 +53,36 @@ async def root():
 async def health():
     return {"status": "healthy"}
 
+
+@app.get("/health/executor")
+async def executor_health():
+    """Worker pool sizes and per-lane queue depth / wait / run times"""
+    return executor.stats()
+
+
+@app.get("/health/ready")
+async def ready():
+    """Per-ticker cache warm-up state; 503 until the warm-up pass has finished"""
+    state = warmup.status()
+    return ORJSONResponse(state, status_code=200 if state["ready"] else 503)
+
+
+@app.get("/health/cache")
+async def cache_health():
+    """Occupancy and hit/miss/eviction counters of the in-process caches"""
+    from api.services import service_cache
+    from api.services.data_loader import bar_store
+    from api.services.payload_cache import payloads
+    return {
+        "services": service_cache.stats(),
+        "bars": bar_store.stats(),
+        "payloads": payloads.stats(),
+    }
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    warmup.stop()
+    executor.shutdown()
+
 # Force Reload Touch
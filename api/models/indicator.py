@@ -2,8 +2,8 @@
 Pydantic models for indicator API requests and responses
 """
 
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, model_validator
+from typing import List, Optional, Dict, Any, Union
 
 
 class OHLCVBar(BaseModel):
@@ -16,10 +16,36 @@ class OHLCVBar(BaseModel):
     volume: Optional[float] = 0
 
 
+class OHLCVColumns(BaseModel):
+    """OHLCV as one list per field - validated per column instead of one model per bar"""
+    time: List[int]  # Unix timestamps
+    open: List[float]
+    high: List[float]
+    low: List[float]
+    close: List[float]
+    volume: Optional[List[float]] = None  # Defaults to 0 for every bar
+
+    @model_validator(mode="after")
+    def check_lengths(self):
+        n = len(self.time)
+        for field in ("open", "high", "low", "close", "volume"):
+            values = getattr(self, field)
+            if values is not None and len(values) != n:
+                raise ValueError(f"'{field}' has {len(values)} values, expected {n} (length of 'time')")
+        return self
+
+
 class IndicatorRequest(BaseModel):
     """Request to calculate indicators from client-provided OHLCV data"""
-    ohlcv: List[OHLCVBar]  # OHLCV data from frontend
+    ohlcv: Union[OHLCVColumns, List[OHLCVBar]]  # OHLCV data from frontend (columns or bars)
     indicators: List[str]  # e.g., ["vwap", "sma_20", "ema_9", "atr_14"]
+    incremental: bool = False  # Keep indicator state and return a handle for /calculate/append
+
+
+class IndicatorAppendRequest(BaseModel):
+    """New bars for an incremental indicator session"""
+    handle: str  # From a /calculate response with incremental=true
+    ohlcv: List[OHLCVBar]  # Only the new bars (a repeated last time replaces that bar)
 
 
 class IndicatorFromFileRequest(BaseModel):
@@ -35,6 +61,7 @@ class IndicatorResponse(BaseModel):
     """Response with calculated indicator values"""
     time: List[int]  # Unix timestamps
     indicators: Dict[str, List[Optional[float]]]  # {"vwap": [...], "sma_20": [...]}
+    handle: Optional[str] = None  # Incremental session handle (incremental requests only)
 
 
 class AvailableIndicator(BaseModel):
@@ -60,7 +87,7 @@ class VWAPSettings(BaseModel):
 
 class IndicatorRequestWithSettings(BaseModel):
     """Request with indicator-specific settings"""
-    ohlcv: List[OHLCVBar]
+    ohlcv: Union[OHLCVColumns, List[OHLCVBar]]
     indicators: List[str]
     vwap_settings: Optional[VWAPSettings] = None
     timeframe: Optional[str] = None  # For auto-hiding VWAP on daily+
@@ -2,10 +2,16 @@
 Indicators API Router
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.exceptions import RequestValidationError
+import numpy as np
 import pandas as pd
+from pydantic import ValidationError
+from typing import Dict, Optional
 from api.models.indicator import (
+    OHLCVColumns,
     IndicatorRequest,
+    IndicatorAppendRequest,
     IndicatorFromFileRequest,
     IndicatorResponse,
     AvailableIndicatorsResponse,
@@ -14,21 +20,130 @@ from api.models.indicator import (
     VWAPSettings,
     VWAPFromFileRequest
 )
+from api.services.columnar import (
+    ARROW_STREAM,
+    FLOAT64_COLUMNS,
+    columnar_response,
+    decode_columns,
+    negotiate_format
+)
 from api.services.data_loader import load_parquet, get_available_data
-from api.services.indicators import calculate_indicators, get_available_indicators
-from api.services.vwap import calculate_vwap_with_settings, should_hide_vwap
+from api.services.executor import run_in_thread
+from api.services.indicators import calculate_indicators_arrays, get_available_indicators
+from api.services.indicator_state import StaleBarError, sessions as indicator_sessions
+from api.services.vwap import calculate_vwap_arrays, should_hide_vwap
 
 
 router = APIRouter()
 
 
-@router.post("/calculate", response_model=IndicatorResponse)
-async def calculate(request: IndicatorRequest):
+def _columns_frame(columns: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """OHLCV DataFrame straight from column arrays (volume defaults to 0)"""
+    missing = [c for c in ('time', 'open', 'high', 'low', 'close') if c not in columns]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Missing OHLCV columns: {', '.join(missing)}")
+    lengths = {len(values) for values in columns.values()}
+    if len(lengths) > 1:
+        raise HTTPException(status_code=400, detail="OHLCV columns must all have the same length")
+    n = len(columns['time'])
+    frame = {'time': np.asarray(columns['time'], dtype=np.int64)}
+    for name in ('open', 'high', 'low', 'close'):
+        frame[name] = np.asarray(columns[name], dtype=np.float64)
+    volume = columns.get('volume')
+    frame['volume'] = np.zeros(n) if volume is None else np.asarray(volume, dtype=np.float64)
+    return pd.DataFrame(frame)
+
+
+def _ohlcv_frame(ohlcv) -> pd.DataFrame:
+    """DataFrame from either request shape (OHLCVColumns or a list of bars)"""
+    if isinstance(ohlcv, OHLCVColumns):
+        return _columns_frame(ohlcv.model_dump(exclude_none=True))
+    return pd.DataFrame([bar.model_dump() for bar in ohlcv])
+
+
+_CALCULATE_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {"schema": {"type": "object", "description": "IndicatorRequest (ohlcv as bars or columns)"}},
+            ARROW_STREAM: {"schema": {"type": "string", "format": "binary"}},
+            FLOAT64_COLUMNS: {"schema": {"type": "string", "format": "binary"}},
+        },
+    }
+}
+
+
+def _calculate_body(
+    body: bytes,
+    content_type: Optional[str],
+    accept: Optional[str],
+    indicators: Optional[str],
+    incremental: bool
+):
+    """/calculate work: decode the body, compute, encode (runs on the thread pool)"""
+    body_type = (content_type or "").split(";")[0].strip().lower()
+    
+    if body_type in (ARROW_STREAM, FLOAT64_COLUMNS):
+        if not indicators:
+            raise HTTPException(status_code=400, detail="'indicators' query parameter is required for binary bodies")
+        try:
+            columns = decode_columns(body_type, body)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        df = _columns_frame(columns)
+        indicator_names = [name.strip() for name in indicators.split(",") if name.strip()]
+    else:
+        # Parse JSON in pydantic-core (no intermediate Python dicts for columns)
+        try:
+            parsed = IndicatorRequest.model_validate_json(body)
+        except ValidationError as e:
+            raise RequestValidationError(
+                [{**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False)]
+            )
+        df = _ohlcv_frame(parsed.ohlcv)
+        indicator_names = parsed.indicators
+        incremental = parsed.incremental
+    
+    if df.empty:
+        raise HTTPException(status_code=400, detail="OHLCV data is required")
+    
+    # Calculate indicators
+    indicator_values = calculate_indicators_arrays(df, indicator_names)
+    
+    extra = None
+    if incremental:
+        extra = {"handle": indicator_sessions.create(indicator_names, df)}
+    
+    return columnar_response(negotiate_format(accept), df['time'].to_numpy(), indicator_values, extra)
+
+
+@router.post("/calculate", response_model=IndicatorResponse, openapi_extra=_CALCULATE_BODY)
+async def calculate(
+    request: Request,
+    accept: Optional[str] = Header(default=None),
+    content_type: Optional[str] = Header(default=None),
+    indicators: Optional[str] = Query(default=None, description="Comma separated, for binary bodies"),
+    incremental: bool = Query(default=False, description="For binary bodies, see below")
+):
     """
     Calculate indicators from client-provided OHLCV data.
     Use this for chart indicator overlays to ensure 100% consistency
     with displayed data.
     
+    Send `Accept: application/vnd.apache.arrow.stream` or
+    `Accept: application/x-float64-columns` for a binary columnar response
+    (see api/services/columnar.py); JSON otherwise.
+    
+    Large windows can skip per-bar validation by sending `ohlcv` as columns
+    ({"time": [...], "open": [...], ..., "volume": [...]}) or by posting the
+    columns as a binary body with Content-Type set to one of the two binary
+    types above; `indicators` (comma separated) and `incremental` then go
+    in the query string.
+    
+    With "incremental": true the response also carries a `handle` (JSON
+    field and X-Handle header) for /calculate/append, so a live chart can
+    send only the new bars afterwards.
+    
     Example request:
     {
         "ohlcv": [
@@ -38,45 +153,52 @@ async def calculate(request: IndicatorRequest):
         "indicators": ["vwap", "sma_20", "ema_9"]
     }
     """
-    if not request.ohlcv:
-        raise HTTPException(status_code=400, detail="OHLCV data is required")
-    
-    # Convert to DataFrame
-    df = pd.DataFrame([bar.model_dump() for bar in request.ohlcv])
-    
-    # Calculate indicators
-    indicator_values = calculate_indicators(df, request.indicators)
-    
-    return IndicatorResponse(
-        time=df['time'].tolist(),
-        indicators=indicator_values
+    body = await request.body()
+    # Parsing, calculation and encoding run on the "indicators" executor lane
+    return await run_in_thread(
+        "indicators", _calculate_body, body, content_type, accept, indicators, incremental
     )
 
 
-@router.post("/calculate-v2", response_model=IndicatorResponse)
-async def calculate_with_settings(request: IndicatorRequestWithSettings):
+@router.post("/calculate/append", response_model=IndicatorResponse)
+async def calculate_append(request: IndicatorAppendRequest, accept: Optional[str] = Header(default=None)):
     """
-    Calculate indicators with custom settings (e.g., VWAP anchor period).
+    Feed new bars into an incremental session started by /calculate
+    ("incremental": true) and return indicator values for those bars only.
+    
+    A bar with the same time as the previous last bar replaces it (forming
+    bar updates). Unknown/expired handles return 404 and older bars 409 -
+    the client should start over with /calculate.
     
     Example request:
     {
-        "ohlcv": [...],
-        "indicators": ["vwap", "sma_20"],
-        "timeframe": "5m",
-        "vwap_settings": {
-            "anchor": "session",
-            "anchor_time": "09:30",
-            "anchor_timezone": "America/New_York",
-            "bands": [1.0, 2.0],
-            "source": "hlc3"
-        }
+        "handle": "3f2b...",
+        "ohlcv": [{"time": 1733184060, "open": 6005, "high": 6007, "low": 6001, "close": 6006, "volume": 120}]
     }
     """
+    session = indicator_sessions.get(request.handle)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired indicator handle")
+    
     if not request.ohlcv:
-        raise HTTPException(status_code=400, detail="OHLCV data is required")
+        return columnar_response(negotiate_format(accept), np.empty(0, dtype=np.int64), {})
     
-    # Convert to DataFrame
     df = pd.DataFrame([bar.model_dump() for bar in request.ohlcv])
+    try:
+        indicator_values = session.append(df)
+    except StaleBarError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    return columnar_response(negotiate_format(accept), df['time'].to_numpy(), indicator_values)
+
+
+def _calculate_with_settings(request: IndicatorRequestWithSettings, accept: Optional[str]):
+    """/calculate-v2 work (runs on the thread pool)"""
+    # Convert to DataFrame
+    df = _ohlcv_frame(request.ohlcv)
+    
+    if df.empty:
+        raise HTTPException(status_code=400, detail="OHLCV data is required")
     
     all_indicators = {}
     non_vwap_indicators = []
@@ -89,7 +211,7 @@ async def calculate_with_settings(request: IndicatorRequestWithSettings):
             
             # Use VWAP settings if provided
             settings = request.vwap_settings or VWAPSettings()
-            vwap_result = calculate_vwap_with_settings(
+            vwap_result = calculate_vwap_arrays(
                 df,
                 anchor=settings.anchor,
                 anchor_time=settings.anchor_time,
@@ -103,30 +225,44 @@ async def calculate_with_settings(request: IndicatorRequestWithSettings):
     
     # Calculate non-VWAP indicators
     if non_vwap_indicators:
-        other_indicators = calculate_indicators(df, non_vwap_indicators)
+        other_indicators = calculate_indicators_arrays(df, non_vwap_indicators)
         all_indicators.update(other_indicators)
     
-    return IndicatorResponse(
-        time=df['time'].tolist(),
-        indicators=all_indicators
-    )
+    return columnar_response(negotiate_format(accept), df['time'].to_numpy(), all_indicators)
 
 
-@router.post("/calculate-from-file", response_model=IndicatorResponse)
-async def calculate_from_file(request: IndicatorFromFileRequest):
+@router.post("/calculate-v2", response_model=IndicatorResponse)
+async def calculate_with_settings(request: IndicatorRequestWithSettings, accept: Optional[str] = Header(default=None)):
     """
-    Calculate indicators from stored data files.
-    Use this for backtesting where full historical data is needed.
+    Calculate indicators with custom settings (e.g., VWAP anchor period).
+    Supports the same binary Accept types as /calculate.
     
     Example request:
     {
-        "ticker": "ES1",
+        "ohlcv": [...],
+        "indicators": ["vwap", "sma_20"],
         "timeframe": "5m",
-        "indicators": ["vwap", "sma_20"]
+        "vwap_settings": {
+            "anchor": "session",
+            "anchor_time": "09:30",
+            "anchor_timezone": "America/New_York",
+            "bands": [1.0, 2.0],
+            "source": "hlc3"
+        }
     }
     """
-    # Load data from file
-    df = load_parquet(request.ticker, request.timeframe)
+    return await run_in_thread("indicators", _calculate_with_settings, request, accept)
+
+
+def _calculate_from_file(request: IndicatorFromFileRequest, accept: Optional[str]):
+    """/calculate-from-file work (runs on the thread pool)"""
+    # Load data from file (time range is pushed down into the Parquet read)
+    df = load_parquet(
+        request.ticker,
+        request.timeframe,
+        start_time=request.start_time,
+        end_time=request.end_time
+    )
     
     if df is None:
         raise HTTPException(
@@ -134,12 +270,6 @@ async def calculate_from_file(request: IndicatorFromFileRequest):
             detail=f"Data not found for {request.ticker} {request.timeframe}"
         )
     
-    # Filter by time range if specified
-    if request.start_time:
-        df = df[df['time'] >= request.start_time]
-    if request.end_time:
-        df = df[df['time'] <= request.end_time]
-    
     if df.empty:
         raise HTTPException(
             status_code=404,
@@ -147,11 +277,28 @@ async def calculate_from_file(request: IndicatorFromFileRequest):
         )
     
     # Calculate indicators
-    indicator_values = calculate_indicators(df, request.indicators)
+    indicator_values = calculate_indicators_arrays(df, request.indicators)
     
-    return IndicatorResponse(
-        time=df['time'].tolist(),
-        indicators=indicator_values
+    return columnar_response(negotiate_format(accept), df['time'].to_numpy(), indicator_values)
+
+
+@router.post("/calculate-from-file", response_model=IndicatorResponse)
+async def calculate_from_file(request: IndicatorFromFileRequest, accept: Optional[str] = Header(default=None)):
+    """
+    Calculate indicators from stored data files.
+    Use this for backtesting where full historical data is needed.
+    Supports the same binary Accept types as /calculate.
+    
+    Example request:
+    {
+        "ticker": "ES1",
+        "timeframe": "5m",
+        "indicators": ["vwap", "sma_20"]
+    }
+    """
+    return await run_in_thread(
+        "indicators", _calculate_from_file, request, accept,
+        flight_key=("calculate_from_file", request.model_dump_json(), negotiate_format(accept))
     )
 
 
@@ -172,19 +319,15 @@ async def list_data():
     return {"data": get_available_data()}
 
 
-@router.post("/vwap-from-file", response_model=IndicatorResponse)
-async def calculate_vwap_from_file(request: VWAPFromFileRequest):
-    """
-    Get VWAP from backend data files.
-    
-    Uses pre-computed VWAP when available (instant ~10ms response),
-    falls back to on-demand calculation for custom settings.
-    """
+def _vwap_from_file(request: VWAPFromFileRequest, accept: Optional[str]):
+    """/vwap-from-file work (runs on the thread pool)"""
     from api.services.vwap_loader import get_vwap
     
+    media_type = negotiate_format(accept)
+    
     # Check if should hide on this timeframe
     if should_hide_vwap(request.timeframe):
-        return IndicatorResponse(time=[], indicators={})
+        return columnar_response(media_type, np.empty(0, dtype=np.int64), {})
     
     # Convert settings to dict for loader
     settings = {}
@@ -203,7 +346,8 @@ async def calculate_vwap_from_file(request: VWAPFromFileRequest):
         request.timeframe,
         settings,
         start_time=request.start_time,
-        end_time=request.end_time
+        end_time=request.end_time,
+        as_arrays=True
     )
     
     if result is None:
@@ -212,9 +356,21 @@ async def calculate_vwap_from_file(request: VWAPFromFileRequest):
             detail=f"Data not found for {request.ticker} {request.timeframe}"
         )
     
-    return IndicatorResponse(
-        time=result['time'],
-        indicators=result['indicators']
+    return columnar_response(media_type, result['time'], result['indicators'])
+
+
+@router.post("/vwap-from-file", response_model=IndicatorResponse)
+async def calculate_vwap_from_file(request: VWAPFromFileRequest, accept: Optional[str] = Header(default=None)):
+    """
+    Get VWAP from backend data files.
+    
+    Uses pre-computed VWAP when available (instant ~10ms response),
+    falls back to on-demand calculation for custom settings.
+    Supports the same binary Accept types as /calculate.
+    """
+    return await run_in_thread(
+        "indicators", _vwap_from_file, request, accept,
+        flight_key=("vwap_from_file", request.model_dump_json(), negotiate_format(accept))
     )
 
 
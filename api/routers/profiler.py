@@ -1,12 +1,34 @@
 
-from fastapi import APIRouter, HTTPException, Query, Body
+from fastapi import APIRouter, HTTPException, Query, Body, Request, Response
 from api.services.profiler_service import ProfilerService
 from api.services.data_loader import DATA_DIR
+from api.services.executor import run_in_thread
+from api.services import http_cache, warmup
+from api.services.payload_cache import payloads, respond
+from functools import partial
 import json
 
 router = APIRouter()
 
 
+def _read_json(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def _service_data(method, ticker: str):
+    """ProfilerService file-backed result, 404 on its error dict (not cached)"""
+    result = method(ticker)
+    if "error" in result:
+        raise HTTPException(status_code=404, detail=result["error"])
+    return result
+
+
+def _flight_key(method: str, ticker: str, *params) -> str:
+    """Single-flight key: identical concurrent requests share one computation"""
+    return json.dumps([method, ProfilerService._normalize_ticker(ticker), *params], sort_keys=True, default=str)
+
+
 @router.get("/stats/profiler/{ticker}", tags=["Stats"])
 async def get_profiler_stats(ticker: str, days: int = Query(50)):
     """
@@ -14,7 +36,10 @@ async def get_profiler_stats(ticker: str, days: int = Query(50)):
     PRIORITY 1: Pre-computed JSON
     PRIORITY 2: Calculate from Parquet (Cached)
     """
-    result = ProfilerService.analyze_profiler_stats(ticker, days=days)
+    result = await run_in_thread(
+        "profiler", ProfilerService.analyze_profiler_stats, ticker, days=days,
+        flight_key=_flight_key("analyze_profiler_stats", ticker, days)
+    )
     if "error" in result:
         raise HTTPException(status_code=404, detail=result["error"])
     return result
@@ -42,8 +67,10 @@ async def get_profiler_filtered_stats(
     broken_filters = payload.get("broken_filters", {})
     intra_state = payload.get("intra_state", "Any")
     
-    result = ProfilerService.get_filtered_stats(
-        ticker, target_session, filters, broken_filters, intra_state
+    result = await run_in_thread(
+        "profiler", ProfilerService.get_filtered_stats,
+        ticker, target_session, filters, broken_filters, intra_state,
+        flight_key=_flight_key("get_filtered_stats", ticker, target_session, filters, broken_filters, intra_state)
     )
     
     if "error" in result:
@@ -62,7 +89,8 @@ async def get_profiler_filtered_price_model(
         "target_session": str (e.g. "Daily", "NY1"),
         "filters": { "Asia": "Short True", ... },
         "broken_filters": { "Asia": "Broken", ... },
-        "intra_state": "Any"
+        "intra_state": "Any",
+        "bucket_minutes": 1
     }
     Returns: median path, extreme path, count
     """
@@ -70,9 +98,14 @@ async def get_profiler_filtered_price_model(
     filters = payload.get("filters", {})
     broken_filters = payload.get("broken_filters", {})
     intra_state = payload.get("intra_state", "Any")
+    bucket_minutes = int(payload.get("bucket_minutes", 1))
     
-    result = ProfilerService.get_filtered_price_model(
-        ticker, target_session, filters, broken_filters, intra_state
+    result = await run_in_thread(
+        "profiler", ProfilerService.get_filtered_price_model,
+        ticker, target_session, filters, broken_filters, intra_state, bucket_minutes,
+        flight_key=_flight_key(
+            "get_filtered_price_model", ticker, target_session, filters, broken_filters, intra_state, bucket_minutes
+        )
     )
     
     if "error" in result:
@@ -80,7 +113,7 @@ async def get_profiler_filtered_price_model(
     return result
 
 @router.get("/stats/hod-lod/{ticker}", tags=["Stats"])
-async def get_hod_lod_stats(ticker: str):
+async def get_hod_lod_stats(ticker: str, request: Request, response: Response):
     """
     Get pre-computed HOD/LOD time statistics.
     """
@@ -90,26 +123,40 @@ async def get_hod_lod_stats(ticker: str):
     if not json_path.exists():
         raise HTTPException(status_code=404, detail=f"HOD/LOD data for {ticker} not found. Run precompute script.")
     
-    with open(json_path, 'r') as f:
-        data = json.load(f)
+    not_modified = http_cache.conditional(request, response, [json_path])
+    if not_modified:
+        return not_modified
     
-    return data
+    payload = await run_in_thread(
+        "profiler", payloads.get_or_build, ("hod-lod", ticker), [json_path], partial(_read_json, json_path),
+        flight_key=_flight_key("hod-lod", ticker)
+    )
+    
+    return respond(request, payload, response.headers)
 
 @router.get("/stats/profiler/{ticker}/levels", tags=["Stats"])
-async def get_profiler_level_stats(ticker: str):
+async def get_profiler_level_stats(ticker: str, request: Request, response: Response):
     """
     Get pre-computed daily level hit probability stats (Hit Rate, Median Time, Mode).
     Returns nested dict by Context (All, Green, Red).
     """
-    result = ProfilerService.get_level_stats(ticker)
+    ticker = ProfilerService._normalize_ticker(ticker)
+    json_path = DATA_DIR / f"{ticker}_level_stats.json"
+    if json_path.exists():
+        not_modified = http_cache.conditional(request, response, [json_path])
+        if not_modified:
+            return not_modified
     
-    if "error" in result:
-        raise HTTPException(status_code=404, detail=result["error"])
-        
-    return result
+    payload = await run_in_thread(
+        "profiler", payloads.get_or_build, ("levels", ticker), [json_path],
+        partial(_service_data, ProfilerService.get_level_stats, ticker),
+        flight_key=_flight_key("get_level_stats", ticker)
+    )
+    
+    return respond(request, payload, response.headers)
 
 @router.get("/stats/range-dist/{ticker}", tags=["Stats"])
-async def get_range_distribution(ticker: str):
+async def get_range_distribution(ticker: str, request: Request, response: Response):
     """
     Get pre-computed price range distribution (high/low relative to open).
     """
@@ -119,10 +166,16 @@ async def get_range_distribution(ticker: str):
     if not json_path.exists():
         raise HTTPException(status_code=404, detail=f"Range distribution for {ticker} not found. Run precompute script.")
     
-    with open(json_path, 'r') as f:
-        data = json.load(f)
+    not_modified = http_cache.conditional(request, response, [json_path])
+    if not_modified:
+        return not_modified
+    
+    payload = await run_in_thread(
+        "profiler", payloads.get_or_build, ("range-dist", ticker), [json_path], partial(_read_json, json_path),
+        flight_key=_flight_key("range-dist", ticker)
+    )
     
-    return data
+    return respond(request, payload, response.headers)
 
 @router.post("/stats/clear-cache/{ticker}", tags=["Stats"])
 async def clear_profiler_cache(ticker: str = "NQ1"):
@@ -131,42 +184,64 @@ async def clear_profiler_cache(ticker: str = "NQ1"):
     This forces the server to reload from the JSON file on next request.
     """
     from api.services.profiler_service import ProfilerService
-    return ProfilerService.clear_cache(ticker)
+    payloads.clear()
+    result = await run_in_thread("profiler", ProfilerService.clear_cache, ticker)
+    warmup.schedule(ticker)
+    return result
 
 @router.post("/stats/clear-cache", tags=["Stats"])
 async def clear_all_profiler_cache():
     """Clear all in-memory cache."""
     from api.services.profiler_service import ProfilerService
-    return ProfilerService.clear_cache()
+    payloads.clear()
+    result = await run_in_thread("profiler", ProfilerService.clear_cache)
+    warmup.schedule()
+    return result
 
 @router.get("/stats/daily-hod-lod/{ticker}", tags=["Stats"])
-async def get_daily_hod_lod(ticker: str):
+async def get_daily_hod_lod(ticker: str, request: Request, response: Response):
     """
     Get pre-computed true daily HOD/LOD times (from 1-minute data).
     Returns dict mapping date -> {hod_time, lod_time, hod_price, lod_price, ...}
     """
-    data = ProfilerService.get_daily_hod_lod(ticker)
+    ticker = ProfilerService._normalize_ticker(ticker)
+    json_path = DATA_DIR / f"{ticker}_daily_hod_lod.json"
+    if json_path.exists():
+        not_modified = http_cache.conditional(request, response, [json_path])
+        if not_modified:
+            return not_modified
+    
+    payload = await run_in_thread(
+        "profiler", payloads.get_or_build, ("daily-hod-lod", ticker), [json_path],
+        partial(_service_data, ProfilerService.get_daily_hod_lod, ticker),
+        flight_key=_flight_key("get_daily_hod_lod", ticker)
+    )
     
-    if "error" in data:
-        raise HTTPException(status_code=404, detail=data["error"])
-        
-    return data
+    return respond(request, payload, response.headers)
 
 @router.get("/stats/level-touches/{ticker}", tags=["Stats"])
-async def get_level_touches(ticker: str):
+async def get_level_touches(ticker: str, request: Request, response: Response):
     """
     Get pre-computed reference level touch data (PDH/PDL/PDM, P12 H/L/M).
     Returns dict mapping date -> {pdh: {level, touched, touch_time}, ...}
     """
-    data = ProfilerService.get_level_touches(ticker)
+    ticker = ProfilerService._normalize_ticker(ticker)
+    json_path = DATA_DIR / f"{ticker}_level_touches.json"
+    if json_path.exists():
+        not_modified = http_cache.conditional(request, response, [json_path])
+        if not_modified:
+            return not_modified
     
-    if "error" in data:
-        raise HTTPException(status_code=404, detail=data["error"])
-        
-    return data
+    payload = await run_in_thread(
+        "profiler", payloads.get_or_build, ("level-touches", ticker), [json_path],
+        partial(_service_data, ProfilerService.get_level_touches, ticker),
+        flight_key=_flight_key("get_level_touches", ticker)
+    )
+    
+    return respond(request, payload, response.headers)
 
 @router.get("/stats/reference", tags=["Stats"])
-async def get_reference_stats():
+async def get_reference_stats(request: Request, response: Response):
     """
     Get Reference Data (aggregated stats and medians) from docs folder.
     """
@@ -176,17 +251,23 @@ async def get_reference_stats():
     
     if not ref_all_path.exists() or not ref_med_path.exists():
         raise HTTPException(status_code=404, detail="Reference data not found in docs/ directory.")
-        
-    with open(ref_all_path, 'r') as f:
-        ref_all = json.load(f)
-        
-    with open(ref_med_path, 'r') as f:
-        ref_med = json.load(f)
-        
-    return {
-        "stats": ref_all,
-        "median": ref_med
-    }
+    
+    not_modified = http_cache.conditional(request, response, [ref_all_path, ref_med_path])
+    if not_modified:
+        return not_modified
+    
+    def build():
+        return {
+            "stats": _read_json(ref_all_path),
+            "median": _read_json(ref_med_path)
+        }
+    
+    payload = await run_in_thread(
+        "profiler", payloads.get_or_build, ("reference",), [ref_all_path, ref_med_path], build,
+        flight_key=_flight_key("reference", "")
+    )
+    
+    return respond(request, payload, response.headers)
 
 @router.get("/stats/price-model/{ticker}", tags=["Stats"])
 async def get_price_model(
@@ -199,7 +280,10 @@ async def get_price_model(
     Get Price Model (Composite High/Low) for a specific outcome.
     Returns Average and Extreme models.
     """
-    result = ProfilerService.get_price_model_data(ticker, session, outcome, days)
+    result = await run_in_thread(
+        "profiler", ProfilerService.get_price_model_data, ticker, session, outcome, days,
+        flight_key=_flight_key("get_price_model_data", ticker, session, outcome, days)
+    )
     if "error" in result:
         raise HTTPException(status_code=404, detail=result["error"])
     return result
@@ -231,8 +315,10 @@ async def get_filtered_profiler_stats(
     broken_filters = payload.get("broken_filters", {})
     intra_state = payload.get("intra_state", "Any")
     
-    result = ProfilerService.get_filtered_stats(
-        ticker, target_session, filters, broken_filters, intra_state
+    result = await run_in_thread(
+        "profiler", ProfilerService.get_filtered_stats,
+        ticker, target_session, filters, broken_filters, intra_state,
+        flight_key=_flight_key("get_filtered_stats", ticker, target_session, filters, broken_filters, intra_state)
     )
     
     if "error" in result:
@@ -262,8 +348,10 @@ async def get_filtered_price_model(
     intra_state = payload.get("intra_state", "Any")
     bucket_minutes = payload.get("bucket_minutes", 1)
     
-    result = ProfilerService.get_filtered_price_model(
-        ticker, target_session, filters, broken_filters, intra_state, bucket_minutes
+    result = await run_in_thread(
+        "profiler", ProfilerService.get_filtered_price_model,
+        ticker, target_session, filters, broken_filters, intra_state, bucket_minutes,
+        flight_key=_flight_key("get_filtered_price_model", ticker, target_session, filters, broken_filters, intra_state, bucket_minutes)
     )
     
     if "error" in result:
@@ -1,14 +1,18 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from typing import List, Optional
 import pandas as pd
 import math
 from api.services.data_loader import load_parquet
+from api.services import http_cache
+from api.services.executor import run_in_thread
 from api.services.session_service import SessionService
 from api.services.session_loader import (
     load_precomputed_hourly, 
     load_precomputed_daily,
     has_precomputed_hourly,
     has_precomputed_daily,
+    precomputed_hourly_path,
+    precomputed_daily_path,
     sanitize_for_json
 )
 
@@ -47,8 +51,38 @@ def filter_sessions_by_time(sessions: list, start_ts: Optional[int], end_ts: Opt
     return filtered
 
 
+def _load_eastern(ticker: str, start_ts: Optional[int], end_ts: Optional[int]) -> pd.DataFrame:
+    """1m bars indexed by US/Eastern datetime for the on-demand calculations"""
+    # Time filter is pushed down into the Parquet read
+    df = load_parquet(ticker, "1m", start_time=start_ts or None, end_time=end_ts or None)
+    if df is None or (df.empty and not (start_ts or end_ts)):
+        raise HTTPException(status_code=404, detail=f"No data found for {ticker}")
+    
+    if df.empty:
+        return df
+    
+    # Prepare DataFrame for Service
+    df['datetime'] = pd.to_datetime(df['time'], unit='s', utc=True)
+    df = df.set_index('datetime')
+    df.index = df.index.tz_convert('US/Eastern')
+    return df
+
+
+def _calculate(range_type: str, df: pd.DataFrame, *args) -> list:
+    """SessionService calculation + JSON sanitizing (runs on the thread pool)"""
+    if range_type == "hourly":
+        sessions = SessionService.calculate_hourly(df)
+    elif range_type == "all":
+        sessions = SessionService.calculate_sessions(df, *args)
+    else:
+        sessions = SessionService.calculate_opening_range(df, *args)
+    return sanitize_for_json(sessions)
+
+
 @router.get("/{ticker}")
 async def get_sessions(
+    request: Request,
+    response: Response,
     ticker: str, 
     range_type: str = Query("opening", description="Type of range: opening, custom, hourly"),
     start_time: str = Query("09:30", description="Start time (HH:MM)"),
@@ -59,9 +93,15 @@ async def get_sessions(
     """
     Get session ranges for a ticker.
     
-    Uses pre-computed data when available (~10ms), falls back to on-demand calculation (~2-9s).
+    Uses pre-computed data when available (~10ms), falls back to on-demand calculation (~0.2s for a full 1m history).
     
     Time filtering: Use start_ts/end_ts to limit results to a time range.
+    
+    Loading and the (vectorized) session calculations run on the thread pool
+    ("sessions" executor lane), so the event loop stays free and the bars are
+    not pickled into a worker process.
+    Concurrent identical requests share one load/calculation (single-flight).
+    Pre-computed responses carry ETag/Last-Modified validators (304 when unchanged).
     """
     clean_ticker = ticker.replace("!", "")
     
@@ -70,87 +110,74 @@ async def get_sessions(
     # =========================================================================
     if range_type == "hourly":
         if has_precomputed_hourly(ticker):
-            sessions = load_precomputed_hourly(ticker, start_ts, end_ts)
+            sessions = await run_in_thread(
+                "sessions", load_precomputed_hourly, ticker, start_ts, end_ts,
+                flight_key=("precomputed_hourly", clean_ticker, start_ts, end_ts)
+            )
             if sessions is not None:
+                # Validators only describe the precomputed file, not the fallback below
+                not_modified = http_cache.conditional(request, response, [precomputed_hourly_path(ticker)], start_ts, end_ts)
+                if not_modified:
+                    return not_modified
                 return sessions
         
         # Fall back to on-demand calculation
-        df = load_parquet(ticker, "1m")
-        if df is None or df.empty:
-            raise HTTPException(status_code=404, detail=f"No data found for {ticker}")
-        
-        # Apply time filter to source data
-        if start_ts:
-            df = df[df['time'] >= start_ts]
-        if end_ts:
-            df = df[df['time'] <= end_ts]
-        
+        df = await run_in_thread(
+            "sessions", _load_eastern, ticker, start_ts, end_ts,
+            flight_key=("load", clean_ticker, start_ts, end_ts)
+        )
         if df.empty:
             return []
         
-        # Prepare DataFrame for Service
-        df['datetime'] = pd.to_datetime(df['time'], unit='s', utc=True)
-        df = df.set_index('datetime')
-        df.index = df.index.tz_convert('US/Eastern')
-        
-        sessions = SessionService.calculate_hourly(df)
-        return sanitize_for_json(sessions)
+        return await run_in_thread(
+            "sessions", _calculate, "hourly", df,
+            flight_key=("hourly", clean_ticker, start_ts, end_ts)
+        )
     
     # =========================================================================
     # DAILY (ALL): Try pre-computed first
     # =========================================================================
     if range_type == "all":
         if has_precomputed_daily(ticker):
-            sessions = load_precomputed_daily(ticker, start_ts, end_ts)
+            sessions = await run_in_thread(
+                "sessions", load_precomputed_daily, ticker, start_ts, end_ts,
+                flight_key=("precomputed_daily", clean_ticker, start_ts, end_ts)
+            )
             if sessions is not None:
+                # Validators only describe the precomputed file, not the fallback below
+                not_modified = http_cache.conditional(request, response, [precomputed_daily_path(ticker)], start_ts, end_ts)
+                if not_modified:
+                    return not_modified
                 return sessions
         
         # Fall back to on-demand calculation
-        df = load_parquet(ticker, "1m")
-        if df is None or df.empty:
-            raise HTTPException(status_code=404, detail=f"No data found for {ticker}")
-        
-        # Apply time filter to source data
-        if start_ts:
-            df = df[df['time'] >= start_ts]
-        if end_ts:
-            df = df[df['time'] <= end_ts]
-        
+        df = await run_in_thread(
+            "sessions", _load_eastern, ticker, start_ts, end_ts,
+            flight_key=("load", clean_ticker, start_ts, end_ts)
+        )
         if df.empty:
             return []
         
-        # Prepare DataFrame for Service
-        df['datetime'] = pd.to_datetime(df['time'], unit='s', utc=True)
-        df = df.set_index('datetime')
-        df.index = df.index.tz_convert('US/Eastern')
-        
-        sessions = SessionService.calculate_sessions(df, clean_ticker)
-        return sanitize_for_json(sessions)
+        return await run_in_thread(
+            "sessions", _calculate, "all", df, clean_ticker,
+            flight_key=("all", clean_ticker, start_ts, end_ts)
+        )
     
     # =========================================================================
     # OPENING RANGE: Always calculate on-demand (small dataset)
     # =========================================================================
     if range_type == "opening":
-        df = load_parquet(ticker, "1m")
-        if df is None or df.empty:
-            raise HTTPException(status_code=404, detail=f"No data found for {ticker}")
-        
-        # Apply time filter
-        if start_ts:
-            df = df[df['time'] >= start_ts]
-        if end_ts:
-            df = df[df['time'] <= end_ts]
-        
+        df = await run_in_thread(
+            "sessions", _load_eastern, ticker, start_ts, end_ts,
+            flight_key=("load", clean_ticker, start_ts, end_ts)
+        )
         if df.empty:
             return []
         
-        # Prepare DataFrame
-        df['datetime'] = pd.to_datetime(df['time'], unit='s', utc=True)
-        df = df.set_index('datetime')
-        df.index = df.index.tz_convert('US/Eastern')
-        
-        sessions = SessionService.calculate_opening_range(df, start_time, duration)
-        return sanitize_for_json(sessions)
+        return await run_in_thread(
+            "sessions", _calculate, "opening", df, start_time, duration,
+            flight_key=("opening", clean_ticker, start_ts, end_ts, start_time, duration)
+        )
     
     return []
 
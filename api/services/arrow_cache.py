@@ -0,0 +1,107 @@
+"""
+Arrow Cache - on-disk, memory-mapped copies of normalized OHLCV frames
+
+The first worker that decodes a Parquet file writes the normalized frame
+(time in seconds, sorted) to data/cache/arrow/{ticker}_{tf}.arrow as an
+uncompressed Arrow IPC file. Every worker then memory-maps that file, so the
+column data lives once in the OS page cache instead of once per uvicorn
+worker, and a cold worker skips the Parquet decode entirely.
+
+- Frames built from the mapping are zero-copy and READ-ONLY: add/replace
+  columns freely, but do not write into existing arrays in place
+- Each file carries the source fingerprint in its schema metadata and is
+  ignored (and later rewritten) once the Parquet source changes
+- Writes go to a temp file + os.replace, so concurrent workers racing to
+  build the same entry never expose a partial file
+
+Set ARROW_CACHE=0 to disable; ARROW_CACHE_DIR overrides the location.
+"""
+
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Any, Optional
+
+import pandas as pd
+import pyarrow as pa
+
+
+DATA_DIR = Path(__file__).parent.parent.parent / "data"
+CACHE_DIR = Path(os.environ.get("ARROW_CACHE_DIR", DATA_DIR / "cache" / "arrow"))
+ENABLED = os.environ.get("ARROW_CACHE", "1").lower() not in ("0", "false", "no")
+
+_FINGERPRINT_KEY = b"source_fingerprint"
+
+
+def _entry_path(name: str) -> Path:
+    return CACHE_DIR / f"{name}.arrow"
+
+
+def _encode_fingerprint(fingerprint: Any) -> bytes:
+    return json.dumps(fingerprint, default=list).encode()
+
+
+def load_frame(name: str, fingerprint: Any) -> Optional[pd.DataFrame]:
+    """
+    Memory-map a cached frame if it exists and matches the fingerprint.
+    Returns None on a miss (missing, stale or unreadable entry).
+    """
+    if not ENABLED:
+        return None
+    path = _entry_path(name)
+    if not path.exists():
+        return None
+    try:
+        source = pa.memory_map(str(path), "r")
+        reader = pa.ipc.open_file(source)
+        metadata = reader.schema.metadata or {}
+        if metadata.get(_FINGERPRINT_KEY) != _encode_fingerprint(fingerprint):
+            return None
+        table = reader.read_all()
+        # split_blocks keeps one block per column so numeric columns stay
+        # views of the mapping instead of being consolidated into a copy
+        return table.to_pandas(split_blocks=True)
+    except Exception as e:
+        print(f"[ArrowCache] Failed to map {path.name}: {e}")
+        return None
+
+
+def store_frame(name: str, fingerprint: Any, df: pd.DataFrame) -> Optional[pd.DataFrame]:
+    """
+    Write a frame to the cache and return the memory-mapped copy of it
+    (None if caching is disabled or the write failed).
+    """
+    if not ENABLED:
+        return None
+    path = _entry_path(name)
+    tmp_path = path.parent / f".{path.name}.{uuid.uuid4().hex}.tmp"
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[_FINGERPRINT_KEY] = _encode_fingerprint(fingerprint)
+        table = table.replace_schema_metadata(metadata)
+        with pa.OSFile(str(tmp_path), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"[ArrowCache] Failed to write {path.name}: {e}")
+        return None
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return load_frame(name, fingerprint)
+
+
+def clear(name: Optional[str] = None) -> None:
+    """Delete one cached entry, or all of them when name is None"""
+    if not CACHE_DIR.exists():
+        return
+    paths = [_entry_path(name)] if name else list(CACHE_DIR.glob("*.arrow"))
+    for path in paths:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,118 @@
+"""
+Bar Store - In-process cache of decoded OHLCV frames
+
+Holds the normalized, time-sorted DataFrames produced by the data loader,
+keyed by (ticker, timeframe), so repeated requests skip the Parquet decode,
+column renaming, timestamp conversion and sort.
+
+- Memory bounded: least-recently-used entries are evicted once the total
+  size exceeds the byte budget (BAR_STORE_MAX_MB, default 2048 MB)
+- Self invalidating: each entry remembers the mtime/size fingerprint of its
+  source files and is dropped as soon as any of them change on disk
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import pandas as pd
+
+from .parquet_store import dataset_fingerprint
+
+
+DEFAULT_MAX_BYTES = int(float(os.environ.get("BAR_STORE_MAX_MB", "2048")) * 1024 * 1024)
+
+
+def file_fingerprint(*paths: Optional[Path]) -> Tuple:
+    """
+    Build a cheap change-detection fingerprint for one or more files.
+    Missing files (or None) contribute None, so a file appearing or
+    disappearing also changes the fingerprint.
+    """
+    parts = []
+    for path in paths:
+        if path is None:
+            parts.append(None)
+            continue
+        # Handles both single files and partitioned dataset directories
+        parts.append(dataset_fingerprint(path))
+    return tuple(parts)
+
+
+def frame_nbytes(df: pd.DataFrame) -> int:
+    """Shallow memory footprint of a DataFrame (numeric columns + index)"""
+    return int(df.memory_usage(index=True, deep=False).sum())
+
+
+class BarStore:
+    """Thread-safe LRU of DataFrames with a byte budget and fingerprint checks"""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[Any, pd.DataFrame, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, fingerprint: Any) -> Optional[pd.DataFrame]:
+        """Return the cached frame if present and its fingerprint still matches"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            cached_fp, df, nbytes = entry
+            if cached_fp != fingerprint:
+                # Source file changed on disk - drop the stale frame
+                del self._entries[key]
+                self._bytes -= nbytes
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return df
+
+    def put(self, key: Hashable, fingerprint: Any, df: pd.DataFrame) -> None:
+        """Insert a frame, evicting least-recently-used entries to fit the budget"""
+        nbytes = frame_nbytes(df)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            if nbytes > self.max_bytes:
+                # Never cache a single frame larger than the whole budget
+                return
+            self._entries[key] = (fingerprint, df, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes and self._entries:
+                _, (_, _, evicted_bytes) = self._entries.popitem(last=False)
+                self._bytes -= evicted_bytes
+                self.evictions += 1
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop one entry, or everything when key is None"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[2]
+
+    def stats(self) -> Dict[str, Any]:
+        """Occupancy and hit/miss counters"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "keys": [list(k) if isinstance(k, tuple) else k for k in self._entries.keys()],
+            }
@@ -0,0 +1,251 @@
+"""
+Columnar response encoding for indicator/bar endpoints
+
+Shared serialization layer for endpoints that return
+`{time: [...], indicators: {name: [...]}}`. Series stay numpy arrays until
+the final encode, so no per-element Python work happens on the way out:
+
+- JSON (default): orjson serializes the arrays natively and writes NaN/inf
+  as null, which is what the chart expects for "no value".
+
+Clients can also ask for binary columns the chart can wrap without
+parsing, selected through the Accept header:
+
+- application/vnd.apache.arrow.stream
+    Arrow IPC stream with one record batch: 'time' (int64) followed by one
+    float64 column per series. NaN values are sent as nulls.
+
+- application/x-float64-columns
+    Packed little-endian buffers (every buffer 8-byte aligned, so
+    `new Float64Array(body, offset, length)` works directly):
+
+        bytes 0-3   magic b"F64C"
+        bytes 4-7   uint32 format version (1)
+        bytes 8-11  uint32 header length H
+        bytes 12..  H bytes of UTF-8 JSON header, zero padded to 8 bytes
+        buffers
+
+    Header: {"length": n, "columns": [{"name", "type": "int64"|"float64",
+    "offset", "validity"}]}. Offsets are from the start of the body.
+    'validity' is the offset of an LSB-first bitmap (1 = value present),
+    or null when the column has no missing values; missing slots hold NaN.
+
+Anything else (including no Accept header) gets JSON.
+
+The same two binary layouts are accepted as request bodies (Content-Type)
+by endpoints that take OHLCV input; decode_columns turns them back into
+numpy arrays without building per-bar objects.
+"""
+
+import json
+import struct
+from typing import Dict, List, Optional
+
+import numpy as np
+import orjson
+import pyarrow as pa
+from fastapi.responses import Response
+
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+FLOAT64_COLUMNS = "application/x-float64-columns"
+
+_MAGIC = b"F64C"
+_VERSION = 1
+
+
+def negotiate_format(accept: Optional[str]) -> Optional[str]:
+    """
+    Pick a binary media type from an Accept header.
+    Returns None for JSON (the default). Quality values are honoured;
+    on a tie the order in the header wins.
+    """
+    if not accept:
+        return None
+    best, best_q = None, 0.0
+    for part in accept.split(","):
+        fields = [f.strip() for f in part.split(";")]
+        media_type = fields[0].lower()
+        q = 1.0
+        for param in fields[1:]:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if media_type == "application/json" and q > best_q:
+            best, best_q = None, q
+        elif media_type in (ARROW_STREAM, FLOAT64_COLUMNS) and q > best_q:
+            best, best_q = media_type, q
+    return best
+
+
+def to_nullable_list(values) -> List[Optional[float]]:
+    """Convert a float array to a list with None for NaN (mask applied in numpy)"""
+    values = np.asarray(values, dtype=np.float64)
+    missing = np.isnan(values)
+    if not missing.any():
+        return values.tolist()
+    out = values.astype(object)
+    out[missing] = None
+    return out.tolist()
+
+
+def _as_float64(values) -> np.ndarray:
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+def encode_json(time: np.ndarray, columns: Dict[str, np.ndarray], extra: Optional[Dict] = None) -> bytes:
+    """`{"time": [...], "indicators": {...}}` with NaN/inf as null, no list building"""
+    payload = {
+        "time": np.ascontiguousarray(time, dtype=np.int64),
+        "indicators": {name: _as_float64(values) for name, values in columns.items()},
+    }
+    if extra:
+        payload.update(extra)
+    return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def encode_arrow(time: np.ndarray, columns: Dict[str, np.ndarray]) -> bytes:
+    """Arrow IPC stream bytes for the time column plus float64 series"""
+    arrays = [pa.array(np.asarray(time, dtype=np.int64))]
+    names = ["time"]
+    for name, values in columns.items():
+        arrays.append(pa.array(_as_float64(values), from_pandas=True))
+        names.append(name)
+    batch = pa.RecordBatch.from_arrays(arrays, names=names)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def _pad8(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def encode_float64_columns(time: np.ndarray, columns: Dict[str, np.ndarray]) -> bytes:
+    """Packed little-endian column buffers (see module docstring for layout)"""
+    length = len(time)
+    buffers = [("time", "int64", np.asarray(time, dtype="<i8"), None)]
+    for name, values in columns.items():
+        values = _as_float64(values).astype("<f8", copy=False)
+        missing = np.isnan(values)
+        validity = np.packbits(~missing, bitorder="little") if missing.any() else None
+        buffers.append((name, "float64", values, validity))
+
+    # Header size depends on the offsets it contains, so lay the buffers out
+    # relative to the data section first and shift once the header is fixed
+    layout = []
+    cursor = 0
+    for name, dtype, values, validity in buffers:
+        offset = cursor
+        cursor += _pad8(values.nbytes)
+        validity_offset = None
+        if validity is not None:
+            validity_offset = cursor
+            cursor += _pad8(validity.nbytes)
+        layout.append((name, dtype, offset, validity_offset))
+
+    def build_header(base: int) -> bytes:
+        return json.dumps({
+            "length": length,
+            "columns": [
+                {
+                    "name": name,
+                    "type": dtype,
+                    "offset": base + offset,
+                    "validity": None if validity_offset is None else base + validity_offset,
+                }
+                for name, dtype, offset, validity_offset in layout
+            ],
+        }).encode()
+
+    # Offsets only grow the header, so iterate until the size is stable
+    base = _pad8(12)
+    while True:
+        header = build_header(base)
+        new_base = _pad8(12 + len(header))
+        if new_base == base:
+            break
+        base = new_base
+
+    out = bytearray(base + cursor)
+    out[0:12] = _MAGIC + struct.pack("<II", _VERSION, len(header))
+    out[12:12 + len(header)] = header
+    for (name, dtype, values, validity), (_, _, offset, validity_offset) in zip(buffers, layout):
+        start = base + offset
+        out[start:start + values.nbytes] = values.tobytes()
+        if validity is not None:
+            start = base + validity_offset
+            out[start:start + validity.nbytes] = validity.tobytes()
+    return bytes(out)
+
+
+def columnar_response(
+    media_type: Optional[str],
+    time: np.ndarray,
+    columns: Dict[str, np.ndarray],
+    extra: Optional[Dict[str, str]] = None
+) -> Response:
+    """
+    Encode time + series in the negotiated format (None = JSON).
+    `extra` string fields are added to the JSON object and, for every
+    format, sent as X-<Field> headers (e.g. handle -> X-Handle).
+    """
+    if media_type == ARROW_STREAM:
+        body = encode_arrow(time, columns)
+    elif media_type == FLOAT64_COLUMNS:
+        body = encode_float64_columns(time, columns)
+    else:
+        media_type = "application/json"
+        body = encode_json(time, columns, extra)
+    headers = {"Vary": "Accept"}
+    for field, value in (extra or {}).items():
+        headers[f"X-{field.replace('_', '-').title()}"] = str(value)
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def decode_float64_columns(body: bytes) -> Dict[str, np.ndarray]:
+    """Inverse of encode_float64_columns (missing float values come back as NaN)"""
+    if len(body) < 12 or body[0:4] != _MAGIC:
+        raise ValueError("Not an F64C body")
+    version, header_length = struct.unpack("<II", body[4:12])
+    if version != _VERSION:
+        raise ValueError(f"Unsupported F64C version {version}")
+    try:
+        header = json.loads(body[12:12 + header_length])
+        length = int(header["length"])
+        columns = {}
+        for column in header["columns"]:
+            dtype = "<i8" if column["type"] == "int64" else "<f8"
+            values = np.frombuffer(body, dtype=dtype, count=length, offset=column["offset"])
+            if column.get("validity") is not None and dtype == "<f8":
+                bitmap = np.frombuffer(body, dtype=np.uint8, count=(length + 7) // 8, offset=column["validity"])
+                present = np.unpackbits(bitmap, count=length, bitorder="little").astype(bool)
+                values = np.where(present, values, np.nan)
+            columns[column["name"]] = values
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Malformed F64C body: {e}")
+    return columns
+
+
+def decode_arrow(body: bytes) -> Dict[str, np.ndarray]:
+    """Columns of an Arrow IPC stream body as numpy arrays (nulls -> NaN)"""
+    try:
+        table = pa.ipc.open_stream(body).read_all()
+    except pa.ArrowInvalid as e:
+        raise ValueError(f"Malformed Arrow stream: {e}")
+    return {
+        name: table.column(name).to_numpy(zero_copy_only=False)
+        for name in table.column_names
+    }
+
+
+def decode_columns(media_type: str, body: bytes) -> Dict[str, np.ndarray]:
+    """Decode a binary columnar request body (ARROW_STREAM or FLOAT64_COLUMNS)"""
+    if media_type == ARROW_STREAM:
+        return decode_arrow(body)
+    if media_type == FLOAT64_COLUMNS:
+        return decode_float64_columns(body)
+    raise ValueError(f"Unsupported columnar media type {media_type}")
@@ -3,22 +3,69 @@ Data loader service - reads Parquet files from the data directory
 """
 
 import os
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional
+
+from api.services import arrow_cache
+from api.services.bar_store import BarStore, file_fingerprint
 
 
 # Path to data directory - relative to project root
 DATA_DIR = Path(__file__).parent.parent.parent / "data"
 
+# Process-wide cache of decoded frames, keyed by (ticker, timeframe)
+bar_store = BarStore()
+
+
+def _live_path(clean_ticker: str) -> Path:
+    """Live streaming file that is fused into 1m history for this ticker"""
+    # Map back to Live Symbol format
+    # NQ1 -> /NQ -> -NQ (Filename format)
+    if clean_ticker == "NQ1":
+        return DATA_DIR / "live_storage_-NQ.parquet"
+    elif clean_ticker == "ES1":
+        return DATA_DIR / "live_storage_-ES.parquet"
+    elif clean_ticker == "YM1":
+        return DATA_DIR / "live_storage_-YM.parquet"
+    elif clean_ticker == "RTY1":
+        return DATA_DIR / "live_storage_-RTY.parquet"
+    # Standard Equities (e.g. QQQ -> live_storage_QQQ.parquet)
+    return DATA_DIR / f"live_storage_{clean_ticker}.parquet"
 
-def load_parquet(ticker: str, timeframe: str) -> Optional[pd.DataFrame]:
+
+def load_parquet(
+    ticker: str,
+    timeframe: str,
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None,
+    columns: Optional[List[str]] = None
+) -> Optional[pd.DataFrame]:
     """
     Load OHLCV data from Parquet file
     
+    Decoded frames are served from the in-process bar store and only
+    re-read when the underlying file (or the live file for 1m) changes.
+    The returned frame is a shallow copy: adding or replacing columns is
+    safe, writing into existing column values in place is not.
+    
+    For 1m data the decoded history is cached on its own; when only the
+    live file changes, the live bars are spliced onto the cached history
+    (see fuse_live) instead of re-reading and re-sorting everything.
+    
+    When a time range is given and the full frame is not already cached,
+    the range is pushed down into pyarrow so only the row groups whose
+    statistics overlap [start_time, end_time] are decoded.
+    
     Args:
         ticker: e.g., "ES1", "NQ1" or "ES1!" (will be stripped)
         timeframe: e.g., "5m", "1h", "1D", "1wk" (maps "1W" -> "1wk")
+        start_time: Optional inclusive lower bound (Unix seconds)
+        end_time: Optional inclusive upper bound (Unix seconds)
+        columns: Optional subset of OHLCV columns ('time' is always included)
     
     Returns:
         DataFrame with columns: time, open, high, low, close, volume
@@ -46,13 +93,192 @@ def load_parquet(ticker: str, timeframe: str) -> Optional[pd.DataFrame]:
         print(f"File not found: {filepath}")
         return None
     
-    df = pd.read_parquet(filepath)
+    if columns is not None:
+        columns = ['time'] + [c for c in columns if c != 'time']
+    has_range = start_time is not None or end_time is not None
+    
+    live_path = _live_path(clean_ticker) if timeframe == "1m" else None
+    key = (clean_ticker, timeframe)
+    fingerprint = file_fingerprint(filepath, live_path)
+    
+    df = bar_store.get(key, fingerprint)
+    if df is None:
+        history_key = key + ("history",)
+        history_fp = file_fingerprint(filepath)
+        history = bar_store.get(history_key, history_fp) if live_path else None
+        
+        if history is None and has_range:
+            # Partial read - decode only the requested window, don't cache it
+            return _read_bars(filepath, live_path, ticker, start_time, end_time, columns)
+        
+        if live_path is None:
+            df = _load_history(clean_ticker, timeframe, filepath, history_fp)
+        else:
+            cached = history is not None
+            if not cached:
+                history = _load_history(clean_ticker, timeframe, filepath, history_fp)
+            df = history
+            if df is not None:
+                live_df = _read_live(live_path, ticker)
+                if live_df is not None:
+                    df = fuse_live(history, live_df)
+                # Keep the pristine history for the next live update
+                # (not needed when nothing was fused into it)
+                if not cached and df is not history:
+                    bar_store.put(history_key, history_fp, history)
+        if df is None:
+            return None
+        bar_store.put(key, fingerprint, df)
+    
+    if has_range:
+        df = slice_time_range(df, start_time, end_time)
+    if columns is not None:
+        df = df[columns]
+    return df.copy(deep=False)
+
+
+def slice_time_range(df: pd.DataFrame, start_time: Optional[int], end_time: Optional[int]) -> pd.DataFrame:
+    """
+    Select rows with start_time <= time <= end_time from a time-sorted frame.
+    Uses binary search instead of a boolean mask; returns a view with a fresh index.
+    """
+    times = df['time'].to_numpy()
+    lo = 0 if start_time is None else int(np.searchsorted(times, start_time, side='left'))
+    hi = len(times) if end_time is None else int(np.searchsorted(times, end_time, side='right'))
+    out = df.iloc[lo:hi].copy(deep=False)
+    out.index = pd.RangeIndex(len(out))
+    return out
+
+
+def fuse_live(history: pd.DataFrame, live_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Overlay live bars on a time-sorted history frame (live wins on equal time).
+    
+    Equivalent to concat + drop_duplicates(keep='last') + sort_values, but
+    the history is only binary searched: rows before the first live bar are
+    taken as-is and only the overlapping tail is merged and sorted, so the
+    cost is O(live rows) plus one copy. The history frame is not modified.
+    """
+    if live_df.empty:
+        return history
+    
+    hist_times = history['time'].to_numpy()
+    if len(hist_times) > 1 and not (np.diff(hist_times) > 0).all():
+        # History has duplicate/unsorted bars - use the full dedupe
+        df = pd.concat([history, live_df])
+        df = df.drop_duplicates(subset=['time'], keep='last')
+        return df.sort_values('time').reset_index(drop=True)
+    
+    # Latest copy of each live bar, in time order
+    live_df = live_df.drop_duplicates(subset=['time'], keep='last')
+    live_df = live_df.sort_values('time', kind='stable')
+    live_times = live_df['time'].to_numpy()
+    
+    # History rows from the first live bar onward overlap the live window;
+    # drop the ones that live replaces and merge the rest in
+    split = int(np.searchsorted(hist_times, live_times[0], side='left'))
+    overlap = history.iloc[split:]
+    overlap = overlap[~np.isin(overlap['time'].to_numpy(), live_times)]
+    tail = pd.concat([overlap, live_df]).sort_values('time', kind='stable')
+    
+    df = pd.concat([history.iloc[:split], tail])
+    return df.reset_index(drop=True)
+
+
+def _time_scale(max_value) -> int:
+    """Units per second for an integer epoch column, judged by its magnitude"""
+    if max_value > 1e16: # Nanoseconds (1.7e18)
+        return 10**9
+    elif max_value > 1e13: # Microseconds (1.7e15)
+        return 10**6
+    elif max_value > 1e10: # Milliseconds (1.7e12)
+        return 10**3
+    return 1 # Already seconds (1.7e9)
+
+
+def _pushdown_args(
+    filepath: Path,
+    start_time: Optional[int],
+    end_time: Optional[int],
+    columns: Optional[List[str]]
+) -> Dict:
+    """
+    Build pd.read_parquet kwargs (pyarrow filter expression + column list)
+    for a time-range / column-subset read of an OHLCV file.
+    """
+    dataset = ds.dataset(str(filepath), format='parquet')
+    schema = dataset.schema
+    names = schema.names
+    
+    # Same precedence as the normalization below: 'time' wins over datetime/timestamp
+    time_col = next((c for c in ['time', 'datetime', 'timestamp'] if c in names), None)
+    if time_col is None:
+        return {}
+    
+    kwargs = {}
+    if columns is not None:
+        kwargs['columns'] = [time_col] + [c for c in columns if c != 'time' and c in names]
+    
+    if start_time is None and end_time is None:
+        return kwargs
+    
+    field_type = schema.field(time_col).type
+    field = ds.field(time_col)
+    expr = None
+    
+    if pa.types.is_timestamp(field_type):
+        def bound(seconds):
+            ts = pd.Timestamp(int(seconds), unit='s', tz='UTC')
+            return ts if field_type.tz else ts.tz_localize(None)
+        if start_time is not None:
+            expr = field >= pa.scalar(bound(start_time), type=field_type)
+        if end_time is not None:
+            upper = field < pa.scalar(bound(end_time + 1), type=field_type)
+            expr = upper if expr is None else expr & upper
+    elif pa.types.is_integer(field_type):
+        # Detect epoch unit from row group statistics (no data pages are read)
+        max_value = None
+        for fragment in dataset.get_fragments():
+            metadata = fragment.metadata
+            col_idx = metadata.schema.names.index(time_col)
+            for rg in range(metadata.num_row_groups):
+                stats = metadata.row_group(rg).column(col_idx).statistics
+                if stats is not None and stats.has_min_max:
+                    max_value = stats.max if max_value is None else max(max_value, stats.max)
+        if max_value is None:
+            return kwargs
+        scale = _time_scale(max_value)
+        if start_time is not None:
+            expr = field >= int(start_time) * scale
+        if end_time is not None:
+            upper = field <= (int(end_time) + 1) * scale - 1
+            expr = upper if expr is None else expr & upper
+    
+    if expr is not None:
+        kwargs['filters'] = expr
+    return kwargs
+
+
+def _read_history(
+    filepath: Path,
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None,
+    columns: Optional[List[str]] = None
+) -> Optional[pd.DataFrame]:
+    """Decode, normalize (time in seconds) and sort one OHLCV Parquet file"""
+    read_kwargs = {}
+    if start_time is not None or end_time is not None or columns is not None:
+        try:
+            read_kwargs = _pushdown_args(filepath, start_time, end_time, columns)
+        except Exception as e:
+            print(f"Pushdown unavailable for {filepath.name}, reading full file: {e}")
+    
+    df = pd.read_parquet(filepath, **read_kwargs)
     
     # Handle datetime index - reset to column and convert to Unix timestamp
     if df.index.name in ['datetime', 'time', 'timestamp']:
         df = df.reset_index()
     
-    # Rename datetime column to time if needed
     # Rename datetime column to time if needed
     if 'datetime' in df.columns:
         if 'time' in df.columns:
@@ -71,67 +297,106 @@ def load_parquet(ticker: str, timeframe: str) -> Optional[pd.DataFrame]:
         df['time'] = df['time'].astype('int64') // 10**9
     
     # Ensure expected columns exist
-    expected_cols = ['time', 'open', 'high', 'low', 'close', 'volume']
+    expected_cols = columns or ['time', 'open', 'high', 'low', 'close', 'volume']
     for col in expected_cols:
         if col not in df.columns:
             print(f"Missing column: {col}")
             return None
     
+    # Normalize integer epochs to seconds (some sources store ms/us/ns)
+    if not df.empty:
+        scale = _time_scale(df['time'].max())
+        if scale > 1:
+            df['time'] = df['time'] // scale
+    
     # Sort by time
     df = df.sort_values('time').reset_index(drop=True)
+    return df
+
+
+def _load_history(clean_ticker: str, timeframe: str, filepath: Path, fingerprint) -> Optional[pd.DataFrame]:
+    """
+    Full normalized history, via the shared memory-mapped Arrow cache.
+    The first worker to miss decodes the Parquet file and publishes it;
+    the others map the same pages read-only.
+    """
+    name = f"{clean_ticker}_{timeframe}"
+    df = arrow_cache.load_frame(name, fingerprint)
+    if df is not None:
+        return df
+    df = _read_history(filepath)
+    if df is None:
+        return None
+    mapped = arrow_cache.store_frame(name, fingerprint, df)
+    return mapped if mapped is not None else df
+
+
+def _read_live(
+    live_path: Path,
+    ticker: str,
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None,
+    columns: Optional[List[str]] = None
+) -> Optional[pd.DataFrame]:
+    """Read and normalize the live streaming file (None if missing/empty/broken)"""
+    if not live_path.exists():
+        return None
+    try:
+        live_df = pd.read_parquet(live_path)
+        if live_df.empty:
+            return None
+        # Normalize columns if needed (live parquet should match, but verify)
+        if 'timestamp' in live_df.columns and 'time' not in live_df.columns:
+             live_df = live_df.rename(columns={'timestamp': 'time'})
+             
+        # Determine columns to keep
+        expected_cols = columns or ['time', 'open', 'high', 'low', 'close', 'volume']
+        cols = [c for c in expected_cols if c in live_df.columns]
+        live_df = live_df[cols]
+        
+        # Normalize units: live 'time' is usually in milliseconds
+        # Detect 13-digit numbers (ms) or 16-digit (us) and divide
+        scale = _time_scale(live_df['time'].max())
+        if scale > 1:
+            live_df['time'] = live_df['time'] // scale
+        
+        if start_time is not None:
+            live_df = live_df[live_df['time'] >= start_time]
+        if end_time is not None:
+            live_df = live_df[live_df['time'] <= end_time]
+        return live_df
+    except Exception as e:
+        print(f"Failed to merge live data for {ticker}: {e}")
+        return None
+
+
+def _read_bars(
+    filepath: Path,
+    live_path: Optional[Path],
+    ticker: str,
+    start_time: Optional[int] = None,
+    end_time: Optional[int] = None,
+    columns: Optional[List[str]] = None
+) -> Optional[pd.DataFrame]:
+    """Decode one Parquet file (optionally a time window), fusing live data if given"""
+    df = _read_history(filepath, start_time, end_time, columns)
+    if df is None:
+        return None
     
     # --- Live Data Fusion (Only for 1m data) ---
-    if timeframe == "1m":
-        live_path = None
-        
-        # Map back to Live Symbol format
-        # NQ1 -> /NQ -> -NQ (Filename format)
-        if clean_ticker == "NQ1":
-            live_path = DATA_DIR / "live_storage_-NQ.parquet"
-        elif clean_ticker == "ES1":
-            live_path = DATA_DIR / "live_storage_-ES.parquet"
-        elif clean_ticker == "YM1":
-            live_path = DATA_DIR / "live_storage_-YM.parquet"
-        elif clean_ticker == "RTY1":
-            live_path = DATA_DIR / "live_storage_-RTY.parquet"
-        else:
-            # Standard Equities (e.g. QQQ -> live_storage_QQQ.parquet)
-            live_path = DATA_DIR / f"live_storage_{clean_ticker}.parquet"
-            
-        if live_path and live_path.exists():
+    if live_path:
+        live_df = _read_live(live_path, ticker, start_time, end_time, columns)
+        if live_df is not None:
             try:
-                live_df = pd.read_parquet(live_path)
-                if not live_df.empty:
-                    # Normalize columns if needed (live parquet should match, but verify)
-                    if 'timestamp' in live_df.columns and 'time' not in live_df.columns:
-                         live_df = live_df.rename(columns={'timestamp': 'time'})
-                         
-                    # Determine columns to keep
-                    cols = [c for c in expected_cols if c in live_df.columns]
-                    live_df = live_df[cols]
-                    
-                    # Normalize units: ensure both main and live 'time' are in seconds
-                    # Detect 13-digit numbers (ms) or 16-digit (us) and divide
-                    for df_temp in [df, live_df]:
-                        if 'time' in df_temp.columns and not df_temp.empty:
-                            m = df_temp['time'].max()
-                            if m > 1e16: # Nanoseconds (1.7e18)
-                                df_temp['time'] = df_temp['time'] // 10**9
-                            elif m > 1e13: # Microseconds (1.7e15)
-                                df_temp['time'] = df_temp['time'] // 10**6
-                            elif m > 1e10: # Milliseconds (1.7e12)
-                                df_temp['time'] = df_temp['time'] // 10**3
-                            # Else already seconds (1.7e9)
-                    
-                    # Concat and Dedupe
-                    # Keep LAST (Live) version of overlapping 1m bars
-                    df = pd.concat([df, live_df])
-                    df = df.drop_duplicates(subset=['time'], keep='last')
-                    df = df.sort_values('time').reset_index(drop=True)
-                    # print(f"Fused live data for {ticker}: +{len(live_df)} bars")
+                df = fuse_live(df, live_df)
             except Exception as e:
                 print(f"Failed to merge live data for {ticker}: {e}")
-
+    
+    # Exact bounds in seconds (row group pruning is only coarse, and the
+    # file may not have been filterable at all)
+    if start_time is not None or end_time is not None:
+        df = slice_time_range(df, start_time, end_time)
+    
     return df
 
 
@@ -0,0 +1,194 @@
+"""
+Executor - runs CPU-bound endpoint work off the asyncio event loop
+
+Handlers are `async def`, so any pandas/NumPy work done inline blocks every
+other request (including /health) until it finishes. Handlers instead await
+run_in_thread(lane, fn, ...), which runs fn on a shared thread pool: the
+NumPy/Arrow/Parquet work releases the GIL, and fn keeps access to the
+in-process caches (ProfilerService, BarStore, SessionIndex).
+
+Each call belongs to a lane (usually one per router) with its own
+concurrency limit, so a burst of profiler requests queues behind its limit
+instead of occupying every worker. Per-lane counters (queued, running,
+completed, failed, coalesced, wait/run times) are exposed through stats()
+at /health/executor.
+
+Single-flight: pass flight_key=<hashable> and concurrent calls with the same
+key share one execution (and its result or exception) instead of each
+queuing its own - e.g. N chart components asking for the same price model
+right after a cache clear cost one computation. The shared run is shielded,
+so a client disconnecting does not cancel it for the others. Results are
+shared objects: callers must not mutate them.
+
+Configuration:
+    EXECUTOR_THREADS      thread pool size (default: min(32, CPUs + 4))
+    EXECUTOR_LANE_LIMITS  "lane=limit,..." (default: profiler=2,sessions=2,indicators=8,warmup=2)
+    EXECUTOR_LANE_DEFAULT limit for lanes not listed (default: 4)
+"""
+
+import asyncio
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+_CPUS = os.cpu_count() or 1
+
+THREADS = int(os.environ.get("EXECUTOR_THREADS", min(32, _CPUS + 4)))
+DEFAULT_LANE_LIMIT = int(os.environ.get("EXECUTOR_LANE_DEFAULT", "4"))
+
+
+def _parse_limits(spec: str) -> Dict[str, int]:
+    limits = {}
+    for part in spec.split(","):
+        name, _, value = part.partition("=")
+        if name.strip() and value.strip():
+            limits[name.strip()] = max(1, int(value))
+    return limits
+
+
+LANE_LIMITS = _parse_limits(os.environ.get("EXECUTOR_LANE_LIMITS", "profiler=2,sessions=2,indicators=8,warmup=2"))
+
+
+class Lane:
+    """Concurrency limit plus queue/latency counters for one group of endpoints"""
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.queued = 0
+        self.running = 0
+        self.max_queued = 0
+        self.completed = 0
+        self.failed = 0
+        self.coalesced = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        return self._semaphore
+
+    def stats(self) -> Dict[str, Any]:
+        finished = self.completed + self.failed
+        return {
+            "limit": self.limit,
+            "queued": self.queued,
+            "running": self.running,
+            "max_queued": self.max_queued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "coalesced": self.coalesced,
+            "avg_wait_ms": round(1000 * self.wait_seconds / finished, 2) if finished else 0.0,
+            "max_wait_ms": round(1000 * self.max_wait_seconds, 2),
+            "avg_run_ms": round(1000 * self.run_seconds / finished, 2) if finished else 0.0,
+        }
+
+
+_lanes: Dict[str, Lane] = {}
+_in_flight: Dict[Hashable, "asyncio.Future"] = {}
+_thread_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_lane(name: str) -> Lane:
+    lane = _lanes.get(name)
+    if lane is None:
+        lane = _lanes[name] = Lane(name, LANE_LIMITS.get(name, DEFAULT_LANE_LIMIT))
+    return lane
+
+
+def _get_thread_pool() -> ThreadPoolExecutor:
+    global _thread_pool
+    with _pool_lock:
+        if _thread_pool is None:
+            _thread_pool = ThreadPoolExecutor(max_workers=THREADS, thread_name_prefix="api-worker")
+        return _thread_pool
+
+
+async def _run(lane_name: str, submit: Callable[[], "asyncio.Future"]):
+    lane = get_lane(lane_name)
+    queued_at = time.perf_counter()
+    lane.queued += 1
+    lane.max_queued = max(lane.max_queued, lane.queued)
+    try:
+        await lane.semaphore.acquire()
+    finally:
+        lane.queued -= 1
+    wait = time.perf_counter() - queued_at
+    lane.wait_seconds += wait
+    lane.max_wait_seconds = max(lane.max_wait_seconds, wait)
+    lane.running += 1
+    started = time.perf_counter()
+    try:
+        result = await submit()
+        lane.completed += 1
+        return result
+    except BaseException:
+        lane.failed += 1
+        raise
+    finally:
+        lane.run_seconds += time.perf_counter() - started
+        lane.running -= 1
+        lane.semaphore.release()
+
+
+async def _single_flight(lane_name: str, flight_key: Optional[Hashable], start: Callable[[], Any]):
+    """Await start() unless an identical (lane, flight_key) call is already running"""
+    if flight_key is None:
+        return await start()
+    key = (lane_name, flight_key)
+    future = _in_flight.get(key)
+    if future is not None:
+        get_lane(lane_name).coalesced += 1
+        return await asyncio.shield(future)
+
+    future = asyncio.ensure_future(start())
+    _in_flight[key] = future
+
+    def forget(done):
+        if _in_flight.get(key) is done:
+            del _in_flight[key]
+        if not done.cancelled():
+            done.exception()  # Mark retrieved when every waiter went away
+
+    future.add_done_callback(forget)
+    return await asyncio.shield(future)
+
+
+async def run_in_thread(lane: str, fn: Callable, *args, flight_key: Optional[Hashable] = None, **kwargs):
+    """
+    Run fn(*args, **kwargs) on the shared thread pool within lane's limit.
+    Calls sharing a flight_key while one is running get that call's result.
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(fn, *args, **kwargs)
+    return await _single_flight(
+        lane, flight_key,
+        lambda: _run(lane, lambda: loop.run_in_executor(_get_thread_pool(), call))
+    )
+
+
+def stats() -> Dict[str, Any]:
+    """Pool sizes and per-lane queue depth / latency counters"""
+    return {
+        "threads": THREADS,
+        "lanes": {name: lane.stats() for name, lane in sorted(_lanes.items())},
+    }
+
+
+def shutdown():
+    """Stop the thread pool (server shutdown)"""
+    global _thread_pool
+    with _pool_lock:
+        if _thread_pool is not None:
+            _thread_pool.shutdown(wait=False, cancel_futures=True)
+            _thread_pool = None
@@ -0,0 +1,273 @@
+"""
+Filter Cube - precomputed profiler filtered stats / price models
+
+get_filtered_stats and get_filtered_price_model results were only cached
+lazily, per exact filter payload. The cube is built offline
+(scripts/derived/precompute_filter_cube.py) for every target session and
+every combination of up to two filtered sessions, each with a status filter
+(as the filter sidebar sends them: Long, Short, None, True, False, Long
+True, ...) and/or a broken filter (Yes/No), intra_state "Any".
+
+One row per combination in data/{ticker}_filter_cube.arrow (Arrow IPC,
+memory-mapped by the API):
+
+- key_hash / key   canonical filter key (see cube_key), rows sorted by hash
+- mask             matched dates as packed bits over SessionBitmap.dates
+- count, dist_*, high/low median/mean   target session stats
+- model_ref        row holding this combination's price model; combinations
+                   matching the same sessions share one copy of the paths
+- model_count, base_minute, time_idx, median/extreme high/low lists
+                   the price model at the cube's bucket size, paths stored
+                   as int32 thousandths (the API rounds them to 3 decimals)
+
+The file carries the fingerprint of the profiler sources it was built from
+(ProfilerService._sessions_fingerprint) and is ignored once they change, so
+a stale cube only costs the lazy path until it is rebuilt.
+"""
+
+import hashlib
+import itertools
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+
+from api.services.session_bitmap import STATUSES
+
+
+TARGET_SESSIONS = ['Daily', 'Asia', 'London', 'NY1', 'NY2']
+FILTER_SESSIONS = ['Asia', 'London', 'NY1', 'NY2']
+STATUS_FILTERS = ['Long', 'Short', 'None', 'True', 'False', 'Long True', 'Long False', 'Short True', 'Short False']
+BROKEN_FILTERS = ['Yes', 'No']
+BROKEN_ALIASES = {'Broken': 'Yes', 'Not Broken': 'No'}
+
+# Filtered sessions per combination
+MAX_FILTERED_SESSIONS = 2
+
+PATH_FIELDS = ['median_high', 'extreme_high', 'median_low', 'extreme_low']
+
+_FINGERPRINT_KEY = b"source_fingerprint"
+
+# Path values are stored as round(value, 3) * 1000; NaN and -0.0 as these codes
+NAN_CODE = np.iinfo(np.int32).min
+NEG_ZERO_CODE = NAN_CODE + 1
+
+
+def cube_path(data_dir: Path, ticker: str) -> Path:
+    return Path(data_dir) / f"{ticker}_filter_cube.arrow"
+
+
+def cube_key(
+    target_session: str,
+    filters: Optional[Dict[str, str]] = None,
+    broken_filters: Optional[Dict[str, str]] = None,
+    intra_state: str = "Any"
+) -> Optional[str]:
+    """
+    Canonical key of a filter payload ('Any'/empty filters dropped, broken
+    aliases folded), None for payloads the cube never covers
+    """
+    if intra_state not in (None, "", "Any"):
+        return None
+    status = sorted((s, v) for s, v in (filters or {}).items() if v and v != 'Any')
+    broken = sorted(
+        (s, BROKEN_ALIASES.get(v, v)) for s, v in (broken_filters or {}).items() if v and v != 'Any'
+    )
+    return json.dumps([target_session, status, broken])
+
+
+def key_hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little")
+
+
+def combinations() -> Iterator[Tuple[Dict[str, str], Dict[str, str]]]:
+    """(filters, broken_filters) for no filter and every 1..MAX_FILTERED_SESSIONS filtered sessions"""
+    states = [
+        (status, broken)
+        for status in [None] + STATUS_FILTERS
+        for broken in [None] + BROKEN_FILTERS
+        if status or broken
+    ]
+    yield {}, {}
+    for n in range(1, MAX_FILTERED_SESSIONS + 1):
+        for sessions in itertools.combinations(FILTER_SESSIONS, n):
+            for picked in itertools.product(states, repeat=n):
+                filters = {s: status for s, (status, _) in zip(sessions, picked) if status}
+                broken_filters = {s: broken for s, (_, broken) in zip(sessions, picked) if broken}
+                yield filters, broken_filters
+
+
+def _encode_fingerprint(fingerprint: Any) -> bytes:
+    return json.dumps(fingerprint, default=list).encode()
+
+
+def _stat(value: Optional[float]) -> float:
+    return np.nan if value is None else value
+
+
+def _unstat(value: float) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+
+def _encode_path(values: np.ndarray) -> np.ndarray:
+    rounded = np.array([round(v, 3) for v in np.asarray(values, dtype=np.float64).tolist()], dtype=np.float64)
+    codes = np.full(len(rounded), NAN_CODE, dtype=np.int32)
+    finite = ~np.isnan(rounded)
+    codes[finite] = np.rint(rounded[finite] * 1000)
+    codes[(rounded == 0) & np.signbit(rounded)] = NEG_ZERO_CODE
+    return codes
+
+
+def _decode_path(codes: np.ndarray) -> np.ndarray:
+    values = codes / 1000.0
+    values[codes == NAN_CODE] = np.nan
+    values[codes == NEG_ZERO_CODE] = -0.0
+    return values
+
+
+def write_cube(path: Path, fingerprint: Any, bucket_minutes: int, n_dates: int, rows: List[Dict]) -> None:
+    """
+    Write cube rows (key, mask, stats, model per combination) sorted by key
+    hash; rows sharing a model object store its paths once. Temp file +
+    os.replace like arrow_cache.
+    """
+    rows = sorted(rows, key=lambda r: key_hash(r["key"]))
+    stats = [r["stats"] for r in rows]
+    models = [r["model"] for r in rows]
+
+    # First row of every distinct model keeps the paths
+    first_row = {}
+    model_ref = [first_row.setdefault(id(m), k) for k, m in enumerate(models)]
+    owners = [ref == k for k, ref in enumerate(model_ref)]
+    no_path = np.empty(0, dtype=np.int32)
+
+    def path_list(name, encode):
+        return pa.array(
+            [encode(m[name]) if own else no_path for m, own in zip(models, owners)], type=pa.list_(pa.int32())
+        )
+
+    columns = {
+        "key_hash": pa.array([key_hash(r["key"]) for r in rows], type=pa.uint64()),
+        "key": pa.array([r["key"] for r in rows], type=pa.string()),
+        "mask": pa.array([np.packbits(r["mask"]).tobytes() for r in rows], type=pa.binary()),
+        "count": pa.array([int(r["mask"].sum()) for r in rows], type=pa.int32()),
+    }
+    for k, status in enumerate(STATUSES):
+        columns[f"dist_{k}"] = pa.array([s["distribution"][status] for s in stats], type=pa.int32())
+    for field in ("high_pct", "low_pct"):
+        for agg in ("median", "mean"):
+            columns[f"{field}_{agg}"] = pa.array(
+                [_stat(s["range_stats"][field][agg]) for s in stats], type=pa.float64()
+            )
+    columns["model_ref"] = pa.array(model_ref, type=pa.int32())
+    columns["model_count"] = pa.array([m["count"] for m in models], type=pa.int32())
+    columns["base_minute"] = pa.array(
+        [-1 if m["base_minute"] is None else m["base_minute"] for m in models], type=pa.int16()
+    )
+    columns["time_idx"] = path_list("time_idx", lambda v: np.asarray(v, dtype=np.int32))
+    for name in PATH_FIELDS:
+        columns[name] = path_list(name, _encode_path)
+
+    table = pa.table(columns).replace_schema_metadata({
+        _FINGERPRINT_KEY: _encode_fingerprint(fingerprint),
+        b"bucket_minutes": str(bucket_minutes).encode(),
+        b"n_dates": str(n_dates).encode(),
+    })
+    path = Path(path)
+    tmp_path = path.parent / f".{path.name}.{uuid.uuid4().hex}.tmp"
+    try:
+        with pa.OSFile(str(tmp_path), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+class FilterCube:
+    """Memory-mapped cube file: key lookup plus per-row stats / model decoding"""
+
+    def __init__(self, table: pa.Table, bucket_minutes: int, n_dates: int):
+        self.table = table.combine_chunks()
+        self.bucket_minutes = bucket_minutes
+        self.n_dates = n_dates
+        self._hashes = self.table.column("key_hash").to_numpy()
+        self._keys = self.table.column("key").chunk(0)
+        self._masks = self.table.column("mask").chunk(0)
+        self._scalars = {
+            name: self.table.column(name).to_numpy()
+            for name in self.table.column_names
+            if name not in ("key_hash", "key", "mask", "time_idx", *PATH_FIELDS)
+        }
+        self._lists = {}
+        for name in ("time_idx", *PATH_FIELDS):
+            array = self.table.column(name).chunk(0)
+            self._lists[name] = (array.offsets.to_numpy(), array.values.to_numpy())
+
+    def __len__(self) -> int:
+        return self.table.num_rows
+
+    @classmethod
+    def load(cls, path: Path, fingerprint: Any) -> Optional["FilterCube"]:
+        """Memory-map a cube built from sources with this fingerprint (None if missing or stale)"""
+        path = Path(path)
+        if not path.exists():
+            return None
+        try:
+            reader = pa.ipc.open_file(pa.memory_map(str(path), "r"))
+            metadata = reader.schema.metadata or {}
+            if metadata.get(_FINGERPRINT_KEY) != _encode_fingerprint(fingerprint):
+                print(f"[FilterCube] {path.name} is stale, ignoring it until rebuilt")
+                return None
+            return cls(reader.read_all(), int(metadata[b"bucket_minutes"]), int(metadata[b"n_dates"]))
+        except Exception as e:
+            print(f"[FilterCube] Failed to map {path.name}: {e}")
+            return None
+
+    def find(self, target_session: str, filters=None, broken_filters=None, intra_state: str = "Any") -> Optional[int]:
+        """Row of a filter payload, None when the cube does not cover it"""
+        key = cube_key(target_session, filters, broken_filters, intra_state)
+        if key is None:
+            return None
+        h = np.uint64(key_hash(key))
+        row = int(np.searchsorted(self._hashes, h))
+        while row < len(self._hashes) and self._hashes[row] == h:
+            if self._keys[row].as_py() == key:
+                return row
+            row += 1
+        return None
+
+    def mask(self, row: int) -> np.ndarray:
+        """Matched dates of a row as a bool array over SessionBitmap.dates"""
+        packed = np.frombuffer(self._masks[row].as_buffer(), dtype=np.uint8)
+        return np.unpackbits(packed, count=self.n_dates).astype(bool)
+
+    def target_stats(self, row: int) -> Dict:
+        """Same shape as SessionBitmap.target_stats"""
+        distribution = {status: int(self._scalars[f"dist_{k}"][row]) for k, status in enumerate(STATUSES)}
+        range_stats = {
+            field: {
+                "median": _unstat(self._scalars[f"{field}_median"][row]),
+                "mean": _unstat(self._scalars[f"{field}_mean"][row]),
+                "mode": None,
+            }
+            for field in ("high_pct", "low_pct")
+        }
+        return {"distribution": distribution, "range_stats": range_stats}
+
+    def model(self, row: int) -> Dict:
+        """Price model arrays: count, base_minute (None if unknown), time_idx and PATH_FIELDS"""
+        row = int(self._scalars["model_ref"][row])
+        out = {
+            "count": int(self._scalars["model_count"][row]),
+            "base_minute": None if self._scalars["base_minute"][row] < 0 else int(self._scalars["base_minute"][row]),
+        }
+        for name, (offsets, values) in self._lists.items():
+            codes = values[offsets[row]:offsets[row + 1]]
+            out[name] = codes if name == "time_idx" else _decode_path(codes)
+        return out
@@ -0,0 +1,120 @@
+"""
+HTTP conditional caching for responses derived from data files
+
+Endpoints that only re-read precomputed files (HOD/LOD, range distribution,
+level stats, precomputed sessions) are deterministic for a given version of
+those files and request parameters. conditional() derives validators from
+the source file fingerprints (mtime/size, see parquet_store) instead of
+from the response body, so they are known before anything is read:
+
+- ETag: strong, hash of (file fingerprints, endpoint, parameters)
+- Last-Modified: newest source mtime
+- Cache-Control: public, max-age=HTTP_CACHE_MAX_AGE (default 0), must-revalidate
+
+A request whose If-None-Match (or, without it, If-Modified-Since) matches
+gets an empty 304 without touching the files; browsers and reverse proxies
+then skip re-downloading multi-MB payloads.
+"""
+
+import hashlib
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Iterable, Optional
+
+from fastapi import Request, Response
+
+from .parquet_store import dataset_fingerprint
+
+
+MAX_AGE = int(os.environ.get("HTTP_CACHE_MAX_AGE", "0"))
+
+
+def _newest_mtime(path: Path) -> Optional[float]:
+    if not path.exists():
+        return None
+    if path.is_dir():
+        mtimes = [p.stat().st_mtime for p in path.rglob("*.parquet")]
+        return max(mtimes) if mtimes else path.stat().st_mtime
+    return path.stat().st_mtime
+
+
+def make_etag(paths: Iterable[Path], *params) -> str:
+    """Strong ETag from the source fingerprints plus request parameters"""
+    paths = list(paths)
+    fingerprints = [dataset_fingerprint(p) if p.exists() else None for p in paths]
+    digest = hashlib.blake2b(repr((fingerprints, params)).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+# Suffixes encoding_etag adds for compressed representations
+_ENCODING_SUFFIXES = ("-gzip", "-br")
+
+
+def encoding_etag(etag: str, encoding: str) -> str:
+    """Distinct strong tag per Content-Encoding: "abc" -> "abc-gzip" """
+    if encoding == "identity":
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def _base_etag(tag: str) -> str:
+    tag = tag.strip().removeprefix("W/")
+    for suffix in _ENCODING_SUFFIXES:
+        if tag.endswith(suffix + '"'):
+            return tag[:-len(suffix) - 1] + '"'
+    return tag
+
+
+def _matching_etag(header: str, etag: str) -> Optional[str]:
+    """
+    Tag from If-None-Match that matches etag, or None.
+    The weak comparison is used: W/ prefixes are ignored, and so are
+    encoding suffixes (any encoding of the same version is current). The
+    matched tag keeps its suffix, so a 304 repeats the per-encoding ETag
+    the client received with its 200 (payload_cache.respond).
+    """
+    if header.strip() == "*":
+        return etag
+    for tag in header.split(","):
+        if _base_etag(tag) == etag:
+            return tag.strip().removeprefix("W/")
+    return None
+
+
+def conditional(request: Request, response: Response, paths: Iterable[Path], *params) -> Optional[Response]:
+    """
+    Set ETag/Last-Modified/Cache-Control on `response` (the handler's
+    injected Response) and return a 304 Response if the client's copy is
+    current, else None - the handler then builds its body as usual.
+    """
+    paths = [Path(p) for p in paths]
+    etag = make_etag(paths, request.url.path, *params)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={MAX_AGE}, must-revalidate",
+    }
+    mtimes = [m for m in (_newest_mtime(p) for p in paths) if m is not None]
+    modified = int(max(mtimes)) if mtimes else None
+    if modified is not None:
+        headers["Last-Modified"] = formatdate(modified, usegmt=True)
+    response.headers.update(headers)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        matched = _matching_etag(if_none_match, etag)
+        fresh = matched is not None
+        if fresh:
+            headers["ETag"] = matched
+    else:
+        fresh = False
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since and modified is not None:
+            try:
+                fresh = modified <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                fresh = False
+
+    if fresh:
+        return Response(status_code=304, headers=headers)
+    return None
@@ -0,0 +1,444 @@
+"""
+Incremental indicator state for live charts
+
+`/api/indicators/calculate` with `incremental: true` computes the window as
+usual and additionally keeps the running state of every requested indicator
+(EMA values, rolling windows, Wilder averages, VWAP session sums) under a
+handle. `/api/indicators/calculate/append` then feeds only the new bars
+through that state and returns only their values - O(1) work per bar
+(O(period) for SMA/BBANDS windows) instead of recomputing the whole window.
+
+- Values follow the same definitions/seeding as TA-Lib and the batch engine
+  (see ta_fallback), so an appended bar gets the value a full recompute
+  would give (to floating point precision)
+- A bar whose time equals the last bar replaces it (the forming live bar);
+  bars older than that are rejected - recompute with /calculate instead
+- States live in this worker's memory: sessions expire after
+  INDICATOR_SESSION_TTL seconds idle (default 3600) and at most
+  INDICATOR_SESSION_MAX are kept (LRU). An unknown handle means the client
+  should start over with /calculate.
+"""
+
+import copy
+import math
+import os
+import threading
+import time as time_module
+import uuid
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from api.services import ta_fallback
+from api.services.indicators import IndicatorContext, parse_indicator_name
+
+
+SESSION_TTL = float(os.environ.get("INDICATOR_SESSION_TTL", "3600"))
+MAX_SESSIONS = int(os.environ.get("INDICATOR_SESSION_MAX", "1000"))
+
+NAN = float("nan")
+
+
+class StaleBarError(ValueError):
+    """Appended bar is older than the last bar the state has seen"""
+
+
+# --- Per-indicator state machines ---------------------------------------------
+# Each state exposes:
+#   keys                       output series names
+#   prime(ctx)                 load state from a full history (vectorized)
+#   update(bar) -> tuple       consume one bar dict, return one value per key
+
+
+class _SMAState:
+    def __init__(self, period: int, key: str):
+        self.period = period
+        self.keys = [key]
+        self.window = deque(maxlen=period)
+
+    def prime(self, ctx: IndicatorContext):
+        self.window.extend(ctx.column('close')[-self.period:].tolist())
+
+    def update(self, bar):
+        self.window.append(bar['close'])
+        if len(self.window) < self.period:
+            return (NAN,)
+        return (sum(self.window) / self.period,)
+
+
+class _EMA:
+    """TA-Lib EMA: SMA seed, then prev + k * (x - prev)"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.k = 2.0 / (period + 1)
+        self.seed: List[float] = []
+        self.value: Optional[float] = None
+
+    def update(self, x: float) -> float:
+        if self.value is None:
+            self.seed.append(x)
+            if len(self.seed) < self.period:
+                return NAN
+            self.value = sum(self.seed) / self.period
+            self.seed = []
+            return self.value
+        self.value = (x - self.value) * self.k + self.value
+        return self.value
+
+
+class _EMAState:
+    def __init__(self, period: int, key: str):
+        self.keys = [key]
+        self.ema = _EMA(period)
+
+    def prime(self, ctx: IndicatorContext):
+        close = ctx.column('close')
+        values = ta_fallback.EMA(close, self.ema.period)
+        if len(close) >= self.ema.period:
+            self.ema.value = float(values[-1])
+        else:
+            self.ema.seed = close.tolist()
+
+    def update(self, bar):
+        return (self.ema.update(bar['close']),)
+
+
+class _WilderState:
+    """Shared RSI/ATR logic: seed with the mean of `period` inputs, then Wilder smoothing"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.seed: List[float] = []
+        self.value: Optional[float] = None
+
+    def update(self, x: float) -> float:
+        if self.value is None:
+            self.seed.append(x)
+            if len(self.seed) < self.period:
+                return NAN
+            self.value = sum(self.seed) / self.period
+            self.seed = []
+            return self.value
+        self.value = (self.value * (self.period - 1) + x) / self.period
+        return self.value
+
+
+class _RSIState:
+    def __init__(self, period: int, key: str):
+        self.period = period
+        self.keys = [key]
+        self.prev_close: Optional[float] = None
+        self.gain = _WilderState(period)
+        self.loss = _WilderState(period)
+
+    def prime(self, ctx: IndicatorContext):
+        close = ctx.column('close')
+        if len(close) == 0:
+            return
+        self.prev_close = float(close[-1])
+        diff = np.diff(close)
+        gains = np.where(diff > 0, diff, 0.0)
+        losses = np.where(diff < 0, -diff, 0.0)
+        if len(diff) >= self.period:
+            self.gain.value = float(ta_fallback._wilder(gains, self.period, 0)[-1])
+            self.loss.value = float(ta_fallback._wilder(losses, self.period, 0)[-1])
+        else:
+            self.gain.seed = gains.tolist()
+            self.loss.seed = losses.tolist()
+
+    def update(self, bar):
+        close = bar['close']
+        if self.prev_close is None:
+            self.prev_close = close
+            return (NAN,)
+        diff = close - self.prev_close
+        self.prev_close = close
+        gain = self.gain.update(diff if diff > 0 else 0.0)
+        loss = self.loss.update(-diff if diff < 0 else 0.0)
+        if math.isnan(gain):
+            return (NAN,)
+        total = gain + loss
+        return (0.0 if total == 0.0 else 100.0 * gain / total,)
+
+
+class _ATRState:
+    def __init__(self, period: int, key: str):
+        self.period = period
+        self.keys = [key]
+        self.prev_close: Optional[float] = None
+        self.atr = _WilderState(period)
+
+    def prime(self, ctx: IndicatorContext):
+        close = ctx.column('close')
+        if len(close) == 0:
+            return
+        self.prev_close = float(close[-1])
+        if self.period <= 1:
+            return
+        tr = ta_fallback.TRANGE(ctx.column('high'), ctx.column('low'), close)[1:]
+        if len(tr) >= self.period:
+            self.atr.value = float(ta_fallback._wilder(tr, self.period, 0)[-1])
+        else:
+            self.atr.seed = tr.tolist()
+
+    def update(self, bar):
+        prev = self.prev_close
+        self.prev_close = bar['close']
+        if prev is None:
+            return (NAN,)
+        tr = max(bar['high'], prev) - min(bar['low'], prev)
+        if self.period <= 1:
+            return (tr,)
+        return (self.atr.update(tr),)
+
+
+class _BBandsState:
+    def __init__(self, period: int, keys: List[str]):
+        self.period = period
+        self.keys = keys
+        self.window = deque(maxlen=period)
+
+    def prime(self, ctx: IndicatorContext):
+        self.window.extend(ctx.column('close')[-self.period:].tolist())
+
+    def update(self, bar):
+        self.window.append(bar['close'])
+        if len(self.window) < self.period:
+            return (NAN, NAN, NAN)
+        values = np.fromiter(self.window, dtype=np.float64, count=self.period)
+        middle = values.sum() / self.period
+        std = float(values.std()) if self.period > 1 else 0.0
+        if std * std < 1e-8:
+            std = 0.0
+        return (middle + 2.0 * std, middle, middle - 2.0 * std)
+
+
+class _MACDState:
+    """TA-Lib MACD: both EMAs start at index slow-1, outputs at slow+signal-2"""
+
+    def __init__(self, fast: int, slow: int, signal: int, keys: List[str]):
+        if slow < fast:
+            fast, slow = slow, fast
+        self.fast_period, self.slow_period = fast, slow
+        self.keys = keys
+        self.warmup: List[float] = []
+        self.fast: Optional[_EMA] = None
+        self.slow: Optional[_EMA] = None
+        self.signal = _EMA(signal)
+
+    def _start(self):
+        # Seed both EMAs from the first `slow` closes
+        self.fast = _EMA(self.fast_period)
+        self.slow = _EMA(self.slow_period)
+        self.fast.value = sum(self.warmup[-self.fast_period:]) / self.fast_period
+        self.slow.value = sum(self.warmup) / self.slow_period
+        self.warmup = []
+        return self.fast.value - self.slow.value
+
+    def prime(self, ctx: IndicatorContext):
+        close = ctx.column('close')
+        start = self.slow_period - 1
+        if len(close) <= start:
+            self.warmup = close.tolist()
+            return
+        fast = ta_fallback._ema_from(close, self.fast_period, start, 2.0 / (self.fast_period + 1))
+        slow = ta_fallback._ema_from(close, self.slow_period, start, 2.0 / (self.slow_period + 1))
+        self.fast, self.slow = _EMA(self.fast_period), _EMA(self.slow_period)
+        self.fast.value, self.slow.value = float(fast[-1]), float(slow[-1])
+        line = (fast - slow)[start:]
+        if len(line) >= self.signal.period:
+            signal = ta_fallback._ema_from(line, self.signal.period, self.signal.period - 1, self.signal.k)
+            self.signal.value = float(signal[-1])
+        else:
+            self.signal.seed = line.tolist()
+
+    def update(self, bar):
+        close = bar['close']
+        if self.fast is None:
+            self.warmup.append(close)
+            if len(self.warmup) < self.slow_period:
+                return (NAN, NAN, NAN)
+            line = self._start()
+        else:
+            line = self.fast.update(close) - self.slow.update(close)
+        signal = self.signal.update(line)
+        if math.isnan(signal):
+            return (NAN, NAN, NAN)
+        return (line, signal, line - signal)
+
+
+class _VWAPState:
+    """Session-anchored VWAP matching calculate_indicator_arrays('vwap')"""
+
+    def __init__(self, key: str, tz: str = 'America/New_York', anchor_time: str = '00:00'):
+        self.keys = [key]
+        self.tz = tz
+        self.anchor_time = anchor_time
+        self.group = None
+        self.cum_pv = 0.0
+        self.cum_vol = 0.0
+
+    def prime(self, ctx: IndicatorContext):
+        if len(ctx) == 0:
+            return
+        groups = ctx.session_groups(self.tz, self.anchor_time)
+        last = groups[-1]
+        start = len(groups) - int(np.argmax(groups[::-1] != last)) if (groups != last).any() else 0
+        close = ctx.column('close')[start:]
+        volume = ctx.column('volume')[start:]
+        self.group = int(last)
+        self.cum_pv = float(np.cumsum(close * volume)[-1])
+        self.cum_vol = float(np.cumsum(volume)[-1])
+
+    def update(self, bar):
+        if bar['_group'] != self.group:
+            self.group = bar['_group']
+            self.cum_pv = 0.0
+            self.cum_vol = 0.0
+        self.cum_pv += bar['close'] * bar['volume']
+        self.cum_vol += bar['volume']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (float(np.float64(self.cum_pv) / np.float64(self.cum_vol)),)
+
+
+def _build_state(indicator: str):
+    """State machine for one requested indicator name (None if unsupported)"""
+    name, params = parse_indicator_name(indicator)
+    period = params.get("period")
+    if name == "vwap":
+        return _VWAPState(indicator)
+    if name == "sma":
+        p = period or 20
+        return _SMAState(p, f"sma_{p}")
+    if name == "ema":
+        p = period or 21
+        return _EMAState(p, f"ema_{p}")
+    if name == "atr":
+        p = period or 14
+        return _ATRState(p, f"atr_{p}")
+    if name == "rsi":
+        p = period or 14
+        return _RSIState(p, f"rsi_{p}")
+    if name == "bbands":
+        p = period or 20
+        return _BBandsState(p, [f"bbands_upper_{p}", f"bbands_mid_{p}", f"bbands_lower_{p}"])
+    if name == "macd":
+        return _MACDState(12, 26, 9, ["macd_line", "macd_signal", "macd_histogram"])
+    return None
+
+
+# --- Sessions -----------------------------------------------------------------
+
+
+class IndicatorSession:
+    """Running state of one chart's indicators"""
+
+    def __init__(self, indicators: List[str]):
+        self.states = []
+        seen = set()
+        for indicator in indicators:
+            if indicator in seen:
+                continue
+            seen.add(indicator)
+            state = _build_state(indicator)
+            if state is not None:
+                self.states.append(state)
+        self.last_time: Optional[int] = None
+        # State before the last bar, so a re-sent forming bar can replace it
+        self._before_last = None
+        self.touched = time_module.monotonic()
+
+    def prime(self, df: pd.DataFrame):
+        """Load state from the window the client just computed in full"""
+        if df.empty:
+            return
+        ctx = IndicatorContext(df)
+        # Keep the state before the last bar too: prime on all but the last
+        # bar, snapshot, then feed the last bar incrementally
+        head_ctx = IndicatorContext(df.iloc[:-1])
+        for state in self.states:
+            state.prime(head_ctx)
+        self._before_last = copy.deepcopy(self.states)
+        self._apply(df.iloc[-1:], ctx_groups=self._groups(df.iloc[-1:]))
+        self.last_time = int(df['time'].iloc[-1])
+
+    def _groups(self, df: pd.DataFrame) -> Dict[Tuple[str, str], np.ndarray]:
+        ctx = IndicatorContext(df)
+        return {
+            (s.tz, s.anchor_time): ctx.session_groups(s.tz, s.anchor_time)
+            for s in self.states if isinstance(s, _VWAPState)
+        }
+
+    def _apply(self, df: pd.DataFrame, ctx_groups) -> Dict[str, List[float]]:
+        out: Dict[str, List[float]] = {key: [] for state in self.states for key in state.keys}
+        records = df[['time', 'open', 'high', 'low', 'close', 'volume']].astype(
+            {'open': float, 'high': float, 'low': float, 'close': float, 'volume': float}
+        ).to_dict('records')
+        # Validate the whole batch first so a rejected request leaves the state untouched
+        times = df['time'].to_numpy(dtype=np.int64)
+        if len(times) and ((self.last_time is not None and times[0] < self.last_time) or (np.diff(times) < 0).any()):
+            raise StaleBarError(f"Bars must be time-sorted and not older than the last bar ({self.last_time})")
+        for i, bar in enumerate(records):
+            bar_time = int(bar['time'])
+            if self.last_time is not None:
+                if bar_time == self.last_time:
+                    # Forming bar re-sent: roll back to the state before it
+                    self.states = copy.deepcopy(self._before_last)
+                else:
+                    self._before_last = copy.deepcopy(self.states)
+            for state in self.states:
+                if isinstance(state, _VWAPState):
+                    bar['_group'] = int(ctx_groups[(state.tz, state.anchor_time)][i])
+                for key, value in zip(state.keys, state.update(bar)):
+                    out[key].append(value)
+            self.last_time = bar_time
+        return out
+
+    def append(self, df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """Feed new bars (time-sorted) and return their indicator values"""
+        self.touched = time_module.monotonic()
+        values = self._apply(df, self._groups(df))
+        return {key: np.asarray(v, dtype=np.float64) for key, v in values.items()}
+
+
+class IndicatorSessionStore:
+    """Thread-safe handle -> IndicatorSession map with idle TTL and LRU cap"""
+
+    def __init__(self, ttl: float = SESSION_TTL, max_sessions: int = MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, IndicatorSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, indicators: List[str], df: pd.DataFrame) -> str:
+        session = IndicatorSession(indicators)
+        session.prime(df)
+        handle = uuid.uuid4().hex
+        with self._lock:
+            self._expire()
+            self._sessions[handle] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return handle
+
+    def get(self, handle: str) -> Optional[IndicatorSession]:
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(handle)
+            if session is not None:
+                self._sessions.move_to_end(handle)
+            return session
+
+    def _expire(self):
+        cutoff = time_module.monotonic() - self.ttl
+        while self._sessions:
+            handle, session = next(iter(self._sessions.items()))
+            if session.touched >= cutoff:
+                break
+            del self._sessions[handle]
+
+
+sessions = IndicatorSessionStore()
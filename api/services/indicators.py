@@ -2,17 +2,21 @@
 Indicator calculation service using pandas-ta
 """
 
+import numpy as np
 import pandas as pd
 from typing import Dict, List, Optional, Any
 
-# Optional talib import - not all environments have it installed
+from api.services.columnar import to_nullable_list
+
+# Optional talib import - not all environments have it installed.
+# Without it the NumPy implementations in ta_fallback (same API and results) are used.
 try:
     import talib
     TALIB_AVAILABLE = True
 except ImportError:
-    talib = None
+    from api.services import ta_fallback as talib
     TALIB_AVAILABLE = False
-    print("[Indicators] Warning: talib not installed. SMA, EMA, ATR, RSI, BBANDS, MACD indicators will not be available.")
+    print("[Indicators] Warning: talib not installed. Using NumPy implementations for SMA, EMA, ATR, RSI, BBANDS, MACD.")
 
 
 
@@ -49,6 +53,11 @@ AVAILABLE_INDICATORS = {
 }
 
 
+def _empty_series(df: pd.DataFrame) -> np.ndarray:
+    """All-missing output used when an indicator cannot be computed"""
+    return np.full(len(df), np.nan)
+
+
 def parse_indicator_name(indicator: str) -> tuple:
     """
     Parse indicator name with optional period
@@ -75,6 +84,69 @@ def calculate_indicator(df: pd.DataFrame, indicator: str) -> Dict[str, List[Opti
     
     Returns dict because some indicators return multiple series (e.g., bbands, macd)
     """
+    result = calculate_indicator_arrays(df, indicator)
+    
+    # Convert NaN to None for JSON serialization
+    return {key: to_nullable_list(values) for key, values in result.items()}
+
+
+class IndicatorContext:
+    """
+    Inputs shared by every indicator computed for one request.
+    
+    float64 price/volume arrays, the UTC -> local time conversion and the
+    session group keys are built once on first use and reused, so a chart
+    asking for 6-8 overlays does the conversions once instead of per indicator.
+    """
+    
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._columns: Dict[str, np.ndarray] = {}
+        self._local_times: Dict[str, pd.DatetimeIndex] = {}
+        self._session_groups: Dict[tuple, np.ndarray] = {}
+    
+    def __len__(self) -> int:
+        return len(self.df)
+    
+    def column(self, name: str) -> np.ndarray:
+        """Contiguous float64 copy of an OHLCV column"""
+        if name not in self._columns:
+            self._columns[name] = np.ascontiguousarray(self.df[name].to_numpy(dtype=np.float64))
+        return self._columns[name]
+    
+    def local_times(self, tz: str) -> pd.DatetimeIndex:
+        """Bar times ('time' = unix seconds) as naive wall-clock times in tz"""
+        if tz not in self._local_times:
+            utc = pd.to_datetime(self.df['time'].to_numpy(), unit='s', utc=True)
+            self._local_times[tz] = utc.tz_convert(tz).tz_localize(None)
+        return self._local_times[tz]
+    
+    def session_groups(self, tz: str, anchor_time: str) -> np.ndarray:
+        """
+        Session key per bar: the local date after shifting back by the
+        anchor time, so e.g. 18:00 T -> 17:59 T+1 is one session for an 18:00 anchor.
+        """
+        key = (tz, anchor_time)
+        if key not in self._session_groups:
+            h, m = map(int, anchor_time.split(':'))
+            offset = pd.Timedelta(hours=h, minutes=m)
+            shifted = self.local_times(tz) - offset
+            self._session_groups[key] = shifted.asi8 // (86400 * 10**9)
+        return self._session_groups[key]
+
+
+def calculate_indicator_arrays(
+    df: pd.DataFrame,
+    indicator: str,
+    context: Optional[IndicatorContext] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Calculate a single indicator and return as dict of float64 arrays (NaN = no value)
+    
+    Returns dict because some indicators return multiple series (e.g., bbands, macd)
+    Pass a shared IndicatorContext when computing several indicators on the same df.
+    """
+    ctx = context or IndicatorContext(df)
     name, params = parse_indicator_name(indicator)
     period = params.get("period")
     
@@ -83,56 +155,39 @@ def calculate_indicator(df: pd.DataFrame, indicator: str) -> Dict[str, List[Opti
     if name == "vwap":
         # Custom Anchored VWAP Implementation
         try:
-            df_copy = df.copy()
-            # Ensure time is datetime in UTC first (assuming input is unix seconds)
-            df_copy['dt'] = pd.to_datetime(df_copy['time'], unit='s', utc=True)
-            
             # Default to Eastern for session anchoring if not specified
             tz = params.get('timezone', 'America/New_York')
-            df_copy['dt_tz'] = df_copy['dt'].dt.tz_convert(tz)
             
             # Parse anchor time (e.g., "18:00" or default "09:30" or "00:00")
             anchor_time_str = params.get('anchor_time', '00:00')
-            h, m = map(int, anchor_time_str.split(':'))
-            
-            # Identify session changes
-            # A new session starts if time >= anchor_time AND previous time < anchor_time (crossing)
-            # OR if the date changes and we are past anchor time
-            # Simplest approach: Shift time by roughly (24 - anchor_hour) to align "start" to 00:00 local "virtual" time
-            # then group by date of this shifted time.
+            session_group = ctx.session_groups(tz, anchor_time_str)
             
-            # Offset logic: 
-            # If anchor is 18:00, we want 18:01 today to be same session as 17:59 tomorrow? No.
-            # 18:00 today starts the session for tomorrow.
-            # So 18:00 T -> 17:59 T+1 is one session.
-            # If we subtract 18 hours, 18:00 becomes 00:00. 
-            # 17:59 (next day) becomes 23:59 (prev day "session").
-            # So just subtracting the offset and taking the .date() works for grouping.
-            
-            offset = pd.Timedelta(hours=h, minutes=m)
-            df_copy['session_group'] = (df_copy['dt_tz'] - offset).dt.date
+            close = ctx.column('close')
+            volume = ctx.column('volume')
             
             # Helper for PV and P2V (Price * Price * Volume) for Variance
-            df_copy['pv'] = df_copy['close'] * df_copy['volume']
-            df_copy['p2v'] = df_copy['close'] * df_copy['close'] * df_copy['volume']
+            pv = close * volume
+            p2v = close * close * volume
             
             # Calculate cumulative sums per session
-            df_copy['cum_pv'] = df_copy.groupby('session_group')['pv'].cumsum()
-            df_copy['cum_vol'] = df_copy.groupby('session_group')['volume'].cumsum()
-            df_copy['cum_p2v'] = df_copy.groupby('session_group')['p2v'].cumsum()
+            cum_pv = pd.Series(pv).groupby(session_group).cumsum().to_numpy()
+            cum_vol = pd.Series(volume).groupby(session_group).cumsum().to_numpy()
             
             # Calculate VWAP
-            vwap_values = df_copy['cum_pv'] / df_copy['cum_vol']
-            result[indicator] = vwap_values.tolist()
+            with np.errstate(divide='ignore', invalid='ignore'):
+                vwap_values = cum_pv / cum_vol
+            result[indicator] = vwap_values
             
             # Calculate Bands if requested
             bands = params.get('bands', []) # List of multipliers e.g. [1.0, 2.0]
             if bands:
+                cum_p2v = pd.Series(p2v).groupby(session_group).cumsum().to_numpy()
                 # Variance = (CumP2V / CumVol) - (VWAP^2)
                 # Standard Deviation = sqrt(Variance)
-                variance = (df_copy['cum_p2v'] / df_copy['cum_vol']) - (vwap_values * vwap_values)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    variance = (cum_p2v / cum_vol) - (vwap_values * vwap_values)
                 # Ensure variance is non-negative (floating point errors)
-                variance = variance.clip(lower=0)
+                variance = np.where(variance < 0, 0.0, variance)
                 std_dev = variance ** 0.5
                 
                 for mult in bands:
@@ -142,87 +197,71 @@ def calculate_indicator(df: pd.DataFrame, indicator: str) -> Dict[str, List[Opti
                     upper_key = f"{indicator}_upper_{mult_str}"
                     lower_key = f"{indicator}_lower_{mult_str}"
                     
-                    result[upper_key] = (vwap_values + (std_dev * mult)).tolist()
-                    result[lower_key] = (vwap_values - (std_dev * mult)).tolist()
+                    result[upper_key] = vwap_values + (std_dev * mult)
+                    result[lower_key] = vwap_values - (std_dev * mult)
             
         except Exception as e:
             print(f"Error calculating Custom VWAP: {e}")
-            result[indicator] = [None] * len(df)
+            result[indicator] = _empty_series(df)
     
     elif name == "sma":
-        if not TALIB_AVAILABLE:
-            result[f"sma_{period or 20}"] = [None] * len(df)
-        else:
-            p = period or 20
-            values = talib.SMA(df['close'], timeperiod=p)
-            result[f"sma_{p}"] = values.tolist()
+        p = period or 20
+        result[f"sma_{p}"] = talib.SMA(ctx.column('close'), timeperiod=p)
     
     elif name == "ema":
-        if not TALIB_AVAILABLE:
-            result[f"ema_{period or 21}"] = [None] * len(df)
-        else:
-            p = period or 21
-            values = talib.EMA(df['close'], timeperiod=p)
-            result[f"ema_{p}"] = values.tolist()
+        p = period or 21
+        result[f"ema_{p}"] = talib.EMA(ctx.column('close'), timeperiod=p)
     
     elif name == "atr":
-        if not TALIB_AVAILABLE:
-            result[f"atr_{period or 14}"] = [None] * len(df)
-        else:
-            p = period or 14
-            values = talib.ATR(df['high'], df['low'], df['close'], timeperiod=p)
-            result[f"atr_{p}"] = values.tolist()
+        p = period or 14
+        result[f"atr_{p}"] = talib.ATR(ctx.column('high'), ctx.column('low'), ctx.column('close'), timeperiod=p)
     
     elif name == "rsi":
-        if not TALIB_AVAILABLE:
-            result[f"rsi_{period or 14}"] = [None] * len(df)
-        else:
-            p = period or 14
-            values = talib.RSI(df['close'], timeperiod=p)
-            result[f"rsi_{p}"] = values.tolist()
+        p = period or 14
+        result[f"rsi_{p}"] = talib.RSI(ctx.column('close'), timeperiod=p)
     
     elif name == "bbands":
-        if not TALIB_AVAILABLE:
-            p = period or 20
-            result[f"bbands_upper_{p}"] = [None] * len(df)
-            result[f"bbands_mid_{p}"] = [None] * len(df)
-            result[f"bbands_lower_{p}"] = [None] * len(df)
-        else:
-            p = period or 20
-            upper, middle, lower = talib.BBANDS(df['close'], timeperiod=p, nbdevup=2.0, nbdevdn=2.0, matype=0)
-            result[f"bbands_upper_{p}"] = upper.tolist()
-            result[f"bbands_mid_{p}"] = middle.tolist()
-            result[f"bbands_lower_{p}"] = lower.tolist()
+        p = period or 20
+        upper, middle, lower = talib.BBANDS(ctx.column('close'), timeperiod=p, nbdevup=2.0, nbdevdn=2.0, matype=0)
+        result[f"bbands_upper_{p}"] = upper
+        result[f"bbands_mid_{p}"] = middle
+        result[f"bbands_lower_{p}"] = lower
     
     elif name == "macd":
-        if not TALIB_AVAILABLE:
-            result["macd_line"] = [None] * len(df)
-            result["macd_signal"] = [None] * len(df)
-            result["macd_histogram"] = [None] * len(df)
-        else:
-            # MACD default: fast=12, slow=26, signal=9
-            fast = params.get("fast", 12)
-            slow = params.get("slow", 26)
-            signal = params.get("signal", 9)
-            macd, macdsignal, macdhist = talib.MACD(df['close'], fastperiod=fast, slowperiod=slow, signalperiod=signal)
-            result["macd_line"] = macd.tolist()
-            result["macd_signal"] = macdsignal.tolist()
-            result["macd_histogram"] = macdhist.tolist()
-    
-    # Convert NaN to None for JSON serialization
-    for key in result:
-        result[key] = [None if pd.isna(v) else v for v in result[key]]
+        # MACD default: fast=12, slow=26, signal=9
+        fast = params.get("fast", 12)
+        slow = params.get("slow", 26)
+        signal = params.get("signal", 9)
+        macd, macdsignal, macdhist = talib.MACD(ctx.column('close'), fastperiod=fast, slowperiod=slow, signalperiod=signal)
+        result["macd_line"] = macd
+        result["macd_signal"] = macdsignal
+        result["macd_histogram"] = macdhist
     
     return result
 
 
 def calculate_indicators(df: pd.DataFrame, indicators: List[str]) -> Dict[str, List[Optional[float]]]:
     """Calculate multiple indicators and return combined result"""
+    all_results = calculate_indicators_arrays(df, indicators)
+    return {key: to_nullable_list(values) for key, values in all_results.items()}
+
+
+def calculate_indicators_arrays(df: pd.DataFrame, indicators: List[str]) -> Dict[str, np.ndarray]:
+    """
+    Calculate multiple indicators in one batch and return combined float64 arrays.
+    All indicators share one IndicatorContext (inputs, time conversion,
+    session keys); a name requested twice is only computed once.
+    """
+    ctx = IndicatorContext(df)
     all_results = {}
+    done = set()
     
     for indicator in indicators:
+        if indicator in done:
+            continue
+        done.add(indicator)
         try:
-            result = calculate_indicator(df, indicator)
+            result = calculate_indicator_arrays(df, indicator, ctx)
             all_results.update(result)
         except Exception as e:
             print(f"Error calculating {indicator}: {e}")
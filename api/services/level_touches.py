@@ -0,0 +1,226 @@
+"""
+Level Touches - reference level touch times as integer minute arrays
+
+get_level_touches used to json.load {ticker}_level_touches.json and, for
+every date x level x session, split each "HH:MM" touch string and scan the
+list in Python to find the first hit inside the session range. The touch
+data is now also written (scripts/derived/precompute_level_touches.py) to
+data/{ticker}_level_touches.arrow, one row per date x level:
+
+- date        dictionary column; the dictionary holds every date in order,
+              including dates without levels
+- name        level name (pdh, p12m, asia_mid, ...)
+- level       level price (null if absent)
+- touched     touched flag as get_level_touches reports it (touched and a
+              non-empty touch list)
+- touches     touch times as minutes from midnight (list<int16>)
+- hit_{session}   first touch inside the session range (SESSION_RANGES),
+              minutes from midnight, -1 = none
+
+The hit columns are computed for all rows at once: touch minutes padded into
+a (rows x touches) matrix, sorted, tested against every session range and
+reduced with a masked argmax. The API memory-maps the file and only formats
+the hits; the file carries the fingerprint of the JSON it was built from
+and is ignored once the JSON changes (the JSON is then parsed with the same
+vectorized code).
+"""
+
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pyarrow as pa
+
+
+# Matches ranges in daily-levels.tsx (minutes, end exclusive; > 1440 = next day)
+SESSION_RANGES = {
+    'Asia':   (18*60, 26*60),  # 18:00 - 02:00 (next day)
+    'London': (26*60, 31*60),  # 02:00 - 07:00
+    'NY1':    (8*60,  12*60),  # 08:00 - 12:00
+    'NY2':    (12*60, 16*60),  # 12:00 - 16:00
+    'P12':    (6*60,  17*60),  # 06:00 - 17:00
+    'Daily':  (18*60, 41*60),  # 18:00 - 17:00 (next day)
+}
+
+NO_HIT = -1
+
+_FINGERPRINT_KEY = b"source_fingerprint"
+
+_LABELS = [f"{m // 60:02d}:{m % 60:02d}" for m in range(24 * 60)]
+
+
+def touches_path(data_dir: Path, ticker: str) -> Path:
+    return Path(data_dir) / f"{ticker}_level_touches.arrow"
+
+
+def _encode_fingerprint(fingerprint: Any) -> bytes:
+    return json.dumps(fingerprint, default=list).encode()
+
+
+def parse_times(times: List[str]) -> np.ndarray:
+    """
+    "HH:MM" strings -> minutes from midnight (int32, -1 where unparseable).
+    Fixed-width strings are decoded as character codes; anything else falls
+    back to int(h), int(m) like the original parser.
+    """
+    out = np.full(len(times), NO_HIT, dtype=np.int32)
+    if not times:
+        return out
+    # One spare character: a 6th code other than padding means a longer string
+    codes = np.array(times, dtype="U6").view(np.uint32).reshape(len(times), 6).astype(np.int64)
+    digits = np.delete(codes[:, :5], 2, axis=1) - ord("0")
+    fixed = (
+        (codes[:, 2] == ord(":"))
+        & (codes[:, 5] == 0)
+        & ((digits >= 0) & (digits <= 9)).all(axis=1)
+    )
+    out[fixed] = (digits[fixed, 0] * 10 + digits[fixed, 1]) * 60 + digits[fixed, 2] * 10 + digits[fixed, 3]
+    for i in np.flatnonzero(~fixed).tolist():
+        try:
+            h, m = map(int, times[i].split(':'))
+            out[i] = h * 60 + m
+        except Exception:
+            continue
+    return out
+
+
+def first_hits(offsets: np.ndarray, minutes: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    First (earliest) touch per row inside each session range.
+
+    offsets/minutes are a flattened list column (row i owns
+    minutes[offsets[i]:offsets[i+1]], -1 = invalid). A time belongs to a
+    range if start <= m < end, or if m + 1440 does for a range crossing
+    midnight. Returns {session: minutes per row, -1 = no hit}.
+    """
+    n_rows = len(offsets) - 1
+    lengths = np.diff(offsets)
+    width = int(lengths.max()) if n_rows else 0
+
+    # Padded (rows x width) matrix, padding/invalid = large so they sort last
+    pad = np.iinfo(np.int32).max
+    matrix = np.full((n_rows, width), pad, dtype=np.int32)
+    if width:
+        row_of = np.repeat(np.arange(n_rows), lengths)
+        col_of = np.arange(len(minutes)) - np.repeat(offsets[:-1], lengths)
+        matrix[row_of, col_of] = np.where(minutes >= 0, minutes, pad)
+        matrix.sort(axis=1)
+    present = matrix != pad
+
+    hits = {}
+    for session, (start, end) in SESSION_RANGES.items():
+        inside = present & (
+            ((matrix >= start) & (matrix < end))
+            | ((matrix < start) & (matrix + 1440 >= start) & (matrix + 1440 < end))
+        )
+        first = inside.argmax(axis=1) if width else np.zeros(n_rows, dtype=np.int64)
+        found = inside.any(axis=1) if width else np.zeros(n_rows, dtype=bool)
+        hits[session] = np.where(found, matrix[np.arange(n_rows), first] if width else NO_HIT, NO_HIT).astype(np.int16)
+    return hits
+
+
+def build_table(raw_data: Dict[str, Dict]) -> pa.Table:
+    """Touch table (see module docstring) from the level_touches JSON structure"""
+    dates = list(raw_data)
+    date_idx, names, levels, touched, all_times, counts = [], [], [], [], [], []
+    for d, day_levels in enumerate(raw_data.values()):
+        for level_name, level_data in day_levels.items():
+            if not isinstance(level_data, dict):
+                continue
+            times = level_data.get('touch_times') or []
+            hit = bool(level_data.get('touched', False)) and len(times) > 0
+            date_idx.append(d)
+            names.append(level_name)
+            levels.append(level_data.get('level'))
+            touched.append(hit)
+            # Untouched levels report no hits whatever their touch list says
+            counts.append(len(times) if hit else 0)
+            if hit:
+                all_times.extend(times)
+
+    minutes = parse_times(all_times)
+    offsets = np.zeros(len(counts) + 1, dtype=np.int32)
+    np.cumsum(counts, out=offsets[1:])
+    hits = first_hits(offsets, minutes)
+
+    columns = {
+        "date": pa.DictionaryArray.from_arrays(
+            pa.array(date_idx, type=pa.int32()), pa.array(dates, type=pa.string())
+        ),
+        "name": pa.array(names, type=pa.string()).dictionary_encode(),
+        "level": pa.array(levels, type=pa.float64()),
+        "touched": pa.array(touched, type=pa.bool_()),
+        "touches": pa.ListArray.from_arrays(
+            pa.array(offsets, type=pa.int32()), pa.array(minutes.astype(np.int16), type=pa.int16())
+        ),
+    }
+    for session, values in hits.items():
+        columns[f"hit_{session}"] = pa.array(values, type=pa.int16())
+    return pa.table(columns)
+
+
+def write_table(path: Path, fingerprint: Any, table: pa.Table) -> None:
+    """Write the touch table with the source JSON fingerprint; temp file + os.replace like arrow_cache"""
+    table = table.replace_schema_metadata({_FINGERPRINT_KEY: _encode_fingerprint(fingerprint)})
+    path = Path(path)
+    tmp_path = path.parent / f".{path.name}.{uuid.uuid4().hex}.tmp"
+    try:
+        with pa.OSFile(str(tmp_path), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def load_table(path: Path, fingerprint: Any) -> Optional[pa.Table]:
+    """Memory-map a touch table built from a JSON with this fingerprint (None if missing or stale)"""
+    path = Path(path)
+    if not path.exists():
+        return None
+    try:
+        reader = pa.ipc.open_file(pa.memory_map(str(path), "r"))
+        metadata = reader.schema.metadata or {}
+        if metadata.get(_FINGERPRINT_KEY) != _encode_fingerprint(fingerprint):
+            print(f"[LevelTouches] {path.name} is stale, ignoring it until rebuilt")
+            return None
+        return reader.read_all()
+    except Exception as e:
+        print(f"[LevelTouches] Failed to map {path.name}: {e}")
+        return None
+
+
+def to_payload(table: pa.Table) -> Dict[str, Dict]:
+    """
+    {date: {level_name: {'level', 'touched', 'hits': {session: "HH:MM"}}}},
+    first hit per session only, as served by /stats/level-touches
+    """
+    date_column = table.column("date").combine_chunks()
+    dates = date_column.dictionary.to_pylist()
+    date_idx = date_column.indices.to_numpy(zero_copy_only=False)
+    names = table.column("name").to_pylist()
+    levels = table.column("level").to_pylist()
+    touched = table.column("touched").to_pylist()
+    sessions = list(SESSION_RANGES)
+    hit_matrix = np.column_stack(
+        [table.column(f"hit_{s}").to_numpy() for s in sessions]
+    ) if len(table) else np.empty((0, len(sessions)), dtype=np.int16)
+
+    # Format only the hits that exist
+    rows, cols = np.nonzero(hit_matrix >= 0)
+    labels = [
+        _LABELS[m] if m < len(_LABELS) else f"{m // 60:02d}:{m % 60:02d}"
+        for m in hit_matrix[rows, cols].tolist()
+    ]
+    hits = [{} for _ in range(len(table))]
+    for r, c, label in zip(rows.tolist(), cols.tolist(), labels):
+        hits[r][sessions[c]] = label
+
+    out = {date: {} for date in dates}
+    for d, name, level, hit, row_hits in zip(date_idx.tolist(), names, levels, touched, hits):
+        out[dates[d]][name] = {'level': level, 'touched': hit, 'hits': row_hits}
+    return out
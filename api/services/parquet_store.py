@@ -0,0 +1,285 @@
+"""
+Parquet Store - canonical on-disk layout for OHLCV bar files
+
+`data/{ticker}_{tf}.parquet` is either a single file (what the download and
+fix scripts write) or a partitioned directory with the same name
+(scripts/data_processing/optimize_parquet_storage.py):
+
+    data/NQ1_1m.parquet/
+        2023.parquet
+        2024.parquet
+        2025.parquet
+
+Every partition is sorted by time and written with:
+- zstd compression
+- column statistics (min/max per row group, used for range pushdown)
+- fixed-size row groups (ROW_GROUP_SIZE rows)
+- an int64 'time' column in Unix seconds (the original index is preserved)
+
+pandas/pyarrow read the directory transparently (`pd.read_parquet(path)`),
+so readers do not care which layout a file uses. Writers should go through
+write_bars()/append_bars(): appends only rewrite the partitions that
+actually receive new rows instead of the whole history.
+"""
+
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+ROW_GROUP_SIZE = 65_536
+COMPRESSION = "zstd"
+COMPRESSION_LEVEL = 3
+
+# Partition label formats (strftime on the UTC bar time)
+PARTITION_FORMATS = {
+    "year": "%Y",
+    "month": "%Y-%m",
+}
+
+PathLike = Union[str, Path]
+
+
+def default_partitioning(path: PathLike) -> Optional[str]:
+    """
+    Pick a partitioning scheme from the file name.
+    Intraday files ({ticker}_1m, _5m, _1h ...) are split by year;
+    daily/weekly/monthly files are small and stay a single file.
+    """
+    stem = Path(path).name.replace(".parquet", "")
+    tf = stem.split("_")[-1] if "_" in stem else ""
+    if tf and tf[-1] in ("m", "h") and tf[:-1].isdigit():
+        return "year"
+    return None
+
+
+def bar_seconds(df: pd.DataFrame) -> np.ndarray:
+    """
+    UTC Unix seconds for every row of an OHLCV frame.
+    Prefers a DatetimeIndex (naive = UTC), then a 'time' epoch column
+    (ms/us/ns are scaled down), then a 'datetime'/'timestamp' column.
+    """
+    if isinstance(df.index, pd.DatetimeIndex):
+        idx = df.index if df.index.tz is None else df.index.tz_convert("UTC").tz_localize(None)
+        return idx.as_unit("ns").asi8 // 10**9
+
+    if "time" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["time"]):
+        values = df["time"].to_numpy(dtype="int64")
+        max_value = values.max() if len(values) else 0
+        if max_value > 1e16:
+            return values // 10**9
+        if max_value > 1e13:
+            return values // 10**6
+        if max_value > 1e10:
+            return values // 10**3
+        return values
+
+    for col in ("time", "datetime", "timestamp"):
+        if col in df.columns:
+            dt = pd.to_datetime(df[col], utc=True)
+            return dt.dt.tz_localize(None).astype("datetime64[ns]").to_numpy().astype("int64") // 10**9
+
+    raise ValueError("Frame has no DatetimeIndex or time/datetime/timestamp column")
+
+
+def _canonicalize(df: pd.DataFrame) -> pd.DataFrame:
+    """Sort by time, drop duplicate bars (last wins) and add/normalize 'time'"""
+    seconds = bar_seconds(df)
+    df = df.copy()
+    if df.index.name == "time":
+        # A DatetimeIndex named 'time' (download scripts) would clash with the
+        # 'time' column on reset_index (load_parquet)
+        df.index = df.index.rename("datetime")
+    df["time"] = seconds
+    order = np.argsort(seconds, kind="stable")
+    df = df.iloc[order]
+    df = df[~df["time"].duplicated(keep="last")]
+    return df
+
+
+def _match_index(df: pd.DataFrame, like: pd.DataFrame) -> pd.DataFrame:
+    """Give new rows the same kind of index as the stored rows before concatenating"""
+    if isinstance(like.index, pd.DatetimeIndex) and not isinstance(df.index, pd.DatetimeIndex):
+        df = df.copy()
+        index = pd.to_datetime(bar_seconds(df), unit="s")
+        if like.index.tz is not None:
+            index = index.tz_localize("UTC").tz_convert(like.index.tz)
+        df.index = pd.DatetimeIndex(index, name=like.index.name)
+    elif not isinstance(like.index, pd.DatetimeIndex) and isinstance(df.index, pd.DatetimeIndex):
+        df = _canonicalize(df).reset_index(drop=True)
+    return df
+
+
+def _partition_labels(seconds: np.ndarray, partition: str) -> np.ndarray:
+    fmt = PARTITION_FORMATS[partition]
+    return pd.to_datetime(seconds, unit="s").strftime(fmt).to_numpy()
+
+
+def _to_table(df: pd.DataFrame) -> pa.Table:
+    # A RangeIndex carries no information and would be wrong across partitions
+    preserve_index = not isinstance(df.index, pd.RangeIndex)
+    return pa.Table.from_pandas(df, preserve_index=preserve_index)
+
+
+def _write_file(df: pd.DataFrame, path: Path) -> None:
+    """Write one sorted partition atomically (hidden temp file + rename)"""
+    tmp_path = path.parent / f".{path.name}.{uuid.uuid4().hex}.tmp"
+    try:
+        pq.write_table(
+            _to_table(df),
+            tmp_path,
+            row_group_size=ROW_GROUP_SIZE,
+            compression=COMPRESSION,
+            compression_level=COMPRESSION_LEVEL,
+            write_statistics=True,
+        )
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def _remove(path: Path) -> None:
+    if path.is_dir():
+        shutil.rmtree(path)
+    elif path.exists():
+        path.unlink()
+
+
+def is_partitioned(path: PathLike) -> bool:
+    return Path(path).is_dir()
+
+
+def stored_partitioning(path: PathLike) -> Optional[str]:
+    """Partitioning scheme of an existing dataset (None for a single file or a missing path)"""
+    path = Path(path)
+    if not path.is_dir():
+        return None
+    names = [p.stem for p in path.glob("[!._]*.parquet")]
+    return "month" if any("-" in name for name in names) else "year"
+
+
+def read_bars(path: PathLike, **kwargs) -> pd.DataFrame:
+    """Read a bar file in either layout (kwargs go to pd.read_parquet)"""
+    return pd.read_parquet(path, **kwargs)
+
+
+def write_bars(df: pd.DataFrame, path: PathLike, partition: Optional[str] = "auto") -> Path:
+    """
+    Write (replace) a bar dataset in the canonical layout.
+
+    Args:
+        df: OHLCV frame with a DatetimeIndex and/or a 'time' column
+        path: data/{ticker}_{tf}.parquet
+        partition: "year", "month", None (single file) or "auto"
+
+    Returns:
+        The dataset path
+    """
+    path = Path(path)
+    if partition == "auto":
+        partition = default_partitioning(path)
+    df = _canonicalize(df)
+
+    if partition is None:
+        if path.is_dir():
+            shutil.rmtree(path)
+        _write_file(df, path)
+        return path
+
+    # Build the new directory next to the old one, then swap it in
+    staging = path.parent / f".{path.name}.{uuid.uuid4().hex}.staging"
+    staging.mkdir(parents=True)
+    try:
+        labels = _partition_labels(df["time"].to_numpy(), partition)
+        for label in pd.unique(labels):
+            _write_file(df[labels == label], staging / f"{label}.parquet")
+        backup = path.parent / f".{path.name}.{uuid.uuid4().hex}.old"
+        if path.exists():
+            os.replace(path, backup)
+        os.replace(staging, path)
+        _remove(backup)
+    finally:
+        if staging.exists():
+            shutil.rmtree(staging)
+    return path
+
+
+def append_bars(df: pd.DataFrame, path: PathLike, partition: Optional[str] = "auto") -> int:
+    """
+    Upsert bars into a dataset, rewriting only the partitions they fall in.
+    Rows whose time already exists are replaced by the new values.
+    A legacy single file (or a missing dataset) is rewritten in full.
+
+    Returns:
+        Number of partitions written
+    """
+    path = Path(path)
+    if partition == "auto":
+        partition = default_partitioning(path)
+    if df.empty:
+        return 0
+
+    if partition is None or not path.is_dir():
+        if path.exists():
+            existing = read_bars(path)
+            df = pd.concat([existing, _match_index(df, existing)])
+        write_bars(df, path, partition=partition)
+        return 1
+
+    new = _canonicalize(df)
+    labels = _partition_labels(new["time"].to_numpy(), partition)
+    partitions = sorted(path.glob("[!._]*.parquet"))
+    written = 0
+    for label in pd.unique(labels):
+        part_path = path / f"{label}.parquet"
+        chunk = new[labels == label]
+        if part_path.exists():
+            existing = pd.read_parquet(part_path)
+            chunk = pd.concat([existing, _match_index(chunk, existing)])
+        elif partitions:
+            # New partition - follow the layout of the newest stored one
+            chunk = _match_index(chunk, pd.read_parquet(partitions[-1]).iloc[:0])
+        _write_file(_canonicalize(chunk), part_path)
+        written += 1
+    return written
+
+
+def dataset_fingerprint(path: PathLike):
+    """
+    Change-detection fingerprint for either layout: (mtime_ns, size) for a
+    file, or (partition count, newest mtime_ns, total size) for a directory.
+    Returns None when the dataset does not exist.
+    """
+    path = Path(path)
+    try:
+        if path.is_dir():
+            count, newest, total = 0, 0, 0
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.name.startswith((".", "_")) or not entry.name.endswith(".parquet"):
+                        continue
+                    st = entry.stat()
+                    count += 1
+                    newest = max(newest, st.st_mtime_ns)
+                    total += st.st_size
+            return (count, newest, total)
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+
+def dataset_size(path: PathLike) -> int:
+    """Total bytes on disk for either layout"""
+    path = Path(path)
+    if path.is_dir():
+        return sum(p.stat().st_size for p in path.glob("*.parquet"))
+    return path.stat().st_size if path.exists() else 0
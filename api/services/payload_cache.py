@@ -0,0 +1,169 @@
+"""
+Payload Cache - final response bytes for file-backed JSON endpoints
+
+Static stats endpoints (HOD/LOD, range distribution, daily HOD/LOD, level
+stats, ...) used to json.load their file, re-encode it with orjson and let
+GZipMiddleware recompress it (level 9) on every request. Here the encoded
+JSON is built once per source file version and kept in three forms:
+
+- identity bytes
+- gzip (level 9, paid once)
+- brotli (quality 9, only when the optional `brotli` package is installed)
+
+respond() picks the best encoding the client accepts and sends it with
+Content-Encoding set, which GZipMiddleware passes through untouched, so a
+cached request costs a dict lookup and a socket write.
+
+- Keyed by (endpoint, ticker, ...) and checked against the source file
+  fingerprints (mtime/size), so a rewritten file is picked up on the next call
+- Memory bounded: LRU over the total size of all stored encodings
+  (PAYLOAD_CACHE_MAX_MB, default 256)
+"""
+
+import gzip
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+import orjson
+from fastapi import Request, Response
+
+from .http_cache import encoding_etag
+from .parquet_store import dataset_fingerprint
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+DEFAULT_MAX_BYTES = int(float(os.environ.get("PAYLOAD_CACHE_MAX_MB", "256")) * 1024 * 1024)
+
+# Bodies below this size are not worth compressing (matches GZipMiddleware)
+MIN_COMPRESS_SIZE = 1000
+
+
+class EncodedPayload:
+    """One JSON body in every available Content-Encoding"""
+
+    def __init__(self, body: bytes):
+        self.bodies: Dict[str, bytes] = {"identity": body}
+        if len(body) >= MIN_COMPRESS_SIZE:
+            self.bodies["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.bodies["br"] = brotli.compress(body, quality=9)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(b) for b in self.bodies.values())
+
+
+def _accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    accepted = {}
+    for part in accept_encoding.split(","):
+        fields = [f.strip() for f in part.split(";")]
+        if not fields[0]:
+            continue
+        q = 1.0
+        for param in fields[1:]:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        accepted[fields[0].lower()] = q
+    return accepted
+
+
+def choose_encoding(payload: EncodedPayload, accept_encoding: Optional[str]) -> str:
+    """Best stored encoding for an Accept-Encoding header (br > gzip > identity on ties)"""
+    accepted = _accepted_encodings(accept_encoding or "")
+    best, best_q = "identity", 0.0
+    for encoding in ("br", "gzip"):
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if encoding in payload.bodies and q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class PayloadCache:
+    """Thread-safe LRU of EncodedPayloads with a byte budget and fingerprint checks"""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[Any, EncodedPayload]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_build(self, key: Hashable, paths: Iterable[Path], build: Callable[[], Any]) -> EncodedPayload:
+        """
+        Cached payload for key if its source files are unchanged, otherwise
+        build() -> JSON-serializable data, encoded and stored.
+        Exceptions from build() propagate and nothing is cached.
+        """
+        fingerprint = tuple(dataset_fingerprint(Path(p)) if Path(p).exists() else None for p in paths)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == fingerprint:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        payload = EncodedPayload(orjson.dumps(build(), option=orjson.OPT_SERIALIZE_NUMPY))
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1].nbytes
+            if payload.nbytes <= self.max_bytes:
+                self._entries[key] = (fingerprint, payload)
+                self._bytes += payload.nbytes
+                while self._bytes > self.max_bytes:
+                    _, (_, evicted) = self._entries.popitem(last=False)
+                    self._bytes -= evicted.nbytes
+                    self.evictions += 1
+        return payload
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "brotli": brotli is not None,
+            }
+
+
+def respond(request: Request, payload: EncodedPayload, headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Response with the best encoding for the request. `headers` (e.g. the
+    validators set by http_cache.conditional) are copied; the ETag gets a
+    per-encoding suffix so each representation keeps a distinct strong tag.
+    """
+    encoding = choose_encoding(payload, request.headers.get("accept-encoding"))
+    out = {k: v for k, v in (headers or {}).items() if k.lower() != "content-length"}
+    if encoding != "identity":
+        # GZipMiddleware adds Vary itself to the identity responses it sees
+        out["Content-Encoding"] = encoding
+        out["Vary"] = "Accept-Encoding"
+    etag = out.pop("etag", None) or out.pop("ETag", None)
+    if etag:
+        out["ETag"] = encoding_etag(etag, encoding)
+    return Response(content=payload.bodies[encoding], media_type="application/json", headers=out)
+
+
+payloads = PayloadCache()
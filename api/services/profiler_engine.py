@@ -0,0 +1,389 @@
+"""
+Profiler Engine - vectorized session stats and first-break detection
+
+Computes the per (trading date x session) profiler records that
+ProfilerService.analyze_profiler_stats falls back to when no precomputed
+JSON exists (and that scripts/derived/precompute_profiler.py writes).
+
+Instead of label-slicing every window and walking bars with iterrows, all
+windows of all days are taken as integer row ranges from the ticker's
+SessionIndex (status/broken windows with one searchsorted per boundary),
+flattened into one gathered array, and reduced per window:
+
+- range high/low (+ first bar reaching them), open/close, prior close
+- status: first bar above the range high / below the range low. The first
+  of the two decides Long/Short True; the other one (if it comes later)
+  turns it False. Both on the same bar: bar open below the bar's midpoint
+  means the high went first (Long False), otherwise Short False
+- broken: first bar trading through the range mid after the status window
+
+A session whose boundary does not exist or is ambiguous on its date
+(DST changes) is skipped, as before.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from api.services.session_index import (
+    NS_PER_DAY, NS_PER_MINUTE, NS_PER_SECOND, TRADING_DAY_START,
+    SessionIndex, date_strings, isoformat, localize, to_local
+)
+
+
+# Trading day sessions - windows (start/end) come from session_index.WINDOWS
+# Asia starts at 18:00 on (trading_date - 1 day)
+# London/NY sessions are on the actual trading_date
+# skip_broken: NY2 has no broken window since trading ends at 17:00
+SESSIONS = [
+    {"name": "Asia",   "next_start": "02:30", "skip_broken": False},
+    {"name": "London", "next_start": "07:30", "skip_broken": False},
+    {"name": "NY1",    "next_start": "11:30", "skip_broken": False},
+    {"name": "NY2",    "next_start": "17:00", "skip_broken": True},
+]
+
+
+def hhmm(local_ns: np.ndarray) -> List[str]:
+    """'%H:%M' of local times"""
+    minute = (local_ns % NS_PER_DAY) // NS_PER_MINUTE
+    return [f"{m // 60:02d}:{m % 60:02d}" for m in minute.tolist()]
+
+
+class Segments:
+    """
+    Row ranges [lo, hi) of many windows flattened into one position array,
+    so per-window reductions run as single NumPy calls.
+    """
+
+    def __init__(self, lo: np.ndarray, hi: np.ndarray):
+        self.lo = lo
+        self.lengths = np.maximum(hi - lo, 0)
+        self.n = len(lo)
+        self.starts = np.concatenate(([0], np.cumsum(self.lengths)[:-1])) if self.n else np.zeros(0, dtype=np.int64)
+        total = int(self.lengths.sum())
+        self.segment = np.repeat(np.arange(self.n), self.lengths)
+        self.rows = np.arange(total) - np.repeat(self.starts - lo, self.lengths)
+
+    def gather(self, values: np.ndarray) -> np.ndarray:
+        return values[self.rows]
+
+    def first_true(self, mask: np.ndarray) -> np.ndarray:
+        """Row of the first True per window (argmax semantics), -1 if none"""
+        out = np.full(self.n, -1, dtype=np.int64)
+        hits = np.flatnonzero(mask)
+        if len(hits):
+            windows, first = np.unique(self.segment[hits], return_index=True)
+            out[windows] = self.rows[hits[first]]
+        return out
+
+    def reduce(self, ufunc, values: np.ndarray) -> np.ndarray:
+        """ufunc.reduceat per non-empty window (NaN for empty ones)"""
+        out = np.full(self.n, np.nan)
+        nonempty = self.lengths > 0
+        if nonempty.any():
+            out[nonempty] = ufunc.reduceat(values, self.starts[nonempty])
+        return out
+
+
+def first_breaks(
+    open_: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    lo: np.ndarray,
+    hi: np.ndarray,
+    range_high: np.ndarray,
+    range_low: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Status per window from the first cross of range_high / range_low.
+    Returns (status labels as object array, row of the deciding bar or -1).
+    """
+    seg = Segments(lo, hi)
+    bar_high = seg.gather(high)
+    bar_low = seg.gather(low)
+    first_high = seg.first_true(bar_high > range_high[seg.segment])
+    first_low = seg.first_true(bar_low < range_low[seg.segment])
+
+    status = np.full(seg.n, 'None', dtype=object)
+    row = np.full(seg.n, -1, dtype=np.int64)
+
+    has_high = first_high >= 0
+    has_low = first_low >= 0
+
+    same = has_high & has_low & (first_high == first_low)
+    high_first = has_high & ~same & (~has_low | (first_high < first_low))
+    low_first = has_low & ~same & (~has_high | (first_low < first_high))
+
+    # High first: Long True, turned False by the later low break
+    status[high_first] = 'Long True'
+    row[high_first] = first_high[high_first]
+    reversed_ = high_first & has_low
+    status[reversed_] = 'Long False'
+    row[reversed_] = first_low[reversed_]
+
+    status[low_first] = 'Short True'
+    row[low_first] = first_low[low_first]
+    reversed_ = low_first & has_high
+    status[reversed_] = 'Short False'
+    row[reversed_] = first_high[reversed_]
+
+    # Both on one bar: open below the bar mid -> went up first
+    if same.any():
+        r = first_high[same]
+        bar_mid = (high[r] + low[r]) / 2
+        status[same] = np.where(open_[r] < bar_mid, 'Long False', 'Short False')
+        row[same] = r
+
+    return status, row
+
+
+def compute_profiler_sessions(df: pd.DataFrame, days: int, index: Optional[SessionIndex] = None) -> List[Dict]:
+    """
+    Profiler records for the last `days` trading dates of a 1m frame indexed
+    by a sorted tz-aware DatetimeIndex (ProfilerService._load_df), sorted by
+    start_time. `index` is the frame's SessionIndex (built if not given).
+    """
+    if index is None:
+        index = SessionIndex.build(df.index)
+    tz = df.index.tz
+    utc_ns = index.utc_ns
+    local_ns = df.index.tz_localize(None).asi8 if tz is not None else utc_ns
+    open_ = df['open'].to_numpy(dtype=np.float64)
+    high = df['high'].to_numpy(dtype=np.float64)
+    low = df['low'].to_numpy(dtype=np.float64)
+    close = df['close'].to_numpy(dtype=np.float64)
+
+    targets = slice(max(len(index.dates) - days, 0), None)
+    dates = index.dates[targets]
+    if len(dates) == 0:
+        return []
+
+    # Data from 2 calendar days before the first target date onward
+    slice_start = pd.Timestamp(np.datetime64(int(dates[0]), 'D')) - pd.Timedelta(days=2)
+    if tz:
+        slice_start = slice_start.tz_localize(tz)
+    first_row = int(np.searchsorted(utc_ns, slice_start.value, side='left'))
+
+    def rows_between(start_utc, end_utc):
+        lo, hi = index.rows(start_utc, end_utc)
+        lo = np.maximum(lo, first_row)
+        return lo, np.maximum(hi, lo)
+
+    per_session = []
+    for sess in SESSIONS:
+        window = {key: values[targets] for key, values in index.window(sess['name']).items()}
+        status_end = localize(index.wall_times(sess['next_start'])[targets], tz)
+        reset = localize(index.wall_times('18:00')[targets], tz)
+        reset = np.where(reset <= status_end, reset + NS_PER_DAY, reset)
+
+        # Sessions with a nonexistent/ambiguous boundary are skipped
+        valid = window['exact'] & (status_end >= 0) & (reset >= 0) & (window['hi'] > window['lo'])
+        idx = np.flatnonzero(valid)
+        start, end = window['start'][idx], window['end'][idx]
+        status_end, reset = status_end[idx], reset[idx]
+        lo, hi = np.maximum(window['lo'][idx], first_row), window['hi'][idx]
+
+        # Session range
+        seg = Segments(lo, hi)
+        range_high = seg.reduce(np.fmax, seg.gather(high))
+        range_low = seg.reduce(np.fmin, seg.gather(low))
+        high_row = seg.first_true(seg.gather(high) == range_high[seg.segment])
+        low_row = seg.first_true(seg.gather(low) == range_low[seg.segment])
+        mid = (range_high + range_low) / 2
+
+        # Prior close: last bar at or before the session start, within 24h
+        prior = np.searchsorted(utc_ns, start, side='right') - 1
+        has_prior = (prior >= first_row) & ((start - utc_ns[np.maximum(prior, 0)]) < 24 * 3600 * NS_PER_SECOND)
+        prior_close = np.where(has_prior, close[np.maximum(prior, 0)], open_[lo])
+
+        # Status window [end, status_end) and broken window [status_end, reset)
+        status_lo, status_hi = rows_between(end, status_end)
+        status, status_row = first_breaks(open_, high, low, status_lo, status_hi, range_high, range_low)
+
+        if sess.get('skip_broken', False):
+            broken_row = np.full(len(idx), -1, dtype=np.int64)
+        else:
+            broken_lo, broken_hi = rows_between(status_end, reset)
+            bseg = Segments(broken_lo, broken_hi)
+            broken_row = bseg.first_true(
+                (bseg.gather(low) <= mid[bseg.segment]) & (bseg.gather(high) >= mid[bseg.segment])
+            )
+
+        per_session.append({
+            "sess": sess, "date": dates[idx], "lo": lo, "hi": hi,
+            "start": start, "end": end,
+            "range_high": range_high, "range_low": range_low, "mid": mid,
+            "high_row": high_row, "low_row": low_row, "prior_close": prior_close,
+            "status": status, "status_row": status_row, "broken_row": broken_row,
+        })
+
+    # Strings/ints for every referenced bar are formatted in one pass
+    def bar_iso(rows):
+        r = np.maximum(rows, 0)
+        return isoformat(utc_ns[r], local_ns[r], tz is not None)
+
+    def bar_hhmm(rows):
+        return hhmm(local_ns[np.maximum(rows, 0)])
+
+    records = {}
+    for block in per_session:
+        sess = block["sess"]
+        date_strs = date_strings(block["date"])
+        start_iso = isoformat(block["start"], to_local(block["start"], tz), tz is not None)
+        end_iso = isoformat(block["end"], to_local(block["end"], tz), tz is not None)
+        high_times = bar_hhmm(block["high_row"])
+        low_times = bar_hhmm(block["low_row"])
+        status_times = bar_iso(block["status_row"])
+        broken_times = bar_hhmm(block["broken_row"])
+
+        for i in range(len(date_strs)):
+            sess_open = float(open_[block["lo"][i]])
+            high_v = block["range_high"][i]
+            low_v = block["range_low"][i]
+            sess_close = float(close[block["hi"][i] - 1])
+            status_row = int(block["status_row"][i])
+            broken_row = int(block["broken_row"][i])
+            high_row = int(block["high_row"][i])
+            low_row = int(block["low_row"][i])
+
+            records[(date_strs[i], sess["name"])] = {
+                "date": date_strs[i],
+                "session": sess["name"],
+                "open": sess_open,
+                "prior_close": float(block["prior_close"][i]),
+                "range_high": float(high_v),
+                "range_low": float(low_v),
+                "mid": float(block["mid"][i]),
+                "high_time": high_times[i],
+                "low_time": low_times[i],
+                "high_pct": round(((high_v - sess_open) / sess_open) * 100, 2) if sess_open > 0 else 0,
+                "low_pct": round(((low_v - sess_open) / sess_open) * 100, 2) if sess_open > 0 else 0,
+                "close_pct": round(((sess_close - sess_open) / sess_open) * 100, 2) if sess_open > 0 else 0,
+                "status": block["status"][i],
+                "status_time": status_times[i] if status_row >= 0 else None,
+                "broken": broken_row >= 0,
+                "broken_time": broken_times[i] if broken_row >= 0 else None,
+                "broken_ts": int(utc_ns[broken_row] // NS_PER_SECOND) if broken_row >= 0 else None,
+                "start_time": start_iso[i],
+                "start_ts": int(block["start"][i] // NS_PER_SECOND),
+                "end_time": end_iso[i],
+                "end_ts": int(block["end"][i] // NS_PER_SECOND),
+                "high_ts": int(utc_ns[high_row] // NS_PER_SECOND),
+                "low_ts": int(utc_ns[low_row] // NS_PER_SECOND),
+                "status_ts": int(utc_ns[status_row] // NS_PER_SECOND) if status_row >= 0 else None,
+            }
+
+    # Same order as the per-day loop (date, then session definition order)
+    order = {sess["name"]: k for k, sess in enumerate(SESSIONS)}
+    collected = [records[key] for key in sorted(records, key=lambda k: (k[0], order[k[1]]))]
+    collected.sort(key=lambda x: x['start_time'])
+    return collected
+
+
+# Chained O/U anchors of the composite path (V24), in minutes from the session
+# start: (window start, window end, anchors bars from this minute on)
+# Asia O/U 0-90 -> London (540+), London O/U 510-570 -> NY AM (810+),
+# NY AM O/U 840-930 -> NY PM (1080+)
+OU_ANCHORS = [(0, 90, 540), (510, 570, 810), (840, 930, 1080)]
+
+
+def _nanmedian_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    np.nanmedian(matrix, axis=1) for rows with at least one value, without
+    its per-row Python fallback: NaN-free rows go through one np.median
+    call, the others through one sort (NaN sorts last)
+    """
+    out = np.empty(len(matrix))
+    has_nan = np.isnan(matrix).any(axis=1)
+    if not has_nan.all():
+        out[~has_nan] = np.median(matrix[~has_nan], axis=1)
+    if has_nan.any():
+        ordered = np.sort(matrix[has_nan], axis=1)
+        n = (~np.isnan(ordered)).sum(axis=1)
+        lower = np.take_along_axis(ordered, ((n - 1) // 2)[:, None], axis=1)[:, 0]
+        upper = np.take_along_axis(ordered, (n // 2)[:, None], axis=1)[:, 0]
+        out[has_nan] = (lower + upper) / 2
+    return out
+
+
+def composite_path(
+    utc_s: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    starts: np.ndarray,
+    opens: np.ndarray,
+    first_anchors: np.ndarray,
+    duration_seconds: int,
+    bucket_minutes: int = 1
+) -> Optional[Tuple[np.ndarray, ...]]:
+    """
+    Median/extreme normalized high/low paths of many sessions at once.
+
+    Every session's bars in [start, start + duration) are scattered into one
+    (n_sessions x n_minutes) matrix (NaN where a session has no bar), each
+    bar normalized against its anchor: first_anchors (prior close) until the
+    chained O/U mids of OU_ANCHORS take over. Buckets of bucket_minutes
+    columns are then reduced along the session axis with nanmedian / nanmax /
+    nanmin (medians via _nanmedian_rows). Assumes at most one bar per session and minute (1m data).
+
+    Returns (time_idx, median_high, max_high, median_low, min_low) over the
+    buckets any session has bars in, or None if no session has bars.
+    """
+    lo = np.searchsorted(utc_s, starts, side='left')
+    hi = np.searchsorted(utc_s, starts + duration_seconds, side='left')
+    seg = Segments(lo, hi)
+    if len(seg.rows) == 0:
+        return None
+
+    n_minutes = -(-duration_seconds // 60)
+    n_minutes = -(-n_minutes // bucket_minutes) * bucket_minutes
+    minute = (utc_s[seg.rows] - starts[seg.segment]) // 60
+    highs = np.full((seg.n, n_minutes), np.nan)
+    lows = np.full((seg.n, n_minutes), np.nan)
+    highs[seg.segment, minute] = high[seg.rows]
+    lows[seg.segment, minute] = low[seg.rows]
+
+    # Per-session anchor of each column range: prior close, then the chained O/U mids
+    bounds = [0]
+    anchors = [first_anchors.astype(np.float64)]
+    for start, end, anchored_from in OU_ANCHORS:
+        if anchored_from >= n_minutes:
+            continue
+        ou_mid = opens.astype(np.float64)
+        if start < n_minutes:
+            ou_high = np.fmax.reduce(highs[:, start:min(end, n_minutes)], axis=1)
+            ou_low = np.fmin.reduce(lows[:, start:min(end, n_minutes)], axis=1)
+            ou_mid = np.where(np.isnan(ou_high), ou_mid, (ou_high + ou_low) / 2.0)
+        bounds.append(anchored_from)
+        anchors.append(ou_mid)
+    bounds.append(n_minutes)
+
+    # Normalize in place: ((price - anchor) / anchor) * 100
+    for (a, b), anchor in zip(zip(bounds[:-1], bounds[1:]), anchors):
+        anchor = anchor[:, None]
+        for matrix in (highs, lows):
+            block = matrix[:, a:b]
+            block -= anchor
+            block /= anchor
+            block *= 100
+    norm_high, norm_low = highs, lows
+
+    # (sessions x buckets x bucket_minutes) -> (buckets, sessions * bucket_minutes)
+    n_buckets = n_minutes // bucket_minutes
+    counts = np.bincount(minute // bucket_minutes, minlength=n_buckets)
+    present = np.flatnonzero(counts)
+
+    def by_bucket(matrix):
+        cells = matrix.reshape(seg.n, n_buckets, bucket_minutes)[:, present, :]
+        return cells.transpose(1, 0, 2).reshape(len(present), -1)
+
+    bucket_high = by_bucket(norm_high)
+    bucket_low = by_bucket(norm_low)
+    return (
+        present * bucket_minutes,
+        _nanmedian_rows(bucket_high),
+        np.nanmax(bucket_high, axis=1),
+        _nanmedian_rows(bucket_low),
+        np.nanmin(bucket_low, axis=1),
+    )
@@ -4,19 +4,33 @@ import pandas as pd
 import numpy as np
 import json
 from datetime import datetime, timedelta, time as dt_time
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Union
 from api.services.session_service import SessionService
 import time
 from pathlib import Path
 from api.services.data_loader import DATA_DIR
+from api.services import service_cache
+from api.services.bar_store import file_fingerprint
+from api.services.profiler_engine import composite_path, compute_profiler_sessions
+from api.services.session_bitmap import SessionBitmap
+from api.services.session_store import SessionStore
+from api.services import filter_cube
+from api.services import level_touches
+from api.services.filter_cube import FilterCube
+from api.services import arrow_cache
+from api.services import session_index
 
 class ProfilerService:
-    _cache = {}
-    _json_cache = {} # Cache the loaded JSON data too
-    _price_model_cache = {}
-    _level_touches_cache = {}
-    _daily_hod_lod_cache = {}
-    _filtered_stats_cache = {} # Cache for filtered stats results
+    # Bounded, fingerprint-checked caches (see service_cache, SERVICE_CACHE_LIMITS)
+    _cache = service_cache.namespace("profiler_frames", max_entries=4, max_mb=2048)
+    _json_cache = service_cache.namespace("profiler_sessions", max_entries=16, max_mb=512) # Cache the loaded JSON data too
+    _price_model_cache = service_cache.namespace("price_model", max_entries=512, max_mb=128)
+    _level_touches_cache = service_cache.namespace("level_touches", max_entries=16, max_mb=256)
+    _daily_hod_lod_cache = service_cache.namespace("daily_hod_lod", max_entries=16, max_mb=128)
+    _filtered_stats_cache = service_cache.namespace("filtered_stats", max_entries=1024, max_mb=256) # Cache for filtered stats results
+    _session_bitmap_cache = service_cache.namespace("session_bitmap", max_entries=16, max_mb=256)
+    # Cubes are memory-mapped (page cache, shared by workers), so they cost no budget
+    _filter_cube_cache = service_cache.namespace("filter_cube", max_entries=16, max_mb=64, sizeof=lambda cube: 0)
     
     @staticmethod
     def _normalize_ticker(ticker: str) -> str:
@@ -32,6 +46,16 @@ class ProfilerService:
         }
         return aliases.get(clean, clean)
 
+    @staticmethod
+    def _fingerprint(ticker: str, *files: str) -> tuple:
+        """Change-detection fingerprint of data/{ticker}_{file} sources"""
+        return file_fingerprint(*(DATA_DIR / f"{ticker}_{name}" for name in files))
+
+    @staticmethod
+    def _sessions_fingerprint(ticker: str) -> tuple:
+        # Sessions come from the precomputed JSON, or are computed from 1m bars
+        return ProfilerService._fingerprint(ticker, "profiler.json", "1m.parquet")
+
     @staticmethod
     def clear_cache(ticker: str = None):
         """Clear the in-memory cache. If ticker is specified, only clear that ticker."""
@@ -41,316 +65,123 @@ class ProfilerService:
             ProfilerService._json_cache.pop(ticker, None)
             ProfilerService._level_touches_cache.pop(ticker, None)
             ProfilerService._daily_hod_lod_cache.pop(ticker, None)
+            ProfilerService._session_bitmap_cache.pop(ticker, None)
+            ProfilerService._filter_cube_cache.pop(ticker, None)
             
-            # Clear price model cache for this ticker key prefix
-            keys = [k for k in ProfilerService._price_model_cache.keys() if k[0] == ticker]
-            for k in keys:
-                ProfilerService._price_model_cache.pop(k, None)
+            # Clear price model / filtered stats caches for this ticker key prefix
+            ProfilerService._price_model_cache.invalidate(lambda k: k[0] == ticker)
+            ProfilerService._filtered_stats_cache.invalidate(lambda k: k[0] == ticker)
         else:
             ProfilerService._cache.clear()
             ProfilerService._json_cache.clear()
             ProfilerService._price_model_cache.clear()
             ProfilerService._level_touches_cache.clear()
             ProfilerService._daily_hod_lod_cache.clear()
+            ProfilerService._filtered_stats_cache.clear()
+            ProfilerService._session_bitmap_cache.clear()
+            ProfilerService._filter_cube_cache.clear()
         return {"cleared": ticker or "all"}
 
 
     @staticmethod
-    def analyze_profiler_stats(ticker: str, days: int = 50, force: bool = False) -> Dict:
+    def session_store(ticker: str) -> Optional[SessionStore]:
         """
-        Get Profiler Stats.
-        PRIORITY 1: Pre-computed JSON file (Instant)
-        PRIORITY 2: Calculate from Parquet (Slow first time, cached df)
+        Full precomputed session history as typed columns (see session_store).
+        Memory cache, else the Arrow copy (data/cache/arrow/{ticker}_profiler.arrow),
+        else parsed from {ticker}_profiler.json. None when there is no readable JSON.
         """
-        start_time = time.time()
-        
-        # --- PATH CHECK ---
         ticker = ProfilerService._normalize_ticker(ticker)
-        from api.services.data_loader import DATA_DIR
         json_path = DATA_DIR / f"{ticker}_profiler.json"
-        
-        # 1. Try Loading Pre-computed JSON (if not forced)
-        if json_path.exists() and not force:
-            # Check memory cache first
-            if ticker in ProfilerService._json_cache:
-                all_sessions = ProfilerService._json_cache[ticker]
-            else:
-                try:
-                    with open(json_path, 'r') as f:
-                        all_sessions = json.load(f)
-                    ProfilerService._json_cache[ticker] = all_sessions
-                except Exception as e:
-                    print(f"Error reading JSON: {e}")
-                    all_sessions = None
-            
-            if all_sessions:
-                # Filter by days
-                # Assuming all_sessions is sorted by time (script sorts it)
-                # We need to find the cut-off date.
-                # Since it's a list of dicts, and we want "last N days".
-                # We can roughly estimate or filter by date string.
-                
-                # Get unique dates from the sessions
-                # This is slightly expensive if list is huge, but much faster than pandas logic
-                # Optimization: Just take the last N * 4 sessions (approx) -> inaccurate if missing days
-                # Better: Filter properly.
-                
-                # Optimized Filter:
-                # 1. Get last session date
-                if not all_sessions: return {"sessions": [], "metadata": {}}
-                
-                last_sess = all_sessions[-1]
-                last_date = datetime.fromisoformat(last_sess['start_time']).date()
-                cutoff_date = last_date - timedelta(days=days)
-                cutoff_iso = cutoff_date.isoformat()
-                
-                # Filter
-                # sessions are sorted by start_time.
-                # binary search would be ideal, but linear scan from end is fine for now
-                filtered_sessions = []
-                for s in reversed(all_sessions):
-                    if s['start_time'] < cutoff_iso: # Rough comparison works for ISO strings
-                        break
-                    filtered_sessions.append(s)
-                
-                filtered_sessions.reverse()
-                
-                elapsed = time.time() - start_time
-                return {
-                    "sessions": filtered_sessions,
-                    "metadata": {
-                        "ticker": ticker,
-                        "days": days,
-                        "count": len(filtered_sessions),
-                        "source": "precomputed_json",
-                        "elapsed_seconds": round(elapsed, 4)
-                    }
-                }
+        if not json_path.exists():
+            return None
 
+        sessions_fp = ProfilerService._sessions_fingerprint(ticker)
+        store = ProfilerService._json_cache.get(ticker, fingerprint=sessions_fp)
+        if store is not None:
+            return store
 
-        # 2. Fallback to Calculation (Original Logic)
-        # ... (Previous implementation below, kept as fallback)
-        
+        name = f"{ticker}_profiler"
+        file_fp = ProfilerService._fingerprint(ticker, "profiler.json")
+        frame = arrow_cache.load_frame(name, file_fp)
+        if frame is not None:
+            store = SessionStore.from_frame(frame)
+        else:
+            try:
+                with open(json_path, 'r') as f:
+                    store = SessionStore.from_records(json.load(f))
+            except Exception as e:
+                print(f"Error reading JSON: {e}")
+                return None
+            if store.persistable():
+                # Serve from the shared memory-mapped copy from now on
+                frame = arrow_cache.store_frame(name, file_fp, store.to_frame())
+                if frame is not None:
+                    store = SessionStore.from_frame(frame)
+
+        ProfilerService._json_cache.put(ticker, store, sessions_fp)
+        return store
+
+    @staticmethod
+    def _calculate_sessions(ticker: str, days: int):
+        """Sessions of the last `days` days computed from 1m bars (SessionStore), or an error dict"""
         # Load Data (with Cache)
         df = ProfilerService._load_df(ticker)
         
         if df is None or df.empty:
             return {"error": f"Data file for {ticker} not found or empty"}
         
-        # ... (Rest of the calculation logic)
-        # For brevity in this edit, I will call the internal method _calculate_from_df
-        # But to be safe with this 'write_to_file', I must include the logic or it breaks.
-        # I'll paste the optimized logic I wrote in the previous step.
+        # All days and sessions in one vectorized pass (see profiler_engine)
+        collected_stats = compute_profiler_sessions(df, days, session_index.for_ticker(ticker, df.index))
+        store = SessionStore.from_records(collected_stats)
         
-        sessions_def = [
-            # Trading day sessions - all should share the same trading_date
-            # Asia starts at 18:00 on (trading_date - 1 day)
-            # London/NY sessions are on the actual trading_date
-            # skip_broken: NY2 has no broken window since trading ends at 17:00
-            {"name": "Asia",   "start": "18:00", "end": "19:30", "next_start": "02:30", "day_offset_start": -1, "day_offset_end": -1, "skip_broken": False}, 
-            {"name": "London", "start": "02:30", "end": "03:30", "next_start": "07:30", "day_offset_start": 0, "day_offset_end": 0, "skip_broken": False},
-            {"name": "NY1",    "start": "07:30", "end": "08:30", "next_start": "11:30", "day_offset_start": 0, "day_offset_end": 0, "skip_broken": False},
-            {"name": "NY2",    "start": "11:30", "end": "12:30", "next_start": "17:00", "day_offset_start": 0, "day_offset_end": 0, "skip_broken": True}, 
-        ]
+        # --- UPDATE IN-MEMORY CACHE ONLY ---
+        ProfilerService._json_cache.put(ticker, store, ProfilerService._sessions_fingerprint(ticker))
+        return store
 
-        # Get unique calendar dates and derive trading dates
-        # Trading date = the date on which the session ENDS (i.e., 18:00 on Dec 3 → trading date Dec 4)
-        from datetime import time as dt_time
-        
-        def get_trading_date(ts):
-            """Get trading date: if time >= 18:00, it belongs to next calendar day's trading session"""
-            if ts.time() >= dt_time(18, 0):
-                return (ts.date() + timedelta(days=1))
-            return ts.date()
-        
-        # Get unique trading dates from the data
-        trading_dates = sorted(list(set(get_trading_date(ts) for ts in df.index)))
-        target_dates = trading_dates[-days:]
+    @staticmethod
+    def _sessions(ticker: str, days: int):
+        """Sessions of the last `days` days as a SessionStore (precomputed first), or an error dict"""
+        ticker = ProfilerService._normalize_ticker(ticker)
+        store = ProfilerService.session_store(ticker)
+        if store is not None and len(store):
+            return store.take(slice(store.cutoff_row(days), None))
+        return ProfilerService._calculate_sessions(ticker, days)
+
+    @staticmethod
+    def analyze_profiler_stats(ticker: str, days: int = 50, force: bool = False) -> Dict:
+        """
+        Get Profiler Stats.
+        PRIORITY 1: Pre-computed JSON file (Instant)
+        PRIORITY 2: Calculate from Parquet (Slow first time, cached df)
+        """
+        start_time = time.time()
         
-        if target_dates:
-            # Need to include data from previous calendar day for Asia session
-            slice_start = pd.Timestamp(target_dates[0]) - timedelta(days=2)
-            if df.index.tz:
-                 slice_start = slice_start.tz_localize(df.index.tz)
-            df_slice = df.loc[slice_start:] 
-        else:
-            df_slice = df
+        # --- PATH CHECK ---
+        ticker = ProfilerService._normalize_ticker(ticker)
         
-        tz = df.index.tz
-        collected_stats = []
-
-        for trading_date in target_dates:
-            trading_date_str = trading_date.strftime('%Y-%m-%d')
-            
-            for sess in sessions_def:
-                # Calculate session start/end based on trading date and offsets
-                sess_cal_date_start = trading_date + timedelta(days=sess['day_offset_start'])
-                sess_cal_date_end = trading_date + timedelta(days=sess['day_offset_end'])
-                
-                start_naive = pd.Timestamp(f"{sess_cal_date_start.strftime('%Y-%m-%d')} {sess['start']}")
-                end_naive = pd.Timestamp(f"{sess_cal_date_end.strftime('%Y-%m-%d')} {sess['end']}")
-
-                
-                try:
-                    start_ts = start_naive.tz_localize(tz)
-                    end_ts = end_naive.tz_localize(tz)
-                except: continue
-
-                try:
-                    sess_data = df_slice.loc[start_ts : end_ts - timedelta(seconds=1)]
-                except KeyError: continue
-                
-                if sess_data.empty: continue
-                
-                # Basic price data
-                sess_open = float(sess_data.iloc[0]['open'])
-                high = sess_data['high'].max()
-                low = sess_data['low'].min()
-                mid = (high + low) / 2
-                
-                # Prior Close (for V14/V24 anchoring)
-                # Find the close of the bar exactly before start_ts
-                prior_close = sess_open # Fallback
-                try:
-                    prior_bar_idx = df_slice.index.get_indexer([start_ts], method='pad')[0]
-                    if prior_bar_idx >= 0:
-                        # Ensure we don't pick a bar from a completely different day if there's a huge gap
-                        # Pad finds the nearest previous. If it's 10 mins before, it's fine.
-                        prior_ts = df_slice.index[prior_bar_idx]
-                        if (start_ts - prior_ts) < timedelta(hours=24):
-                            prior_close = float(df_slice.iloc[prior_bar_idx]['close'])
-                except:
-                    pass
-                # Time when high/low occurred
-                high_idx = sess_data['high'].idxmax()
-                low_idx = sess_data['low'].idxmin()
-                high_time = high_idx.strftime('%H:%M') if pd.notna(high_idx) else None
-                low_time = low_idx.strftime('%H:%M') if pd.notna(low_idx) else None
-                
-                # Percentage from open
-                high_pct = round(((high - sess_open) / sess_open) * 100, 2) if sess_open > 0 else 0
-                low_pct = round(((low - sess_open) / sess_open) * 100, 2) if sess_open > 0 else 0
-                
-                # Close % (Path)
-                sess_close = float(sess_data.iloc[-1]['close'])
-                close_pct = round(((sess_close - sess_open) / sess_open) * 100, 2) if sess_open > 0 else 0
-                
-                mon_start = end_ts
-                next_start_time = sess['next_start']
-                
-                # For next_start calculation: Asia's next_start (02:30) is on the trading_date
-                # All other sessions' next_start is also on the trading_date  
-                if sess['name'] == 'Asia':
-                    # Asia ends at 19:30 on (trading_date - 1), next_start 02:30 is on trading_date
-                    mon_end_day = trading_date
-                else:
-                    # London/NY: next_start is on the same trading_date
-                    mon_end_day = trading_date
-                
-                mon_end_naive = pd.Timestamp(f"{mon_end_day.strftime('%Y-%m-%d')} {next_start_time}")
-                try: status_end = mon_end_naive.tz_localize(tz)
-                except: continue
-
-                reset_time_naive = pd.Timestamp(f"{trading_date.strftime('%Y-%m-%d')} 18:00")
-                try: reset_time = reset_time_naive.tz_localize(tz)
-                except: continue
-                
-                if reset_time <= status_end: reset_time += timedelta(days=1)
-                broken_start = status_end
-                broken_end = reset_time
-
-                try: status_data = df_slice.loc[mon_start : status_end - timedelta(seconds=1)]
-                except KeyError: status_data = pd.DataFrame()
-                
-                status = 'None'
-                triggered_side = None
-                status_time = None
-                status_ts = None
-                
-                if not status_data.empty:
-                    for ts, row in status_data.iterrows():
-                        h, l = row['high'], row['low']
-                        # Current bar checks
-                        broke_high = h > high
-                        broke_low = l < low
-                        
-                        if triggered_side is None:
-                            if broke_high and broke_low:
-                                # Both broken on same bar - infer direction from bar open
-                                # If open is closer to low, assume went up first (Long False)
-                                # If open is closer to high, assume went down first (Short False)
-                                bar_open = row['open']
-                                bar_mid = (h + l) / 2
-                                if bar_open < bar_mid:
-                                    status = 'Long False'  # Started low, went up first
-                                else:
-                                    status = 'Short False'  # Started high, went down first
-                                triggered_side = 'Both'
-                                status_time = ts.isoformat()
-                                status_ts = int(ts.timestamp())
-                                break
-                            elif broke_high:
-                                triggered_side = 'High'; status = 'Long True'; status_time = ts.isoformat(); status_ts = int(ts.timestamp())
-                            elif broke_low:
-                                triggered_side = 'Low'; status = 'Short True'; status_time = ts.isoformat(); status_ts = int(ts.timestamp())
-                        else:
-                            if triggered_side == 'High':
-                                if broke_low:
-                                    status = 'Long False'; status_time = ts.isoformat(); status_ts = int(ts.timestamp()); break 
-                            elif triggered_side == 'Low':
-                                if broke_high:
-                                    status = 'Short False'; status_time = ts.isoformat(); status_ts = int(ts.timestamp()); break
-
-                try: broken_data = df_slice.loc[broken_start : broken_end - timedelta(seconds=1)]
-                except KeyError: broken_data = pd.DataFrame()
-                
-                broken = False
-                broken_time = None
-                
-                # Skip broken calculation for sessions with no broken window (e.g., NY2 - trading ends at 17:00)
-                if not sess.get('skip_broken', False) and not broken_data.empty:
-                    break_mask = (broken_data['low'] <= mid) & (broken_data['high'] >= mid)
-                    if break_mask.any():
-                        broken = True
-                        broken_idx = break_mask.idxmax()
-                        broken_time = broken_idx.strftime('%H:%M')
-                        broken_ts = int(broken_idx.timestamp())
-                    else:
-                        broken_ts = None
-                else:
-                    broken_ts = None
-
-                collected_stats.append({
-                    "date": trading_date_str,
-                    "session": sess['name'],
-                    "open": sess_open,
-                    "prior_close": prior_close,
-                    "range_high": float(high),
-                    "range_low": float(low),
-                    "mid": float(mid),
-                    "high_time": high_time,
-                    "low_time": low_time,
-                    "high_pct": high_pct,
-                    "low_pct": low_pct,
-                    "close_pct": close_pct,
-                    "status": status,
-                    "status_time": status_time,
-                    "broken": broken,
-                    "broken_time": broken_time,
-                    "broken_ts": broken_ts,
-                    "start_time": start_ts.isoformat(),
-                    "start_ts": int(start_ts.timestamp()),
-                    "end_time": end_ts.isoformat(),
-                    "end_ts": int(end_ts.timestamp()),
-                    "high_ts": int(high_idx.timestamp()) if pd.notna(high_idx) else None,
-                    "low_ts": int(low_idx.timestamp()) if pd.notna(low_idx) else None,
-                    "status_ts": status_ts
-                })
+        # 1. Try the pre-computed history (if not forced)
+        store = None if force else ProfilerService.session_store(ticker)
+        if store is not None and len(store):
+            # Last N days: sessions are sorted by start_time, so one binary search
+            filtered_sessions = store.records(slice(store.cutoff_row(days), None))
+            
+            elapsed = time.time() - start_time
+            return {
+                "sessions": filtered_sessions,
+                "metadata": {
+                    "ticker": ticker,
+                    "days": days,
+                    "count": len(filtered_sessions),
+                    "source": "precomputed_json",
+                    "elapsed_seconds": round(elapsed, 4)
+                }
+            }
 
-        collected_stats.sort(key=lambda x: x['start_time'])
-        
-        # --- UPDATE IN-MEMORY CACHE ONLY ---
-        ProfilerService._json_cache[ticker] = collected_stats
+        # 2. Fallback to Calculation
+        store = ProfilerService._calculate_sessions(ticker, days)
+        if isinstance(store, dict):
+            return store
+        collected_stats = store.records()
         
         elapsed = time.time() - start_time
 
@@ -386,260 +217,162 @@ class ProfilerService:
             2. Extreme (Max High/Min Low)
         """
         # 1. Get filtered sessions first to know which dates/times to aggregate
-        stats_result = ProfilerService.analyze_profiler_stats(ticker, days)
-        if "error" in stats_result: return stats_result
-        
-        all_sessions = stats_result.get("sessions", [])
-        
-        # Filter for target session and outcome
-        target_sessions = [
-            s for s in all_sessions 
-            if s['session'] == session_name and 
-            (outcome_name == "Any" or 
-             s['status'] == outcome_name or 
-             (outcome_name == "Long" and "Long" in s['status']) or 
-             (outcome_name == "Short" and "Short" in s['status']))
-        ]
-        
-        # Strict filter for exact outcome string match (e.g. "Short False") if passed
-        filtered = [s for s in target_sessions if s['status'] == outcome_name] if " " in outcome_name else target_sessions
+        store = ProfilerService._sessions(ticker, days)
+        if isinstance(store, dict): return store
+        
+        # Filter for target session and outcome (decided once per distinct status)
+        def outcome_matches(status: str) -> bool:
+            if " " in outcome_name:
+                # Strict filter for exact outcome string match (e.g. "Short False")
+                return status == outcome_name
+            return (outcome_name == "Any" or status == outcome_name or
+                    (outcome_name == "Long" and "Long" in status) or
+                    (outcome_name == "Short" and "Short" in status))
+        
+        status_ok = np.array([outcome_matches(c) for c in store.categories('status')] + [False], dtype=bool)
+        rows = np.flatnonzero(store.equals('session', session_name) & status_ok[store.codes('status')])
+        filtered = store.take(rows)
         
         print(f"[DEBUG] Calculating Price Model for {ticker} {session_name} {outcome_name}")
         
-        if not filtered:
+        if not len(filtered):
              return {"median": [], "extreme": [], "count": 0}
 
         return ProfilerService.generate_composite_path(ticker, filtered, duration_hours=7.0)
 
     @staticmethod
-    def generate_composite_path(ticker: str, sessions: List[Dict], duration_hours: float = 7.0, bucket_minutes: int = 1) -> Dict:
+    def generate_composite_path(ticker: str, sessions: Union[List[Dict], SessionStore], duration_hours: float = 7.0, bucket_minutes: int = 1) -> Dict:
         """
-        Generic method to generate composite price paths from a list of sessions.
-        OPTIMIZED: Uses searchsorted and integer slicing for high performance.
+        Generic method to generate composite price paths from a list of sessions
+        (dicts or SessionStore rows).
+        Vectorized: all sessions are gathered into one (sessions x minutes)
+        matrix and reduced per minute (profiler_engine.composite_path).
         Supports aggregation into larger buckets (e.g. 5 min, 15 min).
         """
         start_time = time.time()
         
-        # ... validation ...
-        # (lines 364-453 unchanged)
+        if not isinstance(sessions, SessionStore):
+            sessions = SessionStore.from_records(sessions)
+
+        model = ProfilerService._composite_model(ticker, sessions, duration_hours, bucket_minutes)
+        if "error" in model:
+            return model
+        
+        print(f"[DEBUG] Composite Path Gen Time: {time.time() - start_time:.2f}s (Processed {len(sessions)} sessions)")
+        return ProfilerService._composite_result(model)
+
+    @staticmethod
+    def _composite_model(ticker: str, sessions: SessionStore, duration_hours: float, bucket_minutes: int) -> Dict:
+        """
+        Composite path arrays of generate_composite_path before formatting:
+        count, base_minute (US/Eastern minute of day of the first session, for
+        labels), time_idx and median/extreme high/low per bucket
+        """
+        empty = {
+            "count": 0, "base_minute": None, "time_idx": np.empty(0, dtype=np.int64),
+            "median_high": np.empty(0), "extreme_high": np.empty(0),
+            "median_low": np.empty(0), "extreme_low": np.empty(0),
+        }
 
         # 1. Load 1-minute DataFrame (Cached)
         df = ProfilerService._load_df(ticker)
         
         if df is None: return {"error": "Data not loaded"}
 
-        # 2. Prepare Timestamps & Validate
-        # Ensure timestamps match DataFrame timezone
+        # 2. Session start times (UTC seconds) & Validate
         tz = df.index.tz
-        
-        start_ts_list = []
-        for s in sessions:
-            ts = pd.Timestamp(s['start_time'])
+        starts = np.zeros(len(sessions), dtype=np.int64)
+        has_ts = sessions.valid('start_ts')
+        starts[has_ts] = sessions.column('start_ts')[has_ts]
+        for i in np.flatnonzero(~has_ts).tolist():
+            ts = pd.Timestamp(sessions.value('start_time', i))
             # Ensure timezone matches
             if ts.tz is None and tz is not None:
                 ts = ts.tz_localize(tz)
-            elif ts.tz is not None and tz is not None and ts.tz != tz:
-                ts = ts.tz_convert(tz)
-            start_ts_list.append(ts)
-        
-        # Bounds check
-        min_idx_ts = df.index[0]
-        max_idx_ts = df.index[-1]
-        
-        valid_sessions = []
-        valid_starts = []
-        
-        for i, ts in enumerate(start_ts_list):
-            end_t = ts + pd.Timedelta(hours=duration_hours)
-            if ts >= min_idx_ts and end_t <= max_idx_ts:
-                valid_sessions.append(sessions[i])
-                valid_starts.append(ts)
-                
-        if not valid_starts:
-             return {"median": [], "extreme": [], "count": 0}
+            starts[i] = int(ts.timestamp())
 
-        # 3. Vectorized Lookup (Fast Slicing)
-        # Find integer positions for all start and end times
-        start_locs = df.index.searchsorted(valid_starts)
-        
-        end_ts_list = [ts + pd.Timedelta(hours=duration_hours) for ts in valid_starts]
-        end_locs = df.index.searchsorted(end_ts_list)
-        
-        # 4. Extract Data Arrays (Optimized: NumPy)
-        all_time_idxs = []
-        all_norm_highs = []
-        all_norm_lows = []
-        
-        # Pre-fetch numpy arrays (Zero Copy views)
-        np_high = df['high'].values
-        np_low = df['low'].values
-        
         # Use absolute Unix seconds for the index (converts US/Eastern -> UTC Unix)
-        np_ts_unix = df.index.astype('int64').to_numpy() // 10**9
+        np_ts_unix = df.index.asi8 // 10**9
+        duration_seconds = int(duration_hours * 3600)
 
-        for i, (start_idx, end_idx) in enumerate(zip(start_locs, end_locs)):
-            # Bounds check for searchsorted results
-            if start_idx >= len(df) or end_idx > len(df) or start_idx >= end_idx:
-                continue
-                
-            sess_open = valid_sessions[i]['open']
-            if sess_open is None or sess_open <= 0: continue
-            
-            # Use the integer Unix timestamps from our pre-converted array
-            base_ts_unix = int(valid_starts[i].timestamp())
-            
-            # Slicing numpy array using Unix seconds
-            # Use searchsorted on the Unix array
-            start_idx_val = np.searchsorted(np_ts_unix, base_ts_unix)
-            end_ts_unix = base_ts_unix + int(duration_hours * 3600)
-            end_idx_val = np.searchsorted(np_ts_unix, end_ts_unix)
-            
-            if start_idx_val >= end_idx_val: continue
-            
-            chunk_ts_unix = np_ts_unix[start_idx_val:end_idx_val]
-            chunk_high = np_high[start_idx_val:end_idx_val]
-            chunk_low = np_low[start_idx_val:end_idx_val]
-            
-            # Vectorized time delta calculation in minutes
-            time_deltas_m = (chunk_ts_unix - base_ts_unix) // 60
-            
-            # Use Prior Close as the initial anchor (V14/V24 Gap Logic)
-            sess_anchor = valid_sessions[i].get('prior_close') or sess_open
-            if sess_anchor is None or sess_anchor <= 0: continue
-            
-            # V24 Logic: Chained Session O/U Anchors
-            # 1. Asia O/U (18:00-19:30) -> Mins 0-90. Anchors London (540+)
-            # 2. London O/U (02:30-03:30) -> Mins 510-570. Anchors NY AM (810+)
-            # 3. NY AM O/U (08:00-09:30) -> Mins 840-930. Anchors NY PM (1080+)
-            
-            # (Already extracted above)
+        # Bounds check
+        in_bounds = (starts >= np_ts_unix[0]) & (starts + duration_hours * 3600 <= np_ts_unix[-1])
+        valid_rows = np.flatnonzero(in_bounds)
+        if not len(valid_rows):
+             return empty
+
+        # Sessions need an open, and Prior Close as the initial anchor (V14/V24 Gap Logic)
+        opens = sessions.floats('open')[valid_rows]
+        prior_close = sessions.floats('prior_close')[valid_rows]
+        has_prior = sessions.valid('prior_close')[valid_rows] & (prior_close != 0)
+        first_anchors = np.where(has_prior, prior_close, opens)
+        usable = (opens > 0) & (first_anchors > 0)
+
+        # 3-5. All sessions in one (sessions x minutes) matrix (see profiler_engine)
+        path = composite_path(
+            np_ts_unix, df['high'].to_numpy(dtype=np.float64), df['low'].to_numpy(dtype=np.float64),
+            starts[in_bounds][usable], opens[usable], first_anchors[usable],
+            duration_seconds, bucket_minutes
+        )
+        if path is None:
+            return empty
+        time_idxs, med_high, max_high, med_low, min_low = path
+        
+        # Base time for labels
+        base_minute = None
+        try:
+            # Parse start time from first session to get base hours/minutes
+            s_ts = pd.Timestamp(sessions.value('start_time', int(valid_rows[0])))
             
-            # Calculate O/U Mids for this specific session instance
-            asia_ou_mid = sess_open # Fallback
-            lon_ou_mid  = sess_open # Fallback
-            ny_ou_mid   = sess_open # Fallback
+            # FORCE US/Eastern for labels to avoid UTC drift in display
+            if s_ts.tz is not None:
+                s_ts = s_ts.tz_convert('US/Eastern')
             
-            # Asia O/U Mid
-            mask_asia = (time_deltas_m >= 0) & (time_deltas_m < 90)
-            if mask_asia.any():
-                h, l = chunk_high[mask_asia], chunk_low[mask_asia]
-                if len(h) > 0: asia_ou_mid = (h.max() + l.min()) / 2.0
-                
-            # London O/U Mid
-            mask_lon = (time_deltas_m >= 510) & (time_deltas_m < 570)
-            if mask_lon.any():
-                h, l = chunk_high[mask_lon], chunk_low[mask_lon]
-                if len(h) > 0: lon_ou_mid = (h.max() + l.min()) / 2.0
-                
-            # NY AM O/U Mid
-            mask_ny = (time_deltas_m >= 840) & (time_deltas_m < 930)
-            if mask_ny.any():
-                h, l = chunk_high[mask_ny], chunk_low[mask_ny]
-                if len(h) > 0: ny_ou_mid = (h.max() + l.min()) / 2.0
+            base_minute = s_ts.hour * 60 + s_ts.minute
+        except Exception as e:
+            print(f"[DEBUG] Label format error: {e}")
 
-            # Apply Dynamic Anchors (V24 Chain)
-            anchors = np.full(len(chunk_ts_unix), sess_anchor)
-            
-            # London (03:00+) -> Asia O/U Mid
-            anchors[time_deltas_m >= 540] = asia_ou_mid
-            # NY AM (07:30+) -> London O/U Mid
-            anchors[time_deltas_m >= 810] = lon_ou_mid
-            # NY PM (12:00+) -> NY AM O/U Mid
-            anchors[time_deltas_m >= 1080] = ny_ou_mid
-            
-            norm_high = ((chunk_high - anchors) / anchors) * 100
-            norm_low = ((chunk_low - anchors) / anchors) * 100
-            
-            # Bucketing Logic
-            if bucket_minutes > 1:
-                time_idxs = (time_deltas_m // bucket_minutes) * bucket_minutes
-            else:
-                time_idxs = time_deltas_m
-                
-            all_time_idxs.append(time_idxs)
-            all_norm_highs.append(norm_high)
-            all_norm_lows.append(norm_low)
+        return {
+            "count": len(sessions), "base_minute": base_minute, "time_idx": time_idxs,
+            "median_high": med_high, "extreme_high": max_high,
+            "median_low": med_low, "extreme_low": min_low,
+        }
 
-        if not all_time_idxs:
-            return {"median": [], "extreme": [], "count": 0}
+    @staticmethod
+    def _composite_result(model: Dict) -> Dict:
+        """Format composite path arrays (_composite_model / filter cube) as the API response"""
+        # Buckets come out in time order
+        time_idxs = np.asarray(model["time_idx"])
+        labels = [""] * len(time_idxs)
+        if model["base_minute"] is not None:
+            labels = [f"{m // 60:02d}:{m % 60:02d}" for m in ((model["base_minute"] + time_idxs) % 1440).tolist()]
 
-        # 5. Concatenate (Fast)
-        cat_time = np.concatenate(all_time_idxs)
-        cat_high = np.concatenate(all_norm_highs)
-        cat_low = np.concatenate(all_norm_lows)
-        
-        # Create SINGLE DataFrame for GroupBy
-        combined = pd.DataFrame({
-            'time_idx': cat_time,
-            'norm_high': cat_high,
-            'norm_low': cat_low
-        })
-        
-        # Group by bucketed minute offset and calculate median/extreme
-        stats = combined.groupby('time_idx').agg({
-            'norm_high': ['median', 'max'],
-            'norm_low':  ['median', 'min']
-        })
-        
-        # 6. Format Output
         avg_path = []
         ext_path = []
-        
-        # Helper to format time
-        base_dt = None
-        if valid_sessions:
-            try:
-                # Parse start time from first session to get base hours/minutes
-                # Parse start time from first session to get base hours/minutes
-                from datetime import datetime, timedelta
-                s_ts = pd.Timestamp(valid_sessions[0]['start_time'])
-                
-                # FORCE US/Eastern for labels to avoid UTC drift in display
-                if s_ts.tz is not None:
-                    s_ts = s_ts.tz_convert('US/Eastern')
-                
-                base_dt = s_ts.replace(year=2000, month=1, day=1) # Normalize date
-            except Exception as e:
-                print(f"[DEBUG] Label format error: {e}")
-                pass
-
-        # Using sorted index ensures time order
-        for time_idx in sorted(stats.index):
-            # Access using MultiIndex columns
-            row = stats.loc[time_idx]
-            
-            # ('col', 'stat') lookup
-            avg_h = row[('norm_high', 'median')]
-            max_h = row[('norm_high', 'max')]
-            avg_l = row[('norm_low', 'median')]
-            min_l = row[('norm_low', 'min')]
-            
-            # Calculate time string
-            time_str = ""
-            if base_dt:
-                curr_dt = base_dt + timedelta(minutes=int(time_idx))
-                time_str = curr_dt.strftime("%H:%M")
-
+        for time_idx, time_str, avg_h, max_h, avg_l, min_l in zip(
+            time_idxs.tolist(), labels, model["median_high"].tolist(), model["extreme_high"].tolist(),
+            model["median_low"].tolist(), model["extreme_low"].tolist()
+        ):
             avg_path.append({
-                "time_idx": int(time_idx),
+                "time_idx": time_idx,
                 "time": time_str,
-                "high": round(float(avg_h), 3),
-                "low": round(float(avg_l), 3)
+                "high": round(avg_h, 3),
+                "low": round(avg_l, 3)
             })
             
             ext_path.append({
-                "time_idx": int(time_idx),
+                "time_idx": time_idx,
                 "time": time_str,
-                "high": round(float(max_h), 3),
-                "low": round(float(min_l), 3)
+                "high": round(max_h, 3),
+                "low": round(min_l, 3)
             })
             
-        print(f"[DEBUG] Composite Path Gen Time: {time.time() - start_time:.2f}s (Processed {len(valid_sessions)} sessions)")
         return {
             "median": avg_path,
             "extreme": ext_path,
-            "count": len(sessions)
+            "count": model["count"]
         }
+
     @staticmethod
     def get_daily_hod_lod(ticker: str) -> Dict:
         """
@@ -663,45 +396,22 @@ class ProfilerService:
         If target_session == 'Daily', creates synthetic full-day sessions (18:00->16:00).
         """
         # 1. Get Full History
-        stats = ProfilerService.analyze_profiler_stats(ticker, days=10000)
-        if "error" in stats:
-            return stats
-        
-        history = stats.get('sessions', [])
+        history = ProfilerService._sessions(ticker, days=10000)
+        if isinstance(history, dict):
+            return history
         
         # 2. Filter History
-        date_set = set(dates)
-        
         if target_session == 'Daily':
-            matches = []
-            asia_map = {s['date']: s for s in history if s['session'] == 'Asia'}
-            
-            for d in dates:
-                if d in asia_map:
-                    asia = asia_map[d]
-                    # Start: Asia start (18:00 prev day)
-                    # Duration: ~22 hours (until 16:00 next day)
-                    # We rely on generate_composite_path to slice 7h usually, but here we want more?
-                    # generate_composite_path usually uses start_time and finds data.
-                    # We need to make sure generate_composite_path fetches enough data (it slices 7h by default?)
-                    # Wait, existing `get_price_model_data` sliced 7h. 
-                    # `generate_composite_path` takes `sessions` list.
-                    # It iterates and does `chunk = df.loc[start_ts : end_ts]`.
-                    # So we must set `end_time` correctly here.
-                    matches.append({
-                        'start_time': asia['start_time'], 
-                        'end_time': (pd.Timestamp(d) + pd.Timedelta(hours=16)).isoformat(), 
-                        'open': asia['open'],
-                        'session': 'Daily',
-                        'date': d
-                    })
+            # Start: Asia start (18:00 prev day), open: Asia open
+            # Duration: ~22 hours (until 16:00 next day), see below
+            asia_rows = history.last_by('date', np.flatnonzero(history.equals('session', 'Asia')))
+            rows = [asia_rows[d] for d in dates if d in asia_rows]
+            matches = history.take(rows).select(['date', 'start_time', 'start_ts', 'open'])
         else:
-            matches = [
-                s for s in history 
-                if s.get('session') == target_session and s.get('date') in date_set
-            ]
+            rows = np.flatnonzero(history.equals('session', target_session) & history.isin('date', dates))
+            matches = history.take(rows)
         
-        if not matches:
+        if not len(matches):
             return {"median": [], "extreme": [], "count": 0}
             
         print(f"[Profiling] Custom Model: Found {len(matches)} matching sessions for {target_session}")
@@ -744,88 +454,17 @@ class ProfilerService:
         Returns:
             List of matching date strings
         """
-        filters = filters or {}
-        broken_filters = broken_filters or {}
-        
-        # Group sessions by date for intersection logic
-        date_sessions: Dict[str, Dict[str, Dict]] = {}
-        for s in sessions:
-            date = s.get('date')
-            sess_name = s.get('session')
-            if date and sess_name:
-                if date not in date_sessions:
-                    date_sessions[date] = {}
-                date_sessions[date][sess_name] = s
-        
-        # Apply filters - find intersection of all conditions
-        matched_dates = []
-        
-        for date, sessions_by_name in date_sessions.items():
-            # Check if this date satisfies ALL filters
-            matches_all = True
-            
-            # Check status filters
-            for session_name, required_status in filters.items():
-                if required_status and required_status != 'Any':
-                    sess = sessions_by_name.get(session_name)
-                    if not sess:
-                        matches_all = False
-                        break
-                    
-                    actual_status = sess.get('status', '')
-                    # If filter is just "Long" or "Short", treat as prefix match (matches "Short True" and "Short False")
-                    if required_status in ['Long', 'Short']:
-                        if not actual_status.startswith(required_status):
-                            matches_all = False
-                            break
-                    elif required_status in ['True', 'False']:
-                        if not actual_status.endswith(required_status):
-                            matches_all = False
-                            break
-                    else:
-                        # Exact match for full status (e.g. "Short True")
-                        if actual_status != required_status:
-                            matches_all = False
-                            break
-            
-            if not matches_all:
-                continue
-            
-            # Check broken filters
-            for session_name, required_broken in broken_filters.items():
-                if required_broken and required_broken != 'Any':
-                    sess = sessions_by_name.get(session_name)
-                    if not sess:
-                        matches_all = False
-                        break
-                    
-                    is_broken = sess.get('broken', False)
-                    # "Broken" or "Yes" -> must be broken
-                    if required_broken in ['Broken', 'Yes'] and not is_broken:
-                        matches_all = False
-                        break
-                    # "Not Broken" or "No" -> must NOT be broken
-                    elif required_broken in ['Not Broken', 'No'] and is_broken:
-                        matches_all = False
-                        break
-            
-            if not matches_all:
-                continue
-            
-            # Check intra-session state (direction filter on target session)
-            if intra_state and intra_state != 'Any':
-                target_sess = sessions_by_name.get(target_session)
-                if target_sess:
-                    status = target_sess.get('status', '')
-                    if intra_state == 'Long' and not status.startswith('Long'):
-                        matches_all = False
-                    elif intra_state == 'Short' and not status.startswith('Short'):
-                        matches_all = False
-            
-            if matches_all:
-                matched_dates.append(date)
-        
-        return sorted(matched_dates)
+        bitmap = SessionBitmap.from_records(sessions)
+        return bitmap.matched_dates(bitmap.match(target_session, filters, broken_filters, intra_state))
+
+    @staticmethod
+    def _session_bitmap(ticker: str, sessions: SessionStore) -> SessionBitmap:
+        """Filter bitmap of a ticker's full session history, rebuilt when the history is reloaded"""
+        bitmap = ProfilerService._session_bitmap_cache.get(ticker, fingerprint=sessions.token)
+        if bitmap is None:
+            bitmap = SessionBitmap(sessions)
+            ProfilerService._session_bitmap_cache.put(ticker, bitmap, sessions.token)
+        return bitmap
 
     @staticmethod
     def get_filtered_stats(
@@ -849,90 +488,38 @@ class ProfilerService:
             intra_state
         )
         
-        if cache_key in ProfilerService._filtered_stats_cache:
-             return ProfilerService._filtered_stats_cache[cache_key]
+        sessions_fp = ProfilerService._sessions_fingerprint(ticker)
+        cached = ProfilerService._filtered_stats_cache.get(cache_key, fingerprint=sessions_fp)
+        if cached is not None:
+             return cached
 
         # 1. Load all sessions
-        # 1. Load all sessions
-        stats = ProfilerService.analyze_profiler_stats(ticker, days=10000)
-        
-        if "error" in stats:
-            return stats
+        all_sessions = ProfilerService._sessions(ticker, days=10000)
         
-        all_sessions = stats.get('sessions', [])
+        if isinstance(all_sessions, dict):
+            return all_sessions
         
-        # 2. Apply filters to get matched dates
-        matched_dates = ProfilerService.apply_filters(
-            all_sessions, target_session, filters, broken_filters, intra_state
-        )
-        
-        date_set = set(matched_dates)
-        
-        # 3. Get sessions for matched dates
-        matched_sessions = [s for s in all_sessions if s.get('date') in date_set]
+        bitmap = ProfilerService._session_bitmap(ticker, all_sessions)
+        cube = ProfilerService._filter_cube(ticker, len(bitmap.dates))
+        cube_row = cube.find(target_session, filters, broken_filters, intra_state) if cube else None
         
-        # 4. Calculate distribution (for target session)
-        target_sessions = [s for s in matched_sessions if s.get('session') == target_session]
-        
-        distribution = {}
-        for status in ['Long True', 'Long False', 'Short True', 'Short False', 'None']:
-            count = sum(1 for s in target_sessions if s.get('status') == status)
-            distribution[status] = count
-        
-        # 5. Calculate range stats
-        range_stats = {
-            "high_pct": {
-                "median": None,
-                "mean": None,
-                "mode": None
-            },
-            "low_pct": {
-                "median": None,
-                "mean": None,
-                "mode": None
-            }
-        }
-        
-        high_pcts = [s.get('high_pct', 0) for s in target_sessions if s.get('high_pct') is not None]
-        low_pcts = [s.get('low_pct', 0) for s in target_sessions if s.get('low_pct') is not None]
-        
-        if high_pcts:
-            range_stats["high_pct"]["median"] = round(float(np.median(high_pcts)), 3)
-            range_stats["high_pct"]["mean"] = round(float(np.mean(high_pcts)), 3)
+        # 2. Matched dates: precomputed cube row, else bitwise ANDs over the session bitmap
+        if cube_row is not None:
+            mask = cube.mask(cube_row)
+        else:
+            mask = bitmap.match(target_session, filters, broken_filters, intra_state)
+        matched_dates = bitmap.matched_dates(mask)
         
-        if low_pcts:
-            range_stats["low_pct"]["median"] = round(float(np.median(low_pcts)), 3)
-            range_stats["low_pct"]["mean"] = round(float(np.mean(low_pcts)), 3)
+        # 3. Sessions for matched dates, reduced to the fields the charts need
+        lean_sessions = bitmap.matched_sessions(mask)
         
-
-        # Optimize payload size: Strip unused fields locally
-        # We only need enough info for charts.
-        lean_sessions = []
-        for s in matched_sessions:
-            # Create a shallow copy with only needed fields
-            lean_s = {
-                'date': s.get('date'),
-                'session': s.get('session'),
-                'status': s.get('status'),
-                'broken': s.get('broken'),
-                'high_time': s.get('high_time'),
-                'low_time': s.get('low_time'),
-                'high_pct': s.get('high_pct'),
-                'low_pct': s.get('low_pct'),
-                'start_time': s.get('start_time'), # Required for PriceModel path generation
-                'end_time': s.get('end_time'),
-                'open': s.get('open') or s.get('price'), # Required for PriceModel normalization
-                'range_high': s.get('range_high'), # Required for Daily range calc
-                'range_low': s.get('range_low'),
-                'mid': s.get('mid'),
-                # Keep numeric ranges for some charts if needed?
-                # RangeDistribution needs high_pct/low_pct.
-                # HodLod needs times.
-                # SessionStats needs status/broken.
-                # PriceModel calls a separate endpoint.
-                # DailyLevels needs dates (which are in lean_s['date']).
-            }
-            lean_sessions.append(lean_s)
+        # 4-5. Distribution and range stats (for target session)
+        if cube_row is not None:
+            target_stats = cube.target_stats(cube_row)
+        else:
+            target_stats = bitmap.target_stats(mask, target_session)
+        distribution = target_stats["distribution"]
+        range_stats = target_stats["range_stats"]
 
         result = {
             "matched_dates": matched_dates,
@@ -945,7 +532,7 @@ class ProfilerService:
             "broken_filters_applied": broken_filters or {}
         }
         
-        ProfilerService._filtered_stats_cache[cache_key] = result
+        ProfilerService._filtered_stats_cache.put(cache_key, result, sessions_fp)
         return result
 
     @staticmethod
@@ -971,60 +558,39 @@ class ProfilerService:
             bucket_minutes
         )
         
-        if cache_key in ProfilerService._price_model_cache:
-            return ProfilerService._price_model_cache[cache_key]
+        sessions_fp = ProfilerService._sessions_fingerprint(ticker)
+        cached = ProfilerService._price_model_cache.get(cache_key, fingerprint=sessions_fp)
+        if cached is not None:
+            return cached
 
-        # 1. Get filtered stats (which includes matched dates)
-        stats = ProfilerService.get_filtered_stats(
-            ticker, target_session, filters, broken_filters, intra_state
-        )
+        # 1. Match dates on the session bitmap (same filters as get_filtered_stats)
+        history = ProfilerService._sessions(ticker, days=10000)
         
-        if "error" in stats:
-            return stats
+        if isinstance(history, dict):
+            return history
         
-        # 2. Extract matched sessions or dates
-        # get_filtered_stats returns 'sessions' (filtered list of ALL sessions on matched dates)
-        all_matched_sessions = stats.get('sessions', [])
+        bitmap = ProfilerService._session_bitmap(ticker, history)
         
-        # 3. Filter for specific target session or construct Daily
-        matched_sessions = []
+        # Precomputed combination at this bucket size: pure lookup
+        cube = ProfilerService._filter_cube(ticker, len(bitmap.dates))
+        if cube is not None and cube.bucket_minutes == bucket_minutes:
+            cube_row = cube.find(target_session, filters, broken_filters, intra_state)
+            if cube_row is not None:
+                return ProfilerService._composite_result(cube.model(cube_row))
         
-        if target_session == 'Daily':
-            # Construct synthetic Daily sessions (18:00 -> 16:00 next day)
-            # We need to find the unique dates and build a daily session for each
-            unique_dates = sorted(list(set(s['date'] for s in all_matched_sessions)))
-            
-            # We need 'Asia' sessions to get the correct open price and start time (18:00 prev day)
-            # Find Asia session for each date
-            asia_map = {s['date']: s for s in all_matched_sessions if s['session'] == 'Asia'}
-            
-            for d in unique_dates:
-                # If we have the Asia session, use its open/start
-                # If not (maybe filtered out?), we might need to look it up or skip
-                # But get_filtered_stats returns sessions for *matched dates*. 
-                # If Asia was part of the filter criteria, it should be there.
-                # If filter was "NY1 Long", Asia might be present if we returned all sessions for that date.
-                # Yes, get_filtered_stats returns all sessions for the date.
-                
-                if d in asia_map:
-                    asia = asia_map[d]
-                    matched_sessions.append({
-                        'start_time': asia['start_time'], 
-                        # Daily duration ~22h. End time is mostly for reference in generator bounds check
-                        'end_time': (pd.Timestamp(asia['end_time']) + pd.Timedelta(hours=22)).isoformat(), 
-                        'open': asia['open'],
-                        'session': 'Daily',
-                        'date': d
-                    })
-        else:
-            # Strict filter for the requested session type
-            matched_sessions = [s for s in all_matched_sessions if s.get('session') == target_session]
-
-        if not matched_sessions:
-            return {"median": [], "extreme": [], "count": 0}
+        mask = bitmap.match(target_session, filters, broken_filters, intra_state)
+        model = ProfilerService._filtered_model(ticker, history, bitmap, mask, target_session, bucket_minutes)
+        if "error" in model:
+            return model
+        result = ProfilerService._composite_result(model)
+        
+        # Cache Result
+        ProfilerService._price_model_cache.put(cache_key, result, sessions_fp)
+        return result
 
-        # 4. Generate Composite Path
-        # Determine duration
+    @staticmethod
+    def _model_duration(target_session: str) -> float:
+        """Hours of price path shown per target session"""
         duration = 7.0
         if target_session == 'Daily':
             duration = 22.0
@@ -1036,14 +602,50 @@ class ProfilerService:
             duration = 6.0 # 07:30 - 13:30? (Usually 4-6h is enough for view)
         elif target_session == 'NY2':
             duration = 5.0 # 11:30 - 16:30
-            
-        result = ProfilerService.generate_composite_path(
-            ticker, matched_sessions, duration_hours=duration, bucket_minutes=bucket_minutes
-        )
+        return duration
+
+    @staticmethod
+    def _filtered_model(
+        ticker: str,
+        history: SessionStore,
+        bitmap: SessionBitmap,
+        mask: np.ndarray,
+        target_session: str,
+        bucket_minutes: int
+    ) -> Dict:
+        """Composite path arrays (see _composite_model) of the target sessions on matched dates"""
+        # Rows of ALL sessions on matched dates
+        rows = bitmap.matched_rows(mask)
         
-        # Cache Result
-        ProfilerService._price_model_cache[cache_key] = result
-        return result
+        # Filter for specific target session or construct Daily.
+        # Only the lean fields (no prior_close -> the path is anchored at the open)
+        lean_fields = ['date', 'session', 'start_time', 'start_ts', 'open']
+        
+        if target_session == 'Daily':
+            # Synthetic Daily sessions (18:00 -> 16:00 next day): the Asia session of
+            # each matched date gives the open price and start time (18:00 prev day)
+            asia_rows = history.last_by('date', rows[history.equals('session', 'Asia')[rows]])
+            matched_sessions = history.take([asia_rows[d] for d in sorted(asia_rows)]).select(lean_fields)
+        else:
+            # Strict filter for the requested session type
+            matched_sessions = history.take(rows[history.equals('session', target_session)[rows]]).select(lean_fields)
+
+        return ProfilerService._composite_model(
+            ticker, matched_sessions, ProfilerService._model_duration(target_session), bucket_minutes
+        )
+
+    @staticmethod
+    def _filter_cube(ticker: str, n_dates: int) -> Optional[FilterCube]:
+        """Memory-mapped filter cube of a ticker if built from the current sources (see filter_cube)"""
+        path = filter_cube.cube_path(DATA_DIR, ticker)
+        sessions_fp = ProfilerService._sessions_fingerprint(ticker)
+        fingerprint = (sessions_fp, file_fingerprint(path))
+        cube = ProfilerService._filter_cube_cache.get(ticker, fingerprint=fingerprint)
+        if cube is None:
+            cube = FilterCube.load(path, sessions_fp) or False
+            ProfilerService._filter_cube_cache.put(ticker, cube, fingerprint)
+        # Masks are over the bitmap's dates
+        return cube if cube and cube.n_dates == n_dates else None
 
     @staticmethod
     def get_daily_hod_lod(ticker: str) -> Dict:
@@ -1052,8 +654,10 @@ class ProfilerService:
         Buffered in memory to avoid repeated disk I/O (1MB+).
         """
         ticker = ProfilerService._normalize_ticker(ticker)
-        if ticker in ProfilerService._daily_hod_lod_cache:
-            return ProfilerService._daily_hod_lod_cache[ticker]
+        fingerprint = ProfilerService._fingerprint(ticker, "daily_hod_lod.json")
+        cached = ProfilerService._daily_hod_lod_cache.get(ticker, fingerprint=fingerprint)
+        if cached is not None:
+            return cached
             
         json_path = DATA_DIR / f"{ticker}_daily_hod_lod.json"
         
@@ -1063,7 +667,7 @@ class ProfilerService:
         try:
             with open(json_path, 'r') as f:
                 data = json.load(f)
-            ProfilerService._daily_hod_lod_cache[ticker] = data
+            ProfilerService._daily_hod_lod_cache.put(ticker, data, fingerprint)
             return data
         except Exception as e:
             return {"error": str(e)}
@@ -1073,123 +677,30 @@ class ProfilerService:
         """
         Get pre-computed reference level touch data.
         Buffered in memory to avoid repeated disk I/O.
-        OPTIMIZED: Returns only the first hit per session to reduce payload size.
+        OPTIMIZED: Returns only the first hit per session to reduce payload size
+        (computed offline into {ticker}_level_touches.arrow, see level_touches.py).
         """
         ticker = ProfilerService._normalize_ticker(ticker)
-        if ticker in ProfilerService._level_touches_cache:
-            return ProfilerService._level_touches_cache[ticker]
-            
-        json_path = DATA_DIR / f"{ticker}_level_touches.json"
-        
-        if not json_path.exists():
-            return {"error": f"Level touch data for {ticker} not found."}
-        
-        try:
-            with open(json_path, 'r') as f:
-                raw_data = json.load(f)
-                
-            # Optimize Payload: Convert raw touch_times list to first_hit dict per session
-            # Matches ranges in daily-levels.tsx
-            SESSION_RANGES = {
-                'Asia':   {'start': 18*60, 'end': 26*60}, # 18:00 - 02:00 (next day)
-                'London': {'start': 26*60, 'end': 31*60}, # 02:00 - 07:00
-                'NY1':    {'start': 8*60,  'end': 12*60}, # 08:00 - 12:00
-                'NY2':    {'start': 12*60, 'end': 16*60}, # 12:00 - 16:00
-                'P12':    {'start': 6*60,  'end': 17*60}, # 06:00 - 17:00
-                'Daily':  {'start': 18*60, 'end': 41*60}  # 18:00 - 17:00 (next day)
-            }
-            
-            optimized_data = {}
-            
-            for date_key, day_levels in raw_data.items():
-                optimized_day = {}
-                for level_name, level_data in day_levels.items():
-                    if not isinstance(level_data, dict):
-                        continue
-                        
-                    touch_times = level_data.get('touch_times', [])
-                    touched = level_data.get('touched', False)
-                    
-                    if not touched or not touch_times:
-                        optimized_day[level_name] = {
-                            'level': level_data.get('level'),
-                            'touched': False,
-                            'hits': {}
-                        }
-                        continue
-                        
-                    # Calculate first hit for each session
-                    hits = {}
-                    parsed_times = []
-                    for t in touch_times:
-                        try:
-                            h, m = map(int, t.split(':'))
-                            # Convert to minutes from midnight (0-1440)
-                            # But sessions can cross midnight (Asia starts 18:00, ends 02:00 next day)
-                            # We need to normalize. 
-                            # Our data aligns 18:00 as start of day?
-                            # Raw touch_times are HH:MM string.
-                            # If touch is 19:00, it's min 1140.
-                            # If touch is 01:00, it's min 60.
-                            # If session is Asia (18:00-02:00), we treat 18:00-23:59 as 1080-1439, and 00:00-02:00 as 1440-1560?
-                            # daily-levels.tsx logic:
-                            # if range.end < range.start (crossing midnight), endMins += 24*60.
-                            # then loop m from start to end.
-                            # const normM = m % 1440.
-                            # So it checks if time matches.
-                            
-                            mins = h * 60 + m
-                            parsed_times.append(mins)
-                        except:
-                            continue
-                            
-                    parsed_times.sort() # Ensure sorted
-                    
-                    for sess_name, rng in SESSION_RANGES.items():
-                        start = rng['start']
-                        end = rng['end']
-                        
-                        # Find first time in range
-                        first_hit = None
-                        for mins in parsed_times:
-                            # Handle midnight crossing logic
-                            # Impact: A time 'mins' (0-1439) is in [start, end]?
-                            # If end > 1440 (e.g. 26*60 = 1560 for 02:00), we need to check:
-                            # 1. mins (0-1439)
-                            # 2. mins + 1440 (if mins < start, maybe it belongs to next day part?)
-                            # Wait, raw touches are just time of day.
-                            # If session is 18:00-02:00.
-                            # Touches: 19:00 (1140), 01:00 (60).
-                            # 1140 is in [1080, 1560]? Yes.
-                            # 60 is in [1080, 1560]? No.
-                            # But 60 + 1440 = 1500 IS in [1080, 1560].
-                            # So we check: m or m+1440.
-                            
-                            m_targets = [mins]
-                            if mins < start and (mins + 1440) <= end:
-                                m_targets.append(mins + 1440)
-                            
-                            found = False
-                            for m in m_targets:
-                                if start <= m < end:
-                                    first_hit = f"{int(mins/60):02d}:{mins%60:02d}"
-                                    found = True
-                                    break
-                            if found:
-                                break
-                        
-                        if first_hit:
-                            hits[sess_name] = first_hit
+        fingerprint = ProfilerService._fingerprint(ticker, "level_touches.json")
+        cached = ProfilerService._level_touches_cache.get(ticker, fingerprint=fingerprint)
+        if cached is not None:
+            return cached
+            
+        # Precomputed first hits (memory-mapped), else the JSON touch lists
+        table = level_touches.load_table(level_touches.touches_path(DATA_DIR, ticker), fingerprint)
+        if table is None:
+            json_path = DATA_DIR / f"{ticker}_level_touches.json"
+            if not json_path.exists():
+                return {"error": f"Level touch data for {ticker} not found."}
 
-                    optimized_day[level_name] = {
-                        'level': level_data.get('level'),
-                        'touched': True,
-                        'hits': hits
-                    }
-                    
-                optimized_data[date_key] = optimized_day
+        try:
+            if table is None:
+                with open(json_path, 'r') as f:
+                    table = level_touches.build_table(json.load(f))
 
-            ProfilerService._level_touches_cache[ticker] = optimized_data
+            # Optimize Payload: first hit per session instead of the raw touch_times list
+            optimized_data = level_touches.to_payload(table)
+            ProfilerService._level_touches_cache.put(ticker, optimized_data, fingerprint)
             return optimized_data
         except Exception as e:
             return {"error": str(e)}
@@ -1197,44 +708,49 @@ class ProfilerService:
     @staticmethod
     def prewarm_cache(ticker: str = "NQ1"):
         """
-        Run heavy calculations on startup to populate cache.
+        Run heavy calculations to populate the caches of one ticker (see
+        api/services/warmup.py). Raises if a step fails so the caller can
+        report it.
         """
         print(f"[Pre-Warm] Warming cache for {ticker}...")
-        try:
-            # 1. Load Static Files
-            ProfilerService.get_daily_hod_lod(ticker)
-            ProfilerService.get_level_touches(ticker)
-            
-            # 2. Run Heavy Price Model Calculation (All Sessions)
-            # This pre-computes "Daily", "Asia", "London", "NY1", "NY2" Default Views
-            for session_name in ["Daily", "Asia", "London", "NY1", "NY2"]:
-                ProfilerService.get_filtered_price_model(
-                    ticker=ticker,
-                    target_session=session_name,
-                    filters={},
-                    intra_state="Any",
-                    bucket_minutes=5
-                )
-                # Ensure stats are also cached
-                ProfilerService.get_filtered_stats(
-                    ticker=ticker, 
-                    target_session=session_name,
-                    filters={}, 
-                    broken_filters={},
-                    intra_state="Any"
-                )
-            print(f"[Pre-Warm] Successfully warmed cache for {ticker}")
-        except Exception as e:
-            print(f"[Pre-Warm] Failed to warm cache: {e}")
+        # 1. Load Static Files + sessions
+        ProfilerService.get_daily_hod_lod(ticker)
+        ProfilerService.get_level_touches(ticker)
+        ProfilerService.session_store(ticker)
+
+        # 2. Run Heavy Price Model Calculation (All Sessions)
+        # This pre-computes "Daily", "Asia", "London", "NY1", "NY2" Default Views
+        for session_name in ["Daily", "Asia", "London", "NY1", "NY2"]:
+            model = ProfilerService.get_filtered_price_model(
+                ticker=ticker,
+                target_session=session_name,
+                filters={},
+                intra_state="Any",
+                bucket_minutes=5
+            )
+            # Ensure stats are also cached
+            stats = ProfilerService.get_filtered_stats(
+                ticker=ticker,
+                target_session=session_name,
+                filters={},
+                broken_filters={},
+                intra_state="Any"
+            )
+            for result in (model, stats):
+                if isinstance(result, dict) and "error" in result:
+                    raise RuntimeError(f"{session_name}: {result['error']}")
+        print(f"[Pre-Warm] Successfully warmed cache for {ticker}")
 
     @staticmethod
     def _load_df(ticker: str) -> Optional[pd.DataFrame]:
         """
         Unified method to load OHLCV data with perfect Unix -> EST alignment.
         """
-        # Check Cache
-        if ticker in ProfilerService._cache:
-            return ProfilerService._cache[ticker]
+        # Check Cache (live bars are picked up when the history file changes)
+        fingerprint = ProfilerService._fingerprint(ticker, "1m.parquet")
+        cached = ProfilerService._cache.get(ticker, fingerprint=fingerprint)
+        if cached is not None:
+            return cached
             
         try:
             # Use robust loader to get synchronized Unix timestamps
@@ -1246,15 +762,19 @@ class ProfilerService:
             
             # Convert Unix 'time' column to US/Eastern index
             # This is the absolute source of truth for alignment.
-            df['dt_utc'] = pd.to_datetime(df['time'], unit='s', utc=True)
-            df = df.set_index('dt_utc').tz_convert('US/Eastern')
+            index = pd.to_datetime(df['time'].to_numpy(), unit='s', utc=True).tz_convert('US/Eastern')
             
             # Defensive: Drop original 'time' (seconds) and replace with 'time' (HH:MM)
-            if 'time' in df.columns:
-                df = df.drop(columns=['time'])
+            # Price columns are wrapped without copying, so they keep sharing
+            # memory with the loader's (memory-mapped) frame
+            df = pd.DataFrame(
+                {c: df[c].to_numpy() for c in df.columns if c != 'time'},
+                index=pd.DatetimeIndex(index, name='dt_utc'),
+                copy=False
+            )
             df['time'] = df.index.strftime('%H:%M')
             
-            ProfilerService._cache[ticker] = df
+            ProfilerService._cache.put(ticker, df, fingerprint)
             return df
         except Exception as e:
             print(f"[Profiling] Load error for {ticker}: {e}")
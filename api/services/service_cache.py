@@ -0,0 +1,245 @@
+"""
+Service Cache - bounded, instrumented in-process caches for service results
+
+Services used to keep results in plain class-level dicts: unbounded (one
+entry per filter combination ever requested), never invalidated when the
+source files change and not safe to share between worker threads. Each
+kind of cached value now lives in a named namespace:
+
+- LRU with an entry budget and a byte budget (sizes are estimated once on
+  insert: NumPy/pandas buffers plus a walk over dicts/lists/objects)
+- Optional TTL per namespace
+- Fingerprint checked: put() stores the fingerprint of the value's source
+  files (see bar_store.file_fingerprint) and get() drops the entry when the
+  caller's current fingerprint differs
+- Thread safe, with hit/miss/eviction/expiry counters exposed by stats()
+  (served at /health/cache)
+
+Budgets can be overridden per namespace:
+    SERVICE_CACHE_LIMITS  "name=entries:mb[:ttl_seconds],..."
+                          e.g. "filtered_stats=2048:512,price_model=128:64:3600"
+
+namespace(name, ...) returns the shared namespace (created on first use);
+the defaults passed there apply unless SERVICE_CACHE_LIMITS lists the name.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def _parse_limits(spec: str) -> Dict[str, Tuple[int, float, Optional[float]]]:
+    limits = {}
+    for part in spec.split(","):
+        name, _, value = part.partition("=")
+        if not name.strip() or not value.strip():
+            continue
+        fields = value.split(":")
+        entries = int(fields[0])
+        max_mb = float(fields[1]) if len(fields) > 1 and fields[1] else 256.0
+        ttl = float(fields[2]) if len(fields) > 2 and fields[2] else None
+        limits[name.strip()] = (entries, max_mb, ttl)
+    return limits
+
+
+LIMITS = _parse_limits(os.environ.get("SERVICE_CACHE_LIMITS", ""))
+
+# get(..., fingerprint=ANY) skips the fingerprint check
+ANY = object()
+
+
+# Long lists are sized from an evenly spaced sample of their items
+SAMPLE_ITEMS = 32
+
+
+def estimate_nbytes(value: Any) -> int:
+    """
+    Approximate memory held by a cached value: array/frame buffers plus
+    Python containers and their contents (shared objects counted once,
+    lists longer than SAMPLE_ITEMS extrapolated from a sample)
+    """
+    seen = set()
+    total = 0
+    stack = [value]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, np.ndarray):
+            total += obj.nbytes + 112
+        elif isinstance(obj, pd.DataFrame):
+            total += int(obj.memory_usage(index=True, deep=True).sum())
+        elif isinstance(obj, (pd.Series, pd.Index)):
+            total += int(obj.memory_usage(deep=True))
+        elif isinstance(obj, dict):
+            total += sys.getsizeof(obj)
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple)) and len(obj) > SAMPLE_ITEMS:
+            step = len(obj) / SAMPLE_ITEMS
+            sample = [obj[int(i * step)] for i in range(SAMPLE_ITEMS)]
+            total += sys.getsizeof(obj) + sum(estimate_nbytes(item) for item in sample) * len(obj) // SAMPLE_ITEMS
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            total += sys.getsizeof(obj)
+            stack.extend(obj)
+        elif hasattr(obj, "__dict__") and not isinstance(obj, type):
+            total += sys.getsizeof(obj)
+            stack.append(vars(obj))
+        else:
+            total += sys.getsizeof(obj)
+    return total
+
+
+class CacheNamespace:
+    """Thread-safe LRU with entry/byte budgets, optional TTL and fingerprint checks"""
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int,
+        max_bytes: int,
+        ttl: Optional[float] = None,
+        sizeof: Callable[[Any], int] = estimate_nbytes
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        # key -> (fingerprint, value, nbytes, stored_at)
+        self._entries: "OrderedDict[Hashable, Tuple[Any, Any, int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+        self.invalidated = 0
+
+    def _drop(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def get(self, key: Hashable, default: Any = None, fingerprint: Any = ANY) -> Any:
+        """
+        Cached value for key, or default when missing, expired, or stored
+        with a fingerprint different from `fingerprint`
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            cached_fp, value, _, stored_at = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                self._drop(key)
+                self.expired += 1
+                self.misses += 1
+                return default
+            if fingerprint is not ANY and cached_fp != fingerprint:
+                # Source files changed on disk - drop the stale value
+                self._drop(key)
+                self.invalidated += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, fingerprint: Any = None) -> None:
+        """Insert a value, evicting least-recently-used entries to fit both budgets"""
+        nbytes = self.sizeof(value)
+        with self._lock:
+            self._drop(key)
+            if nbytes > self.max_bytes:
+                # Never cache a single value larger than the whole budget
+                return
+            self._entries[key] = (fingerprint, value, nbytes, time.monotonic())
+            self._bytes += nbytes
+            while self._entries and (self._bytes > self.max_bytes or len(self._entries) > self.max_entries):
+                _, (_, _, evicted_bytes, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_bytes
+                self.evictions += 1
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Stored value without fingerprint/TTL checks, counters or LRU update"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return default if entry is None else entry[1]
+
+    # Plain dict-style access (research scripts poke at service caches directly)
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        self.put(key, value)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            self._drop(key)
+            return default if entry is None else entry[1]
+
+    def invalidate(self, predicate: Optional[Callable[[Hashable], bool]] = None) -> int:
+        """Drop every entry (or those whose key matches predicate); returns the count"""
+        with self._lock:
+            keys = [k for k in self._entries if predicate is None or predicate(k)]
+            for key in keys:
+                self._drop(key)
+            return len(keys)
+
+    def clear(self) -> None:
+        self.invalidate()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expired": self.expired,
+                "invalidated": self.invalidated,
+            }
+
+
+_namespaces: Dict[str, CacheNamespace] = {}
+_registry_lock = threading.Lock()
+
+
+def namespace(
+    name: str,
+    max_entries: int = 256,
+    max_mb: float = 256,
+    ttl: Optional[float] = None,
+    sizeof: Callable[[Any], int] = estimate_nbytes
+) -> CacheNamespace:
+    """Shared namespace by name; SERVICE_CACHE_LIMITS overrides the given budgets"""
+    with _registry_lock:
+        ns = _namespaces.get(name)
+        if ns is None:
+            max_entries, max_mb, ttl = LIMITS.get(name, (max_entries, max_mb, ttl))
+            ns = _namespaces[name] = CacheNamespace(
+                name, max_entries, int(max_mb * 1024 * 1024), ttl, sizeof
+            )
+        return ns
+
+
+def stats() -> Dict[str, Any]:
+    """Per-namespace occupancy and counters"""
+    with _registry_lock:
+        namespaces = dict(_namespaces)
+    return {name: ns.stats() for name, ns in sorted(namespaces.items())}
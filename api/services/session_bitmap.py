@@ -0,0 +1,208 @@
+"""
+Session Bitmap - profiler sessions as columns plus per-date filter bitsets
+
+Profiler filters (status per session, broken per session, intra-session
+direction) are all "does session S on date D satisfy X" checks. The bitmap
+records, per session name, one bool array over the sorted dates for:
+
+- presence                  (name, 'present')
+- exact status              (name, 'status', 'Short True')
+- status prefix / suffix    (name, 'prefix', 'Long'), (name, 'suffix', 'False')
+- broken                    (name, 'broken')
+
+so any filter combination is a handful of `&` over arrays of length
+n_dates. Everything is derived from the categorical columns of a
+SessionStore (one pass per distinct session/status value, not per row);
+per-row date positions, status codes and high/low pct columns are kept
+alongside, so the aggregates are bincount/median over the matched rows and
+only the lean dicts of matched sessions are ever built.
+
+Semantics follow the original per-date loop: a filtered session missing on
+a date excludes the date; "Long"/"Short" match status prefixes,
+"True"/"False" suffixes, anything else the exact status.
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from api.services.session_store import SessionStore
+
+
+STATUSES = ['Long True', 'Long False', 'Short True', 'Short False', 'None']
+PREFIXES = ['Long', 'Short']
+SUFFIXES = ['True', 'False']
+
+# Fields kept per session in filtered stats payloads
+LEAN_FIELDS = [
+    'date', 'session', 'status', 'broken', 'high_time', 'low_time', 'high_pct', 'low_pct',
+    'start_time', 'end_time', 'open', 'range_high', 'range_low', 'mid',
+]
+
+
+class SessionBitmap:
+    """Filter bitsets and stats columns for one SessionStore"""
+
+    def __init__(self, store: SessionStore):
+        self.store = store
+        n_rows = len(store)
+
+        # Per-category lookups; index -1 (null code) hits the trailing entry
+        date_cats = store.categories('date')
+        name_cats = store.categories('session')
+        status_cats = store.categories('status')
+        date_codes = store.codes('date')
+        name_codes = store.codes('session')
+        status_codes = store.codes('status')
+        date_ok = np.array([bool(c) for c in date_cats] + [False], dtype=bool)
+        name_ok = np.array([bool(c) for c in name_cats] + [False], dtype=bool)
+
+        # One (date, session) entry per day; later duplicates win, as in a dict regroup
+        keyed = np.flatnonzero(date_ok[date_codes] & name_ok[name_codes])[::-1]
+        key = date_codes[keyed].astype(np.int64) * max(len(name_cats), 1) + name_codes[keyed]
+        _, first = np.unique(key, return_index=True)
+        latest = keyed[first]
+
+        used = np.unique(date_codes[latest])
+        order = sorted(range(len(used)), key=lambda k: date_cats[used[k]])
+        self.dates = [date_cats[used[k]] for k in order]
+        n_dates = len(self.dates)
+        date_pos = np.full(len(date_cats) + 1, -1, dtype=np.int64)
+        date_pos[used[order]] = np.arange(n_dates)
+        self._empty = np.zeros(n_dates, dtype=bool)
+
+        # Status strings of the latest rows ('' where missing)
+        status_of = np.array([c or '' for c in status_cats] + [''], dtype=object)
+        broken = store.column('broken').astype(bool) if store.has('broken') else np.zeros(n_rows, dtype=bool)
+
+        bits: Dict[tuple, np.ndarray] = {}
+
+        def bit(key, positions):
+            if len(positions):
+                if key not in bits:
+                    bits[key] = np.zeros(n_dates, dtype=bool)
+                bits[key][positions] = True
+
+        latest_pos = date_pos[date_codes[latest]]
+        latest_name = name_codes[latest]
+        latest_status = status_codes[latest]
+        latest_broken = broken[latest]
+        for name_code in np.unique(latest_name):
+            name = name_cats[name_code]
+            of_name = latest_name == name_code
+            bit((name, 'present'), latest_pos[of_name])
+            bit((name, 'broken'), latest_pos[of_name & latest_broken])
+            for status_code in np.unique(latest_status[of_name]):
+                status = status_of[status_code]
+                positions = latest_pos[of_name & (latest_status == status_code)]
+                bit((name, 'status', status), positions)
+                for prefix in PREFIXES:
+                    if status.startswith(prefix):
+                        bit((name, 'prefix', prefix), positions)
+                for suffix in SUFFIXES:
+                    if status.endswith(suffix):
+                        bit((name, 'suffix', suffix), positions)
+        self._bits = bits
+
+        # Row columns (every session, in store order)
+        self.row_date = date_pos[date_codes]
+        code_of_status = np.array(
+            [STATUSES.index(c) if c in STATUSES else -1 for c in status_cats] + [-1], dtype=np.int64
+        )
+        high_pct = store.floats('high_pct')
+        low_pct = store.floats('low_pct')
+        self._by_name = {}
+        for name_code in np.unique(name_codes[name_codes >= 0]):
+            rows = np.flatnonzero(name_codes == name_code)
+            self._by_name[name_cats[name_code]] = {
+                "rows": rows,
+                "status": code_of_status[status_codes[rows]],
+                "high_pct": high_pct[rows],
+                "low_pct": low_pct[rows],
+            }
+
+    @classmethod
+    def from_records(cls, sessions: List[Dict]) -> "SessionBitmap":
+        return cls(SessionStore.from_records(sessions))
+
+    def bits(self, *key) -> np.ndarray:
+        return self._bits.get(key, self._empty)
+
+    def match(
+        self,
+        target_session: str,
+        filters: Optional[Dict[str, str]] = None,
+        broken_filters: Optional[Dict[str, str]] = None,
+        intra_state: str = "Any"
+    ) -> np.ndarray:
+        """Bool array over self.dates: dates satisfying every filter"""
+        mask = np.ones(len(self.dates), dtype=bool)
+
+        for session_name, required in (filters or {}).items():
+            if not required or required == 'Any':
+                continue
+            if required in PREFIXES:
+                mask &= self.bits(session_name, 'prefix', required)
+            elif required in SUFFIXES:
+                mask &= self.bits(session_name, 'suffix', required)
+            else:
+                mask &= self.bits(session_name, 'status', required)
+
+        for session_name, required in (broken_filters or {}).items():
+            if not required or required == 'Any':
+                continue
+            mask &= self.bits(session_name, 'present')
+            if required in ['Broken', 'Yes']:
+                mask &= self.bits(session_name, 'broken')
+            elif required in ['Not Broken', 'No']:
+                mask &= ~self.bits(session_name, 'broken')
+
+        # Direction filter on the target session (only where it exists)
+        if intra_state in PREFIXES:
+            mask &= ~self.bits(target_session, 'present') | self.bits(target_session, 'prefix', intra_state)
+
+        return mask
+
+    def matched_dates(self, mask: np.ndarray) -> List[str]:
+        return [self.dates[k] for k in np.flatnonzero(mask)]
+
+    def matched_rows(self, mask: np.ndarray) -> np.ndarray:
+        """Store rows of every session on a matched date, in store order"""
+        hit = (self.row_date >= 0) & mask[np.maximum(self.row_date, 0)]
+        return np.flatnonzero(hit)
+
+    def matched_sessions(self, mask: np.ndarray) -> List[Dict]:
+        """Lean dicts of every session on a matched date, in store order"""
+        rows = self.matched_rows(mask)
+        lean = self.store.records(rows, LEAN_FIELDS)
+        # 'open' is required for PriceModel normalization (older files call it 'price')
+        prices = self.store.column('price')[rows].tolist()
+        for session, price in zip(lean, prices):
+            session['open'] = session['open'] or price
+        return lean
+
+    def target_stats(self, mask: np.ndarray, target_session: str) -> Dict:
+        """Status distribution and high/low pct median/mean of the target session on matched dates"""
+        columns = self._by_name.get(target_session)
+        distribution = {status: 0 for status in STATUSES}
+        range_stats = {
+            "high_pct": {"median": None, "mean": None, "mode": None},
+            "low_pct": {"median": None, "mean": None, "mode": None},
+        }
+        if columns is None:
+            return {"distribution": distribution, "range_stats": range_stats}
+
+        # Rows without a date (-1) would otherwise index the newest date
+        row_date = self.row_date[columns["rows"]]
+        hit = (row_date >= 0) & mask[np.maximum(row_date, 0)]
+        counts = np.bincount(columns["status"][hit & (columns["status"] >= 0)], minlength=len(STATUSES))
+        distribution = {status: int(counts[k]) for k, status in enumerate(STATUSES)}
+
+        for field in ("high_pct", "low_pct"):
+            values = columns[field][hit]
+            values = values[~np.isnan(values)]
+            if len(values):
+                range_stats[field]["median"] = round(float(np.median(values)), 3)
+                range_stats[field]["mean"] = round(float(np.mean(values)), 3)
+
+        return {"distribution": distribution, "range_stats": range_stats}
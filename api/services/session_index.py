@@ -0,0 +1,307 @@
+"""
+Session Index - integer row offsets of trading days and session windows
+
+Services that work per trading day used to derive trading dates with
+ts.time() per bar and cut every (day, session) window with a tz-aware
+df.loc[start:end] label slice. A SessionIndex resolves all of that once per
+bar index with vectorized tz_localize + searchsorted:
+
+- dates           trading dates (days since epoch; bars from 18:00 local
+                  belong to the next date)
+- day_lo/day_hi   rows [lo, hi) of each trading date
+- per window      UTC start/end, rows [lo, hi) of [start, end) and whether
+                  both wall times exist unambiguously on that date
+
+Window boundaries are US/Eastern wall times localized per date (DST
+correct). Times that do not exist are shifted forward and ambiguous ones
+are dropped (start/end = -1); `exact` is False for both, for callers that
+skip such sessions instead.
+
+Slicing by position is then df.iloc[lo:hi] or plain array slices.
+
+for_ticker() persists the index of a ticker's full 1m frame to the Arrow
+cache directory (see arrow_cache) keyed by the 1m file fingerprint, row
+count and first/last bar time, so it is built once per data version and
+looked up without scanning the bars. Each version gets its own entry (in
+memory and on disk, the MAX_TICKER_VERSIONS most recently used per ticker),
+so callers passing different frames of one ticker - history only
+(precompute_level_touches) vs history + live bars (ProfilerService) - do
+not replace each other's index. for_frame() keeps indexes of ad hoc
+(range-filtered) frames in memory only, keyed by a hash of the bar times.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from api.services import arrow_cache
+from api.services.bar_store import file_fingerprint
+
+
+NS_PER_SECOND = 10**9
+NS_PER_MINUTE = 60 * NS_PER_SECOND
+NS_PER_DAY = 86400 * NS_PER_SECOND
+
+# Bars at or after this local time belong to the next trading date
+TRADING_DAY_START = 18 * 60
+
+# name: (start, end, start day offset, end day offset) relative to the trading date
+WINDOWS = {
+    "Asia":   ("18:00", "19:30", -1, -1),
+    "London": ("02:30", "03:30", 0, 0),
+    "NY1":    ("07:30", "08:30", 0, 0),
+    "NY2":    ("11:30", "12:30", 0, 0),
+    "RTH":    ("09:30", "16:00", 0, 0),
+    "Globex": ("18:00", "17:00", -1, 0),
+}
+
+# In-memory indexes of ad hoc frames (for_frame)
+MAX_FRAME_INDEXES = 16
+
+# Versions kept per ticker (for_ticker), in memory and in the Arrow cache
+MAX_TICKER_VERSIONS = 4
+
+
+def minutes(hhmm: str) -> int:
+    h, m = map(int, hhmm.split(':'))
+    return h * 60 + m
+
+
+def trading_date_of(local_ns: np.ndarray) -> np.ndarray:
+    """Trading date (days since epoch) of every local bar time"""
+    day = local_ns // NS_PER_DAY
+    return day + ((local_ns % NS_PER_DAY) // NS_PER_MINUTE >= TRADING_DAY_START)
+
+
+def localize(local_ns: np.ndarray, tz, nonexistent: str = 'NaT') -> np.ndarray:
+    """
+    Local wall times (ns) -> UTC ns. Ambiguous times (and nonexistent ones
+    unless nonexistent='shift_forward') become -1.
+    """
+    if tz is None:
+        return np.asarray(local_ns, dtype=np.int64).copy()
+    utc = pd.DatetimeIndex(np.asarray(local_ns).astype('datetime64[ns]')).tz_localize(
+        tz, nonexistent=nonexistent, ambiguous='NaT'
+    )
+    out = utc.asi8.copy()
+    out[utc.isna()] = -1
+    return out
+
+
+def to_local(utc_ns: np.ndarray, tz) -> np.ndarray:
+    """UTC ns -> local wall time ns"""
+    if tz is None:
+        return np.asarray(utc_ns, dtype=np.int64)
+    return pd.DatetimeIndex(utc_ns, tz='UTC').tz_convert(tz).tz_localize(None).asi8
+
+
+def isoformat(utc_ns: np.ndarray, local_ns: np.ndarray, tz=True) -> list:
+    """Timestamp.isoformat() of whole-second times, e.g. 2024-01-02T08:31:00-05:00"""
+    stamps = np.datetime_as_string(np.asarray(local_ns).astype('datetime64[ns]'), unit='s').tolist()
+    if not tz:
+        return stamps
+    offsets = ((np.asarray(local_ns) - np.asarray(utc_ns)) // NS_PER_MINUTE).tolist()
+    return [
+        f"{stamp}{'-' if off < 0 else '+'}{abs(off) // 60:02d}:{abs(off) % 60:02d}"
+        for stamp, off in zip(stamps, offsets)
+    ]
+
+
+def date_strings(days: np.ndarray) -> list:
+    """Days since epoch -> 'YYYY-MM-DD'"""
+    return np.datetime_as_string(np.asarray(days).astype('datetime64[D]')).tolist()
+
+
+class SessionIndex:
+    """Trading-day and session-window row offsets for one sorted DatetimeIndex"""
+
+    def __init__(self, utc_ns: np.ndarray, tz, columns: Dict[str, np.ndarray]):
+        self.utc_ns = utc_ns
+        self.tz = tz
+        self.columns = columns
+        self.dates = columns["date"]
+        self.day_lo = columns["day_lo"]
+        self.day_hi = columns["day_hi"]
+
+    @classmethod
+    def build(cls, index: pd.DatetimeIndex) -> "SessionIndex":
+        utc_ns = index.asi8
+        tz = index.tz
+        local_ns = index.tz_localize(None).asi8 if tz is not None else utc_ns
+        trading = trading_date_of(local_ns)
+        dates, day_lo = np.unique(trading, return_index=True)
+        day_hi = np.append(day_lo[1:], len(trading))
+        columns = {"date": dates, "day_lo": day_lo.astype(np.int64), "day_hi": day_hi.astype(np.int64)}
+        index = cls(utc_ns, tz, columns)
+        for name, (start, end, start_offset, end_offset) in WINDOWS.items():
+            index._add_window(name, start, end, start_offset, end_offset)
+        return index
+
+    def _add_window(self, name: str, start: str, end: str, start_offset: int, end_offset: int):
+        start_local = self.wall_times(start, start_offset)
+        end_local = self.wall_times(end, end_offset)
+        start_ns = localize(start_local, self.tz, nonexistent='shift_forward')
+        end_ns = localize(end_local, self.tz, nonexistent='shift_forward')
+        exact = (localize(start_local, self.tz) >= 0) & (localize(end_local, self.tz) >= 0)
+        lo, hi = self.rows(start_ns, end_ns)
+        self.columns.update({
+            f"{name}_start": start_ns, f"{name}_end": end_ns, f"{name}_exact": exact,
+            f"{name}_lo": lo, f"{name}_hi": hi,
+        })
+
+    def wall_times(self, hhmm: str, day_offset: int = 0) -> np.ndarray:
+        """Local wall time hhmm on (trading date + day_offset) for every date, as ns"""
+        return (self.dates + day_offset) * NS_PER_DAY + minutes(hhmm) * NS_PER_MINUTE
+
+    def rows(self, start_ns: np.ndarray, end_ns: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Rows [lo, hi) of the bars in [start, end) per window; empty (lo == hi)
+        where a boundary is -1
+        """
+        lo = np.searchsorted(self.utc_ns, start_ns, side='left')
+        hi = np.maximum(np.searchsorted(self.utc_ns, end_ns, side='left'), lo)
+        hi[(start_ns < 0) | (end_ns < 0)] = lo[(start_ns < 0) | (end_ns < 0)]
+        return lo.astype(np.int64), hi.astype(np.int64)
+
+    def daily_window(self, minute_of_day: int, duration_minutes: int) -> Dict[str, np.ndarray]:
+        """
+        Ad hoc window [minute_of_day, + duration) per date, labeled with its
+        calendar date (the day before the trading date from 18:00 on).
+        Times that do not exist or are ambiguous get no window (lo == hi).
+        """
+        day_offset = -1 if minute_of_day >= TRADING_DAY_START else 0
+        start = localize(self.wall_times("00:00", day_offset) + minute_of_day * NS_PER_MINUTE, self.tz)
+        end = np.where(start >= 0, start + duration_minutes * NS_PER_MINUTE, -1)
+        lo, hi = self.rows(start, end)
+        return {"date": self.dates + day_offset, "start": start, "end": end, "lo": lo, "hi": hi}
+
+    def window(self, name: str) -> Dict[str, np.ndarray]:
+        """start, end, exact, lo, hi arrays (aligned with dates) of a WINDOWS entry"""
+        return {key: self.columns[f"{name}_{key}"] for key in ("start", "end", "exact", "lo", "hi")}
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.columns)
+
+    @classmethod
+    def from_frame(cls, index: pd.DatetimeIndex, frame: pd.DataFrame) -> "SessionIndex":
+        columns = {c: frame[c].to_numpy() for c in frame.columns}
+        return cls(index.asi8, index.tz, columns)
+
+
+def _version(index: pd.DatetimeIndex) -> str:
+    """Data version of an ad hoc bar index: hash of its UTC times and timezone"""
+    digest = hashlib.blake2b(np.ascontiguousarray(index.asi8).tobytes(), digest_size=16)
+    digest.update(str(index.tz).encode())
+    digest.update(repr(sorted(WINDOWS.items())).encode())
+    return digest.hexdigest()
+
+
+def _ticker_version(ticker: str, index: pd.DatetimeIndex) -> str:
+    """
+    Data version of a ticker's full 1m index without scanning it: history
+    file fingerprint (mtime/size), row count, first/last time, timezone.
+    Live bars only extend the tail, which the count and last time cover.
+    """
+    from api.services.data_loader import DATA_DIR
+    times = index.asi8
+    key = (
+        file_fingerprint(DATA_DIR / f"{ticker}_1m.parquet"),
+        len(times),
+        int(times[0]) if len(times) else None,
+        int(times[-1]) if len(times) else None,
+        str(index.tz),
+        sorted(WINDOWS.items()),
+    )
+    return hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+
+
+_lock = threading.Lock()
+_tickers: Dict[str, "OrderedDict[str, SessionIndex]"] = {}
+_frames: "OrderedDict[str, SessionIndex]" = OrderedDict()
+
+
+def for_ticker(ticker: str, index: pd.DatetimeIndex) -> SessionIndex:
+    """
+    Index of a ticker's full 1m frame: from memory, else the persisted copy
+    (data/cache/arrow/{ticker}_1m_sessions_{version}.arrow), else built and
+    persisted. Keyed on the 1m file fingerprint, not a hash of every bar time.
+    """
+    version = _ticker_version(ticker, index)
+    with _lock:
+        versions = _tickers.get(ticker)
+        if versions is not None and version in versions:
+            versions.move_to_end(version)
+            return versions[version]
+
+    name = f"{ticker}_1m_sessions_{version}"
+    frame = arrow_cache.load_frame(name, version)
+    if frame is not None:
+        session_index = SessionIndex.from_frame(index, frame)
+        _touch(name)
+    else:
+        session_index = SessionIndex.build(index)
+        arrow_cache.store_frame(name, version, session_index.to_frame())
+        _prune_files(ticker)
+        print(f"[SessionIndex] Built {ticker}: {len(session_index.dates)} trading days")
+
+    with _lock:
+        versions = _tickers.setdefault(ticker, OrderedDict())
+        versions[version] = session_index
+        while len(versions) > MAX_TICKER_VERSIONS:
+            versions.popitem(last=False)
+    return session_index
+
+
+def _touch(name: str):
+    """Mark a persisted index as recently used (_prune_files keeps the newest)"""
+    try:
+        os.utime(arrow_cache.CACHE_DIR / f"{name}.arrow")
+    except OSError:
+        pass
+
+
+def _prune_files(ticker: str):
+    """Delete persisted indexes of a ticker beyond the MAX_TICKER_VERSIONS most recently used"""
+    if not arrow_cache.CACHE_DIR.exists():
+        return
+    paths = []
+    for path in arrow_cache.CACHE_DIR.glob(f"{ticker}_1m_sessions*.arrow"):
+        try:
+            paths.append((path.stat().st_mtime, path))
+        except FileNotFoundError:
+            continue
+    paths.sort(reverse=True)
+    for _, path in paths[MAX_TICKER_VERSIONS:]:
+        arrow_cache.clear(path.stem)
+
+
+def for_frame(index: pd.DatetimeIndex) -> SessionIndex:
+    """Index of an arbitrary (e.g. range-filtered) frame, cached in memory only"""
+    version = _version(index)
+    with _lock:
+        session_index = _frames.get(version)
+        if session_index is not None:
+            _frames.move_to_end(version)
+            return session_index
+
+    session_index = SessionIndex.build(index)
+    with _lock:
+        _frames[version] = session_index
+        while len(_frames) > MAX_FRAME_INDEXES:
+            _frames.popitem(last=False)
+    return session_index
+
+
+def clear(ticker: Optional[str] = None):
+    """Drop in-memory indexes (all of them, or one ticker's)"""
+    with _lock:
+        if ticker:
+            _tickers.pop(ticker, None)
+        else:
+            _tickers.clear()
+        _frames.clear()
@@ -43,20 +43,20 @@ def load_precomputed_hourly(
     
     Returns list of session dicts, or None if not available.
     """
-    clean_ticker = ticker.replace('!', '')
-    path = SESSIONS_DIR / f'{clean_ticker}_hourly.parquet'
+    path = precomputed_hourly_path(ticker)
     
     if not path.exists():
         return None
     
     try:
-        df = pd.read_parquet(path)
-        
-        # Apply time filter if specified
-        if start_ts is not None and 'startUnix' in df.columns:
-            df = df[df['startUnix'] >= start_ts]
-        if end_ts is not None and 'startUnix' in df.columns:
-            df = df[df['startUnix'] <= end_ts]
+        # Push the time filter down to row groups when the column exists
+        filters = []
+        if 'startUnix' in pq.read_schema(path).names:
+            if start_ts is not None:
+                filters.append(('startUnix', '>=', start_ts))
+            if end_ts is not None:
+                filters.append(('startUnix', '<=', end_ts))
+        df = pd.read_parquet(path, filters=filters or None)
         
         if df.empty:
             return []
@@ -80,8 +80,7 @@ def load_precomputed_daily(
     
     Returns list of session dicts, or None if not available.
     """
-    clean_ticker = ticker.replace('!', '')
-    path = SESSIONS_DIR / f'{clean_ticker}_sessions.json'
+    path = precomputed_daily_path(ticker)
     
     if not path.exists():
         return None
@@ -123,18 +122,26 @@ def load_precomputed_daily(
         return None
 
 
+def precomputed_hourly_path(ticker: str) -> Path:
+    """Location of the pre-computed hourly session file for ticker."""
+    clean_ticker = ticker.replace('!', '')
+    return SESSIONS_DIR / f'{clean_ticker}_hourly.parquet'
+
+
+def precomputed_daily_path(ticker: str) -> Path:
+    """Location of the pre-computed daily session file for ticker."""
+    clean_ticker = ticker.replace('!', '')
+    return SESSIONS_DIR / f'{clean_ticker}_sessions.json'
+
+
 def has_precomputed_hourly(ticker: str) -> bool:
     """Check if pre-computed hourly data exists for ticker."""
-    clean_ticker = ticker.replace('!', '')
-    path = SESSIONS_DIR / f'{clean_ticker}_hourly.parquet'
-    return path.exists()
+    return precomputed_hourly_path(ticker).exists()
 
 
 def has_precomputed_daily(ticker: str) -> bool:
     """Check if pre-computed daily data exists for ticker."""
-    clean_ticker = ticker.replace('!', '')
-    path = SESSIONS_DIR / f'{clean_ticker}_sessions.json'
-    return path.exists()
+    return precomputed_daily_path(ticker).exists()
 
 
 def get_hourly_sessions(
@@ -4,6 +4,10 @@ from datetime import time, timedelta
 from typing import List, Dict, Optional, Tuple
 from pathlib import Path
 
+from api.services import session_index
+from api.services.profiler_engine import Segments
+from api.services.session_index import NS_PER_SECOND, date_strings, isoformat, localize, to_local
+
 class SessionService:
     @staticmethod
     def calculate_sessions(df: pd.DataFrame, ticker: Optional[str] = None) -> List[Dict]:
@@ -33,8 +37,7 @@ class SessionService:
         # Shift index to align Trading Day (18:00 previous day -> 17:00 current day)
         # Adding 6 hours makes 18:00 -> 00:00 (start of next day)
         # So "Tuesday 18:00" becomes "Wednesday 00:00", belonging to Wednesday's trading day.
-        df_shifted = df.copy()
-        df_shifted.index = df.index + pd.Timedelta(hours=6)
+        df_shifted = df[['open', 'high', 'low', 'close']].set_axis(df.index + pd.Timedelta(hours=6))
 
         # 1. Calculate Daily Aggregates (PDH, PDL, PD-Mid) on TRADING DAY
         daily = df_shifted.resample('1D').agg({'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last'})
@@ -67,209 +70,170 @@ class SessionService:
         else:
             prev_weekly = weekly_df[['close']].shift(1)
 
-        # 3. Helpers
-        def get_price_at_time(d_data, t_str, date_ref):
-            try:
-                ts = pd.Timestamp.combine(date_ref, pd.to_datetime(t_str).time())
-                # If checking 00:00 or 02:30, it is on the 'date_ref' day.
-                # If checking 18:00, it is on 'date_ref - 1 day'.
-                # But d_data contains the full trading day (18:00 prev -> 17:00 curr).
-                # So we just search in d_data.
-                
-                # Careful: date_ref is the "Trading Date". 
-                # e.g. Wednesday. d_data has Tues 18:00 to Wed 17:00.
-                # If we ask for "08:00", it is Wed 08:00.
-                # If we ask for "18:00", it is ??? 18:00 is START of NEXT day.
-                # Usually we want "Globex Open" (18:00 of prev day) or "Midnight Open" (00:00 of curr day).
-                
-                # We need to construct the correct absolute timestamp for lookup.
-                # For 18:00 start, we want (date_ref - 1 day) 18:00.
-                # For 00:00, we want date_ref 00:00.
-                
-                t_obj = pd.to_datetime(t_str).time()
-                if t_obj.hour >= 18:
-                    ts = pd.Timestamp.combine(date_ref - timedelta(days=1), t_obj)
-                else:
-                    ts = pd.Timestamp.combine(date_ref, t_obj)
-                    
-                if d_data.index.tz:
-                     ts = ts.tz_localize(d_data.index.tz, ambiguous='NaT', nonexistent='shift_forward')
-                
-                idx = d_data.index.searchsorted(ts)
-                if idx < len(d_data):
-                    row = d_data.iloc[idx]
-                    if abs((row.name - ts).total_seconds()) < 1800:
-                        return row['open']
-            except: pass
-            return None
-
-        # Main Loop: Group by TRADING Date
-        # df_shifted has index shifted by +6H. 
-        # So Tuesday 18:00 (+6) -> Wed 00:00.
-        # Group by date of shifted index gives "Wednesday".
-        # But we need to iterate over original data rows.
-        # We can group the original DF by the shifted date.
-        
-        grouped = df.groupby(df_shifted.index.date)
+        # 3. Trading days and session windows as row offsets (see session_index)
+        index = session_index.for_frame(df.index)
+        tz = df.index.tz
+        utc_ns = index.utc_ns
+        opens = df['open'].to_numpy(dtype=np.float64)
+        highs = df['high'].to_numpy(dtype=np.float64)
+        lows = df['low'].to_numpy(dtype=np.float64)
+        n_days = len(index.dates)
+        dates = date_strings(index.dates)
+        date_ts = pd.DatetimeIndex(index.dates.astype('datetime64[D]').astype('datetime64[ns]'))
 
-        
-        for date_obj, day_data in grouped:
-            date_str = date_obj.strftime('%Y-%m-%d')
-            date_ts = pd.Timestamp(date_str)
-            if day_data.empty: continue
-
-            # --- Base Sessions (Asia, London, NY) ---
-            session_defs = [
-                {"name": "Asia", "start": "18:00", "end": "19:30"},
-                {"name": "London", "start": "02:30", "end": "03:30"},
-                {"name": "NY1", "start": "07:30", "end": "08:30"},
-                {"name": "NY2", "start": "11:30", "end": "12:30"},
-            ]
+        def boundary(hhmm, day_offset=0):
+            # Ambiguous times are dropped (-1), nonexistent ones shifted forward
+            return localize(index.wall_times(hhmm, day_offset), tz, nonexistent='shift_forward')
+
+        def price_at(ts_ns):
+            # Open of the first bar of each day at/after ts, if within 30 minutes (NaN if none)
+            row = np.maximum(np.searchsorted(utc_ns, ts_ns), index.day_lo)
+            found = (ts_ns >= 0) & (row < index.day_hi)
+            row = np.where(found, row, 0)
+            found &= np.abs(utc_ns[row] - ts_ns) < 1800 * NS_PER_SECOND
+            return np.where(found, opens[row], np.nan).tolist()
+
+        def ranges(lo, hi):
+            # High/low of every [lo, hi) window at once (NaN for empty windows)
+            seg = Segments(lo, hi)
+            high = seg.reduce(np.fmax, seg.gather(highs))
+            low = seg.reduce(np.fmin, seg.gather(lows))
+            return high.tolist(), low.tolist(), ((high + low) / 2).tolist()
+
+        def iso(values):
+            return isoformat(values, to_local(values, tz), tz is not None)
+
+        midnight_price = price_at(boundary("00:00"))
+        price_730 = price_at(boundary("07:30"))
+        midnight_iso = [f"{d}T00:00:00" for d in dates]
+        open_730_iso = [f"{d}T07:30:00" for d in dates]
+
+        # Standard Session Ranges (Asia 18:00 is on the previous calendar day),
+        # window rows limited to each trading day's bars
+        windows = []
+        for name in ("Asia", "London", "NY1", "NY2"):
+            w = index.window(name)
+            lo = np.maximum(w["lo"], index.day_lo)
+            hi = np.minimum(w["hi"], index.day_hi)
+            ok = ((w["start"] >= 0) & (w["end"] >= 0) & (hi > lo)).tolist()
+            hi = np.where(ok, hi, lo)
+            windows.append((name, ok, iso(w["start"]), iso(w["end"]), *ranges(lo, hi)))
+        asia = index.window("Asia")
+        globex_open = opens[np.minimum(np.maximum(asia["lo"], index.day_lo), len(opens) - 1)].tolist() if len(opens) else []
+
+        # Previous Day Levels (PDH, PDL, PDMid), aligned with the trading dates
+        prev_day = prev_daily.reindex(date_ts)
+        pd_high = prev_day['high'].tolist()
+        pd_low = prev_day['low'].tolist()
+        pd_mid = prev_day['mid'].tolist()
+
+        # Previous Week Close: last weekly row labeled on/before the date (asof)
+        pw_close = [None] * n_days
+        wk_index = prev_weekly.index
+        if wk_index.is_monotonic_increasing and wk_index.is_unique:
+            pos = wk_index.searchsorted(date_ts, side='right') - 1
+            closes = prev_weekly['close'].to_numpy(dtype=np.float64)
+            pw_close = [closes[p] if p >= 0 else None for p in pos.tolist()]
+        else:
+            # Unsorted / duplicate labels: per-date Index.asof as before
+            for day, ts in enumerate(date_ts):
+                try:
+                    last_wk_idx = wk_index.asof(ts)
+                    if pd.notna(last_wk_idx):
+                        pw_close[day] = safe_float(prev_weekly.loc[last_wk_idx]['close'])
+                except Exception as e:
+                    pass
 
+        # Opening Range
+        or_start = boundary("09:30")
+        or_end = np.where(or_start >= 0, or_start + 60 * NS_PER_SECOND, -1)
+        or_lo, or_hi = index.rows(or_start, or_end)
+        or_ok = ((or_start >= 0) & (or_hi > or_lo)).tolist()
+        or_range = ranges(or_lo, or_hi)
+        or_iso = (iso(or_start), iso(or_end))
+
+        # Assemble: one pass per TRADING Date, sessions in output order
+        # (bars from 18:00 belong to the next day's trading date)
+        for day, date_str in enumerate(dates):
             # Midnight Open (00:00)
-            mid_price = get_price_at_time(day_data, "00:00", date_obj)
-            if mid_price is not None:
-                 val = safe_float(mid_price)
-                 if val is not None:
-                    results.append({
-                        "date": date_str, "session": "MidnightOpen",
-                        "start_time": pd.Timestamp.combine(date_obj, time(0,0)).isoformat(),
-                        "price": val
-                    })
+            val = safe_float(midnight_price[day])
+            if val is not None:
+                results.append({
+                    "date": date_str, "session": "MidnightOpen",
+                    "start_time": midnight_iso[day],
+                    "price": val
+                })
 
             # 7:30 Open
-            open_730 = get_price_at_time(day_data, "07:30", date_obj)
-            if open_730 is not None:
-                val = safe_float(open_730)
-                if val is not None:
-                    results.append({
-                        "date": date_str, "session": "Open730",
-                        "start_time": pd.Timestamp.combine(date_obj, time(7,30)).isoformat(),
-                        "price": val
-                    })
-            
-            # Standard Session Ranges
-            # Standard Session Ranges
-            for sess in session_defs:
-                t_start = pd.to_datetime(sess["start"]).time()
-                t_end = pd.to_datetime(sess["end"]).time()
-                
-                # If start time is >= 18:00, it belongs to previous calendar day
-                if t_start.hour >= 18:
-                    start_t = pd.Timestamp.combine(date_obj - timedelta(days=1), t_start)
-                else:
-                    start_t = pd.Timestamp.combine(date_obj, t_start)
-                
-                # End time handling:
-                # If end time is < start time (crosses midnight)
-                # OR if start was shifted back but end is next day?
-                # Asia: 18:00 -> 02:00. (18 Prev -> 02 Curr)
-                # NY1: 08:00 -> 12:00 (08 Curr -> 12 Curr)
-                
-                # Logic: If end < start, add 1 day to end.
-                # If start was shifted back (18:00), and end is 02:00, 
-                # end should be date_obj (02:00). 
-                # If we construct end from date_obj, it is 02:00 Current. Correct.
-                
-                # But if standard logic:
-                if t_end < t_start:
-                   # This implies crossing midnight relative to start date
-                   end_t = pd.Timestamp.combine(start_t.date() + timedelta(days=1), t_end)
-                else:
-                   # Same day as start
-                   end_t = pd.Timestamp.combine(start_t.date(), t_end)
-                
-                if df.index.tz:
-                    try:
-                        start_t = start_t.tz_localize(df.index.tz, ambiguous='NaT', nonexistent='shift_forward')
-                        end_t = end_t.tz_localize(df.index.tz, ambiguous='NaT', nonexistent='shift_forward')
-                    except: continue
-
-                if pd.isna(start_t) or pd.isna(end_t): continue
-                
-                range_data = day_data[(day_data.index >= start_t) & (day_data.index < end_t)]
-                if not range_data.empty:
-                    high = range_data['high'].max()
-                    low = range_data['low'].min()
-                    mid = (high + low) / 2
-                    
-                    results.append({
-                        "date": date_str, "session": sess["name"],
-                        "start_time": start_t.isoformat(), "end_time": end_t.isoformat(),
-                        "high": safe_float(high), "low": safe_float(low), "mid": safe_float(mid)
-                    })
-                    
-                    if sess["name"] == "Asia":
-                        # Emit GlobexOpen line using Asia open
-                         op = safe_float(range_data.iloc[0]['open'])
-                         if op is not None:
-                            results.append({
-                                "date": date_str, "session": "GlobexOpen",
-                                "start_time": start_t.isoformat(),
-                                "price": op
-                            })
-                    
+            val = safe_float(price_730[day])
+            if val is not None:
+                results.append({
+                    "date": date_str, "session": "Open730",
+                    "start_time": open_730_iso[day],
+                    "price": val
+                })
+
+            for name, ok, start_iso, end_iso, high, low, mid in windows:
+                if not ok[day]: continue
+                results.append({
+                    "date": date_str, "session": name,
+                    "start_time": start_iso[day], "end_time": end_iso[day],
+                    "high": safe_float(high[day]), "low": safe_float(low[day]), "mid": safe_float(mid[day])
+                })
 
+                if name == "Asia":
+                    # Emit GlobexOpen line using Asia open
+                    op = safe_float(globex_open[day])
+                    if op is not None:
+                        results.append({
+                            "date": date_str, "session": "GlobexOpen",
+                            "start_time": start_iso[day],
+                            "price": op
+                        })
 
             # --- Previous Day Levels (PDH, PDL, PDMid) ---
-            # Retrieve from pre-calculated `prev_daily` (naive index lookup)
-            if date_ts in prev_daily.index:
-                p_row = prev_daily.loc[date_ts]
-                if not pd.isna(p_row['high']):
-                    s_iso = pd.Timestamp.combine(date_obj, time(0,0)).isoformat()
-                    results.append({"date": date_str, "session": "PDH", "start_time": s_iso, "price": safe_float(p_row['high'])})
-                    results.append({"date": date_str, "session": "PDL", "start_time": s_iso, "price": safe_float(p_row['low'])})
-                    results.append({"date": date_str, "session": "PDMid", "start_time": s_iso, "price": safe_float(p_row['mid'])})
+            if not pd.isna(pd_high[day]):
+                s_iso = midnight_iso[day]
+                results.append({"date": date_str, "session": "PDH", "start_time": s_iso, "price": safe_float(pd_high[day])})
+                results.append({"date": date_str, "session": "PDL", "start_time": s_iso, "price": safe_float(pd_low[day])})
+                results.append({"date": date_str, "session": "PDMid", "start_time": s_iso, "price": safe_float(pd_mid[day])})
 
             # --- Previous Week Close ---
-            try:
-                last_wk_idx = prev_weekly.index.asof(date_ts)
-                if pd.notna(last_wk_idx):
-                    last_wk = prev_weekly.loc[last_wk_idx]
-                    s_iso = pd.Timestamp.combine(date_obj, time(0,0)).isoformat()
-                    val = safe_float(last_wk['close'])
-                    if val is not None:
-                        results.append({"date": date_str, "session": "PWeeklyClose", "start_time": s_iso, "price": val})
-            except Exception as e: 
-                pass
+            val = safe_float(pw_close[day])
+            if val is not None:
+                results.append({"date": date_str, "session": "PWeeklyClose", "start_time": midnight_iso[day], "price": val})
 
             # --- Opening Range ---
-            or_start = pd.Timestamp.combine(date_obj, time(9, 30))
-            if df.index.tz: 
-                try:
-                    or_start = or_start.tz_localize(df.index.tz, ambiguous='NaT', nonexistent='shift_forward')
-                except: continue
-            or_end = or_start + pd.Timedelta(minutes=1)
-            try:
-                or_data = df.loc[or_start:or_end] # Slicing df (Timezone Aware)
-                or_data = or_data[or_data.index < or_end]
-                if not or_data.empty:
-                    h, l = or_data['high'].max(), or_data['low'].min()
-                    results.append({
-                        "date": date_str, "session": "OpeningRange",
-                        "start_time": or_start.isoformat(), "end_time": or_end.isoformat(),
-                        "high": safe_float(h), "low": safe_float(l), "mid": safe_float((h + l) / 2)
-                    })
-            except: pass
+            if or_ok[day]:
+                h, l, m = or_range[0][day], or_range[1][day], or_range[2][day]
+                results.append({
+                    "date": date_str, "session": "OpeningRange",
+                    "start_time": or_iso[0][day], "end_time": or_iso[1][day],
+                    "high": safe_float(h), "low": safe_float(l), "mid": safe_float(m)
+                })
         
         # --- 4. Post-Loop: 12H Session Generation ---
         try:
-           res_12h = df.resample('12h', offset='6h').agg({'high':'max', 'low':'min'})
-           res_12h['mid'] = (res_12h['high'] + res_12h['low']) / 2
-           shifted_12h = res_12h.shift(1) 
-           
-           for ts, row in shifted_12h.iterrows():
-               if pd.isna(row['high']): continue
-               end_ts = ts + pd.Timedelta(hours=12)
-               results.append({
-                   "date": ts.strftime('%Y-%m-%d'),
-                   "session": "P12", 
-                   "start_time": ts.isoformat(),
-                   "end_time": end_ts.isoformat(),
-                   "high": safe_float(row['high']),
-                   "low": safe_float(row['low']),
-                   "mid": safe_float(row['mid'])
-               })
+            res_12h = df.resample('12h', offset='6h').agg({'high':'max', 'low':'min'})
+            res_12h['mid'] = (res_12h['high'] + res_12h['low']) / 2
+            shifted_12h = res_12h.shift(1)
+            shifted_12h = shifted_12h[shifted_12h['high'].notna()]
+
+            start_ns = shifted_12h.index.asi8
+            end_ns = start_ns + 12 * 3600 * NS_PER_SECOND
+            for date_str, start_iso, end_iso, high, low, mid in zip(
+                shifted_12h.index.strftime('%Y-%m-%d').tolist(), iso(start_ns), iso(end_ns),
+                shifted_12h['high'].tolist(), shifted_12h['low'].tolist(), shifted_12h['mid'].tolist()
+            ):
+                results.append({
+                    "date": date_str,
+                    "session": "P12",
+                    "start_time": start_iso,
+                    "end_time": end_iso,
+                    "high": safe_float(high),
+                    "low": safe_float(low),
+                    "mid": safe_float(mid)
+                })
         except Exception as e:
             print(f"Error calculating 12H sessions: {e}")
 
@@ -390,37 +354,34 @@ class SessionService:
         if df.empty: return results
         
         target_time = pd.to_datetime(time_str).time()
-        unique_dates = np.unique(df.index.date)
+        tz = df.index.tz
 
         def safe_float(val):
             if pd.isna(val) or val is None: return None
             return float(val)
 
-        for date_obj in unique_dates:
-            date_str = date_obj.strftime('%Y-%m-%d')
-            start_ts = pd.Timestamp.combine(date_obj, target_time)
-            if df.index.tz: start_ts = start_ts.tz_localize(df.index.tz)
-            
-            end_ts = start_ts + pd.Timedelta(minutes=duration)
-            
-            try:
-                range_data = df.loc[start_ts:end_ts] 
-                range_data = range_data[range_data.index < end_ts]
-                
-                if not range_data.empty:
-                    high = range_data['high'].max()
-                    low = range_data['low'].min()
-                    mid = (high + low) / 2
-                    
-                    results.append({
-                        "date": date_str,
-                        "session": name,
-                        "start_time": start_ts.isoformat(),
-                        "end_time": end_ts.isoformat(),
-                        "high": safe_float(high),
-                        "low": safe_float(low),
-                        "mid": safe_float(mid)
-                    })
-            except KeyError:
-                 continue
+        # One window per date: [date + time_str, + duration) as row offsets
+        index = session_index.for_frame(df.index)
+        w = index.daily_window(target_time.hour * 60 + target_time.minute, duration)
+        start_iso = isoformat(w["start"], to_local(w["start"], tz), tz is not None)
+        end_iso = isoformat(w["end"], to_local(w["end"], tz), tz is not None)
+        highs = df['high'].to_numpy(dtype=np.float64)
+        lows = df['low'].to_numpy(dtype=np.float64)
+
+        for i, date_str in enumerate(date_strings(w["date"])):
+            lo, hi = w["lo"][i], w["hi"][i]
+            if hi <= lo: continue
+            high = np.fmax.reduce(highs[lo:hi])
+            low = np.fmin.reduce(lows[lo:hi])
+            mid = (high + low) / 2
+
+            results.append({
+                "date": date_str,
+                "session": name,
+                "start_time": start_iso[i],
+                "end_time": end_iso[i],
+                "high": safe_float(high),
+                "low": safe_float(low),
+                "mid": safe_float(mid)
+            })
         return results
@@ -0,0 +1,277 @@
+"""
+Session Store - profiler sessions as typed NumPy columns
+
+analyze_profiler_stats used to json.load {ticker}_profiler.json into a list
+of ~25-key dicts, cut it by days with a backwards scan over ISO strings and
+hand the dicts to every filter / price model consumer. A SessionStore keeps
+the same records column-wise:
+
+- numeric fields (open, ranges, pcts, *_ts epoch seconds) as float64/int64,
+  broken as bool, each with a validity mask where the JSON had nulls
+- string fields (date, session, status, *_time) as categorical codes
+- the local start date of every session (from start_time), so the last
+  N days are one searchsorted over the (start_time sorted) rows
+
+take()/select() return views over the same columns; records() builds the
+original dicts (same keys, order and values) only for the rows being
+serialized. to_frame()/from_frame() round-trip through the Arrow cache, so a
+cold worker memory-maps data/cache/arrow/{ticker}_profiler.arrow instead of
+parsing the JSON (see ProfilerService.session_store).
+
+Field kinds are inferred from the values: all bool -> bool, all int ->
+int, int/float -> float, str -> categorical; anything else stays an object
+column (kept in memory, not persisted).
+"""
+
+import itertools
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+# Frame column holding the validity mask of a nullable field
+VALID_SUFFIX = "__valid"
+
+_tokens = itertools.count(1)
+
+
+def _kind(values: List[Any]) -> str:
+    types = {type(v) for v in values} - {type(None)}
+    if types == {bool}:
+        return "bool"
+    if types and types <= {int}:
+        return "int"
+    if types and types <= {int, float}:
+        return "float"
+    if types <= {str}:
+        return "str"
+    return "obj"
+
+
+def _decode_table(categories: np.ndarray) -> np.ndarray:
+    # Trailing None so code -1 (null) decodes to None
+    table = np.empty(len(categories) + 1, dtype=object)
+    table[:-1] = categories
+    return table
+
+
+class SessionStore:
+    """Column-wise profiler session records (see module docstring)"""
+
+    def __init__(self, fields: List[str], kinds: Dict[str, str], values: Dict[str, np.ndarray],
+                 valid: Dict[str, np.ndarray], categories: Dict[str, np.ndarray],
+                 length: int, token: Any = None, start_day: Optional[np.ndarray] = None):
+        self.fields = fields
+        self.kinds = kinds
+        self._values = values
+        self._valid = valid
+        self._categories = categories
+        self._tables = {name: _decode_table(cats) for name, cats in categories.items()}
+        self._length = length
+        # Identity of this row set, e.g. for caches derived from the store
+        self.token = token if token is not None else next(_tokens)
+
+        if start_day is None:
+            start_day = np.full(length, -1, dtype=np.int64)
+            if "start_time" in categories:
+                # 'YYYY-MM-DD' prefix of start_time = local start date
+                cats = categories["start_time"]
+                cat_days = np.array([c[:10] for c in cats], dtype="datetime64[D]").astype(np.int64)
+                codes = values["start_time"]
+                start_day = np.where(codes >= 0, np.append(cat_days, -1)[codes], -1)
+        self.start_day = start_day
+
+    def __len__(self) -> int:
+        return self._length
+
+    @classmethod
+    def from_records(cls, records: Sequence[Dict]) -> "SessionStore":
+        fields = list(dict.fromkeys(k for r in records for k in r))
+        kinds, values, valid, categories = {}, {}, {}, {}
+        for name in fields:
+            column = [r.get(name) for r in records]
+            kind = kinds[name] = _kind(column)
+            mask = np.array([v is not None for v in column], dtype=bool)
+            if kind == "str":
+                codes, cats = pd.factorize(pd.Series(column, dtype=object), use_na_sentinel=True)
+                values[name] = codes.astype(np.int32)
+                categories[name] = np.asarray(cats, dtype=object)
+                continue
+            if kind == "obj":
+                values[name] = np.empty(len(column), dtype=object)
+                values[name][:] = column
+                continue
+            dtype = {"bool": bool, "int": np.int64, "float": np.float64}[kind]
+            fill = np.nan if kind == "float" else 0
+            values[name] = np.array([fill if v is None else v for v in column], dtype=dtype)
+            if not mask.all():
+                valid[name] = mask
+        return cls(fields, kinds, values, valid, categories, len(records))
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> "SessionStore":
+        fields = [c for c in frame.columns if not c.endswith(VALID_SUFFIX)]
+        kinds, values, valid, categories = {}, {}, {}, {}
+        for name in fields:
+            column = frame[name]
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                kinds[name] = "str"
+                values[name] = np.asarray(column.cat.codes, dtype=np.int32)
+                categories[name] = np.asarray(column.cat.categories, dtype=object)
+                continue
+            array = column.to_numpy()
+            kinds[name] = "bool" if array.dtype == bool else "int" if array.dtype.kind in "iu" else "float"
+            values[name] = array
+            if name + VALID_SUFFIX in frame.columns:
+                valid[name] = frame[name + VALID_SUFFIX].to_numpy()
+        return cls(fields, kinds, values, valid, categories, len(frame))
+
+    def persistable(self) -> bool:
+        return "obj" not in self.kinds.values()
+
+    def to_frame(self) -> pd.DataFrame:
+        columns = {}
+        for name in self.fields:
+            if self.kinds[name] == "str":
+                columns[name] = pd.Categorical.from_codes(self._values[name], categories=self._categories[name])
+            else:
+                columns[name] = self._values[name]
+            if name in self._valid:
+                columns[name + VALID_SUFFIX] = self._valid[name]
+        return pd.DataFrame(columns)
+
+    # ------------------------------------------------------------------
+    # Row selection
+    # ------------------------------------------------------------------
+
+    def take(self, rows) -> "SessionStore":
+        """Store over a subset of rows (slice -> views, index array -> copies)"""
+        if isinstance(rows, slice):
+            start, stop, _ = rows.indices(self._length)
+            length = max(stop - start, 0)
+            token = (self.token, start, stop)
+        else:
+            rows = np.asarray(rows, dtype=np.int64)
+            length = len(rows)
+            token = None
+        return SessionStore(
+            self.fields, self.kinds,
+            {name: v[rows] for name, v in self._values.items()},
+            {name: v[rows] for name, v in self._valid.items()},
+            self._categories, length, token, self.start_day[rows]
+        )
+
+    def select(self, fields: Iterable[str]) -> "SessionStore":
+        """Store with only the given fields (missing ones are skipped)"""
+        fields = [f for f in fields if f in self.kinds]
+        return SessionStore(
+            fields, {f: self.kinds[f] for f in fields},
+            {f: self._values[f] for f in fields},
+            {f: self._valid[f] for f in fields if f in self._valid},
+            {f: self._categories[f] for f in fields if f in self._categories},
+            self._length, start_day=self.start_day
+        )
+
+    def cutoff_row(self, days: int) -> int:
+        """
+        First row of the last `days` days: sessions starting on or after
+        (local start date of the last session - days). Rows must be sorted
+        by start_time, as written by compute_profiler_sessions.
+        """
+        if self._length == 0:
+            return 0
+        return int(np.searchsorted(self.start_day, self.start_day[-1] - days, side="left"))
+
+    # ------------------------------------------------------------------
+    # Column access
+    # ------------------------------------------------------------------
+
+    def has(self, name: str) -> bool:
+        return name in self.kinds
+
+    def valid(self, name: str) -> np.ndarray:
+        """True where the field is present and not null"""
+        if name not in self.kinds:
+            return np.zeros(self._length, dtype=bool)
+        if self.kinds[name] == "str":
+            return self._values[name] >= 0
+        if self.kinds[name] == "obj":
+            return np.array([v is not None for v in self._values[name]], dtype=bool)
+        return self._valid.get(name, np.ones(self._length, dtype=bool))
+
+    def floats(self, name: str) -> np.ndarray:
+        """Numeric field as float64, NaN where null or missing"""
+        if name not in self.kinds or self.kinds[name] in ("str", "obj"):
+            return np.full(self._length, np.nan)
+        out = self._values[name].astype(np.float64)
+        if name in self._valid:
+            out[~self._valid[name]] = np.nan
+        return out
+
+    def codes(self, name: str) -> np.ndarray:
+        """Categorical codes of a string field (-1 = null or missing)"""
+        if self.kinds.get(name) != "str":
+            return np.full(self._length, -1, dtype=np.int32)
+        return self._values[name]
+
+    def categories(self, name: str) -> np.ndarray:
+        return self._categories.get(name, np.empty(0, dtype=object))
+
+    def column(self, name: str) -> np.ndarray:
+        """Raw field values (str decoded to objects, None where null); nulls in numeric fields are NaN/0/False"""
+        if self.kinds.get(name) == "str":
+            return self._tables[name][self._values[name]]
+        if name not in self.kinds:
+            return np.full(self._length, None, dtype=object)
+        return self._values[name]
+
+    def equals(self, name: str, value: str) -> np.ndarray:
+        """Rows whose string field equals value"""
+        hit = np.flatnonzero(self.categories(name) == value)
+        if not len(hit):
+            return np.zeros(self._length, dtype=bool)
+        return self.codes(name) == hit[0]
+
+    def isin(self, name: str, values: Iterable[str]) -> np.ndarray:
+        """Rows whose string field is one of values"""
+        wanted = np.flatnonzero(np.isin(self.categories(name), list(values)))
+        return np.isin(self.codes(name), wanted)
+
+    def last_by(self, name: str, rows: np.ndarray) -> Dict[str, int]:
+        """{value of string field: last row among rows} (later rows win, as in a dict regroup)"""
+        rows = np.asarray(rows, dtype=np.int64)
+        codes = self.codes(name)[rows]
+        rows, codes = rows[codes >= 0], codes[codes >= 0]
+        return dict(zip(self._tables[name][codes].tolist(), rows.tolist()))
+
+    def value(self, name: str, row: int) -> Any:
+        return self._pylist(name, np.array([row]))[0]
+
+    # ------------------------------------------------------------------
+    # Serialization
+    # ------------------------------------------------------------------
+
+    def _pylist(self, name: str, rows) -> List[Any]:
+        kind = self.kinds.get(name)
+        if kind is None:
+            n = len(range(self._length)[rows]) if isinstance(rows, slice) else len(rows)
+            return [None] * n
+        if kind == "str":
+            return self._tables[name][self._values[name][rows]].tolist()
+        out = self._values[name][rows].tolist()
+        if name in self._valid:
+            missing = np.flatnonzero(~self._valid[name][rows])
+            for i in missing.tolist():
+                out[i] = None
+        return out
+
+    def records(self, rows=None, fields: Optional[Sequence[str]] = None) -> List[Dict]:
+        """Session dicts (original keys and values) for rows (default: all), optionally only some fields"""
+        rows = slice(None) if rows is None else rows
+        names = list(fields) if fields is not None else self.fields
+        columns = [self._pylist(name, rows) for name in names]
+        if not columns:
+            n = len(range(self._length)[rows]) if isinstance(rows, slice) else len(rows)
+            return [{} for _ in range(n)]
+        return [dict(zip(names, values)) for values in zip(*columns)]
@@ -0,0 +1,199 @@
+"""
+Pure-NumPy implementations of the TA-Lib functions used by the indicator service
+
+Used when the TA-Lib C library is not installed (e.g. slim containers).
+Signatures, lookback (leading NaN) and seeding follow TA-Lib's defaults so
+results match it to floating point precision:
+
+- SMA: window mean, first value at index period-1
+- EMA: seeded with the SMA of the first `period` values, k = 2 / (period + 1)
+- RSI / ATR: Wilder smoothing, seeded with the plain average, first value at index period
+- BBANDS (matype 0): SMA middle band +/- nbdev * population standard deviation
+- MACD: fast EMA seeded at index slow-1 (so both EMAs start together),
+  signal = EMA of the MACD line, all three outputs start at index slow+signal-2
+
+Recursive filters use scipy.signal.lfilter when scipy is importable and a
+blockwise closed-form NumPy evaluation otherwise.
+
+Verify against TA-Lib with scripts/debug/verify_talib.py.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    from scipy.signal import lfilter
+except ImportError:
+    lfilter = None
+
+
+# Rows per chunk for sliding-window statistics (bounds temporary memory)
+_CHUNK = 65_536
+
+
+def _as_input(values) -> np.ndarray:
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+def _recurrence(x: np.ndarray, alpha: float, y0: float) -> np.ndarray:
+    """
+    y[i] = alpha * y[i-1] + x[i], with y[-1] = y0.
+    """
+    n = len(x)
+    if n == 0:
+        return np.empty(0)
+    if alpha == 0.0:
+        return x.copy()
+    if lfilter is not None:
+        y, _ = lfilter([1.0], [1.0, -alpha], x, zi=[alpha * y0])
+        return y
+
+    # Closed form inside a block of length B starting after y_prev:
+    #   y[t] = alpha^(t+1) * y_prev + sum_{j<=t} alpha^(t-j) * x[j]
+    #        = alpha^t * (alpha * y_prev + cumsum(x[j] * alpha^-j)[t])
+    # B keeps alpha^-B <= 1e12 so the scaled terms stay well conditioned.
+    block = int(min(4096, max(1, np.floor(12 * np.log(10) / -np.log(alpha)))))
+    powers = alpha ** np.arange(block)
+    inverse = 1.0 / powers
+    y = np.empty(n)
+    prev = y0
+    for start in range(0, n, block):
+        chunk = x[start:start + block]
+        m = len(chunk)
+        acc = np.cumsum(chunk * inverse[:m])
+        acc += alpha * prev
+        y[start:start + m] = acc * powers[:m]
+        prev = y[start + m - 1]
+    return y
+
+
+def _ema_from(x: np.ndarray, period: int, seed_index: int, k: float) -> np.ndarray:
+    """
+    EMA of x whose first value sits at seed_index and is the SMA of the
+    `period` values ending there (TA-Lib's default seeding). NaN before it.
+    """
+    out = np.full(len(x), np.nan)
+    if seed_index >= len(x) or seed_index - period + 1 < 0:
+        return out
+    seed = x[seed_index - period + 1:seed_index + 1].sum() / period
+    out[seed_index] = seed
+    out[seed_index + 1:] = _recurrence(k * x[seed_index + 1:], 1.0 - k, seed)
+    return out
+
+
+def _wilder(x: np.ndarray, period: int, first: int) -> np.ndarray:
+    """
+    Wilder smoothing of x[first:], seeded with the mean of the first
+    `period` values: out[first+period-1] = mean, then
+    out[i] = (out[i-1] * (period-1) + x[i]) / period.
+    """
+    out = np.full(len(x), np.nan)
+    seed_index = first + period - 1
+    if seed_index >= len(x):
+        return out
+    seed = x[first:seed_index + 1].sum() / period
+    out[seed_index] = seed
+    out[seed_index + 1:] = _recurrence(x[seed_index + 1:] / period, (period - 1) / period, seed)
+    return out
+
+
+def SMA(real, timeperiod: int = 30) -> np.ndarray:
+    x = _as_input(real)
+    out = np.full(len(x), np.nan)
+    if timeperiod < 1 or len(x) < timeperiod:
+        return out
+    out[timeperiod - 1:] = np.convolve(x, np.ones(timeperiod), mode="valid") / timeperiod
+    return out
+
+
+def EMA(real, timeperiod: int = 30) -> np.ndarray:
+    x = _as_input(real)
+    return _ema_from(x, timeperiod, timeperiod - 1, 2.0 / (timeperiod + 1))
+
+
+def RSI(real, timeperiod: int = 14) -> np.ndarray:
+    x = _as_input(real)
+    out = np.full(len(x), np.nan)
+    if timeperiod < 2 or len(x) <= timeperiod:
+        return out
+    diff = np.empty(len(x))
+    diff[0] = 0.0
+    diff[1:] = np.diff(x)
+    gain = _wilder(np.where(diff > 0, diff, 0.0), timeperiod, 1)
+    loss = _wilder(np.where(diff < 0, -diff, 0.0), timeperiod, 1)
+    total = gain + loss
+    valid = ~np.isnan(total)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100.0 * gain / total
+    # No movement at all over the seed window: TA-Lib outputs 0
+    rsi = np.where(total == 0.0, 0.0, rsi)
+    out[valid] = rsi[valid]
+    return out
+
+
+def TRANGE(high, low, close) -> np.ndarray:
+    h, l, c = _as_input(high), _as_input(low), _as_input(close)
+    out = np.full(len(h), np.nan)
+    if len(h) < 2:
+        return out
+    prev_close = c[:-1]
+    out[1:] = np.maximum(h[1:], prev_close) - np.minimum(l[1:], prev_close)
+    return out
+
+
+def ATR(high, low, close, timeperiod: int = 14) -> np.ndarray:
+    tr = TRANGE(high, low, close)
+    if timeperiod <= 1:
+        return tr
+    tr_values = np.where(np.isnan(tr), 0.0, tr)
+    return _wilder(tr_values, timeperiod, 1)
+
+
+def _rolling_std(x: np.ndarray, period: int) -> np.ndarray:
+    """Population std of each full window, computed two-pass per chunk"""
+    out = np.full(len(x), np.nan)
+    if len(x) < period:
+        return out
+    windows = sliding_window_view(x, period)
+    for start in range(0, len(windows), _CHUNK):
+        chunk = windows[start:start + _CHUNK]
+        out[period - 1 + start:period - 1 + start + len(chunk)] = chunk.std(axis=1)
+    return out
+
+
+def BBANDS(real, timeperiod: int = 5, nbdevup: float = 2.0, nbdevdn: float = 2.0, matype: int = 0):
+    if matype != 0:
+        raise ValueError("Only matype=0 (SMA) is supported without TA-Lib")
+    x = _as_input(real)
+    middle = SMA(x, timeperiod)
+    if timeperiod == 1:
+        std = np.where(np.isnan(middle), np.nan, 0.0)
+    else:
+        std = _rolling_std(x, timeperiod)
+        # TA-Lib outputs 0 for variances below 1e-8
+        std = np.where(std * std < 1e-8, 0.0, std)
+    return middle + nbdevup * std, middle, middle - nbdevdn * std
+
+
+def MACD(real, fastperiod: int = 12, slowperiod: int = 26, signalperiod: int = 9):
+    x = _as_input(real)
+    if slowperiod < fastperiod:
+        fastperiod, slowperiod = slowperiod, fastperiod
+    n = len(x)
+    start = slowperiod - 1
+    nan = np.full(n, np.nan)
+    if n <= start:
+        return nan, nan.copy(), nan.copy()
+
+    # Both EMAs produce their first value at the slow lookback
+    slow = _ema_from(x, slowperiod, start, 2.0 / (slowperiod + 1))
+    fast = _ema_from(x, fastperiod, start, 2.0 / (fastperiod + 1))
+    line = fast - slow
+
+    signal = np.full(n, np.nan)
+    signal[start:] = _ema_from(line[start:], signalperiod, signalperiod - 1, 2.0 / (signalperiod + 1))
+
+    first = start + signalperiod - 1
+    line[:first] = np.nan
+    hist = line - signal
+    return line, signal, hist
@@ -14,6 +14,8 @@ import numpy as np
 from typing import Dict, List, Optional
 import pytz
 
+from api.services.columnar import to_nullable_list
+
 
 def calculate_vwap_with_settings(
     df: pd.DataFrame,
@@ -23,6 +25,22 @@ def calculate_vwap_with_settings(
     bands: List[float] = None,
     source: str = "hlc3"
 ) -> Dict[str, List[Optional[float]]]:
+    """
+    Calculate VWAP with advanced settings (JSON-ready lists, None for NaN).
+    See calculate_vwap_arrays for the arguments.
+    """
+    result = calculate_vwap_arrays(df, anchor, anchor_time, anchor_timezone, bands, source)
+    return {key: to_nullable_list(values) for key, values in result.items()}
+
+
+def calculate_vwap_arrays(
+    df: pd.DataFrame,
+    anchor: str = "session",
+    anchor_time: str = "09:30",
+    anchor_timezone: str = "America/New_York",
+    bands: List[float] = None,
+    source: str = "hlc3"
+) -> Dict[str, np.ndarray]:
     """
     Calculate VWAP with advanced settings.
     
@@ -36,13 +54,13 @@ def calculate_vwap_with_settings(
         source: Price source - 'hlc3', 'close', 'ohlc4'
     
     Returns:
-        Dict with 'vwap', 'upper_1', 'lower_1', etc.
+        Dict of float64 arrays: 'vwap', 'vwap_upper_1_0', 'vwap_lower_1_0', etc.
     """
     if bands is None:
         bands = [1.0]
     
     if df.empty:
-        return {'vwap': []}
+        return {'vwap': np.empty(0)}
     
     # Create working copy
     df = df.copy()
@@ -138,15 +156,8 @@ def calculate_vwap_with_settings(
     
     df['vwap'] = vwap
     
-    # OPTIMIZED: Use numpy for result serialization
-    def to_nullable_list(arr: np.ndarray) -> List[Optional[float]]:
-        """Convert numpy array to list with None for NaN values."""
-        result = arr.tolist()
-        # Replace NaN with None (faster than list comprehension for large arrays)
-        return [None if (isinstance(v, float) and np.isnan(v)) else v for v in result]
-    
     result = {
-        'vwap': to_nullable_list(vwap)
+        'vwap': vwap
     }
     
     # Calculate standard deviation bands
@@ -169,8 +180,8 @@ def calculate_vwap_with_settings(
             upper = vwap + (std * mult)
             lower = vwap - (std * mult)
             
-            result[upper_key] = to_nullable_list(upper)
-            result[lower_key] = to_nullable_list(lower)
+            result[upper_key] = upper
+            result[lower_key] = lower
     
     return result
 
@@ -2,12 +2,13 @@
 VWAP Loader Service - Load pre-computed VWAP or calculate on-demand
 """
 
+import numpy as np
 import pandas as pd
 import pyarrow.parquet as pq
 from pathlib import Path
 from typing import Dict, List, Optional, Any
 
-from api.services.vwap import calculate_vwap_with_settings
+from api.services.vwap import calculate_vwap_arrays, calculate_vwap_with_settings
 from api.services.data_loader import load_parquet
 
 
@@ -75,11 +76,13 @@ def load_precomputed_vwap(
     timeframe: str,
     settings: Dict[str, Any],
     start_time: Optional[int] = None,
-    end_time: Optional[int] = None
+    end_time: Optional[int] = None,
+    as_arrays: bool = False
 ) -> Optional[Dict[str, List]]:
     """
     Load pre-computed VWAP from parquet file.
     Returns None if pre-computed data is not available or settings don't match.
+    With as_arrays=True the series are numpy arrays instead of lists.
     """
     path = get_precomputed_path(ticker, timeframe)
     
@@ -90,21 +93,23 @@ def load_precomputed_vwap(
         return None
     
     try:
-        # Read parquet file
-        df = pd.read_parquet(path)
-        
-        # Apply time filter if specified
+        # Read parquet file, pushing the time filter down to row groups
+        filters = []
         if start_time is not None:
-            df = df[df['time'] >= start_time]
+            filters.append(('time', '>=', start_time))
         if end_time is not None:
-            df = df[df['time'] <= end_time]
+            filters.append(('time', '<=', end_time))
+        df = pd.read_parquet(path, filters=filters or None)
         
         if df.empty:
             return None
         
+        def column(name):
+            return df[name].to_numpy(dtype=np.float64) if as_arrays else df[name].tolist()
+        
         # Build result dict matching calculate_vwap_with_settings format
         result = {
-            'vwap': df['vwap'].tolist()
+            'vwap': column('vwap')
         }
         
         # Add bands based on requested settings
@@ -122,11 +127,12 @@ def load_precomputed_vwap(
                 mult_str = str(band).replace('.', '_')
                 
                 if upper_col in df.columns:
-                    result[f'vwap_upper_{mult_str}'] = df[upper_col].tolist()
+                    result[f'vwap_upper_{mult_str}'] = column(upper_col)
                 if lower_col in df.columns:
-                    result[f'vwap_lower_{mult_str}'] = df[lower_col].tolist()
+                    result[f'vwap_lower_{mult_str}'] = column(lower_col)
         
-        return result, df['time'].tolist()
+        time_series = df['time'].to_numpy(dtype=np.int64) if as_arrays else df['time'].tolist()
+        return result, time_series
         
     except Exception as e:
         print(f'[VWAP Loader] Error loading {path}: {e}')
@@ -138,15 +144,17 @@ def get_vwap(
     timeframe: str,
     settings: Dict[str, Any],
     start_time: Optional[int] = None,
-    end_time: Optional[int] = None
+    end_time: Optional[int] = None,
+    as_arrays: bool = False
 ) -> Optional[Dict[str, Any]]:
     """
     Get VWAP data - tries pre-computed first, falls back to on-demand calculation.
     
-    Returns dict with 'time' and 'indicators' keys.
+    Returns dict with 'time' and 'indicators' keys (numpy arrays instead of
+    lists when as_arrays=True, for the binary response formats).
     """
     # Try pre-computed data first
-    precomputed = load_precomputed_vwap(ticker, timeframe, settings, start_time, end_time)
+    precomputed = load_precomputed_vwap(ticker, timeframe, settings, start_time, end_time, as_arrays)
     
     if precomputed is not None:
         indicators, time_series = precomputed
@@ -156,22 +164,14 @@ def get_vwap(
             'source': 'precomputed'
         }
     
-    # Fall back to on-demand calculation
-    df = load_parquet(ticker, timeframe)
+    # Fall back to on-demand calculation (time range is pushed down into the read)
+    df = load_parquet(ticker, timeframe, start_time=start_time, end_time=end_time)
     if df is None or df.empty:
         return None
     
-    # Apply time filter
-    if start_time is not None:
-        df = df[df['time'] >= start_time]
-    if end_time is not None:
-        df = df[df['time'] <= end_time]
-    
-    if df.empty:
-        return None
-    
     # Calculate on-demand
-    result = calculate_vwap_with_settings(
+    calculate = calculate_vwap_arrays if as_arrays else calculate_vwap_with_settings
+    result = calculate(
         df,
         anchor=settings.get('anchor', 'session'),
         anchor_time=settings.get('anchor_time', get_default_settings(ticker)['anchor_time']),
@@ -181,7 +181,7 @@ def get_vwap(
     )
     
     return {
-        'time': df['time'].tolist(),
+        'time': df['time'].to_numpy(dtype=np.int64) if as_arrays else df['time'].tolist(),
         'indicators': result,
         'source': 'calculated'
     }
@@ -0,0 +1,171 @@
+"""
+Warmup - background cache pre-warming with readiness reporting
+
+The startup hook used to run ProfilerService.prewarm_cache("NQ1") inline, so
+the server accepted no traffic until it finished, only NQ1 was covered and a
+failure was printed and forgotten. start() instead schedules every ticker in
+WARMUP_TICKERS (in that priority order) on the executor's "warmup" lane and
+returns immediately; requests are served throughout (a cold ticker just
+pays its lazy load as before).
+
+- status() reports per-ticker state (pending, warming, ready, failed,
+  missing = no data files) with timings and the last error; served at
+  /health/ready, which answers 503 until the first pass has finished
+- schedule(ticker) re-warms after a cache clear (the clear-cache endpoints
+  call it); a ticker cleared while warming is warmed again right after
+- a watcher re-warms tickers whose source files changed (fingerprints
+  polled every WARMUP_POLL_SECONDS)
+
+Configuration:
+    WARMUP_TICKERS        priority-ordered list (default: ES1,NQ1,YM1,RTY1,GC1,CL1; empty = off)
+    WARMUP_POLL_SECONDS   source file polling interval (default: 30, 0 = no watching)
+    Concurrency is the "warmup" lane limit (EXECUTOR_LANE_LIMITS, default 2).
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from api.services import executor
+
+
+TICKERS = [t.strip() for t in os.environ.get("WARMUP_TICKERS", "ES1,NQ1,YM1,RTY1,GC1,CL1").split(",") if t.strip()]
+POLL_SECONDS = float(os.environ.get("WARMUP_POLL_SECONDS", "30"))
+LANE = "warmup"
+
+# Files a warm ticker's caches are built from (data/{ticker}_{name})
+SOURCE_FILES = ["profiler.json", "1m.parquet", "daily_hod_lod.json", "level_touches.json", "level_touches.arrow", "filter_cube.arrow"]
+
+_status: Dict[str, Dict[str, Any]] = {}
+_tasks: Dict[str, asyncio.Task] = {}
+_rerun: set = set()
+_watcher: Optional[asyncio.Task] = None
+_started_at: Optional[float] = None
+
+
+def _tickers() -> List[str]:
+    from api.services.profiler_service import ProfilerService
+    return list(dict.fromkeys(ProfilerService._normalize_ticker(t) for t in TICKERS))
+
+
+def _sources(ticker: str) -> tuple:
+    from api.services.profiler_service import ProfilerService
+    return ProfilerService._fingerprint(ticker, *SOURCE_FILES)
+
+
+def _has_data(fingerprint: tuple) -> bool:
+    # profiler.json or 1m.parquet present
+    return fingerprint[0] is not None or fingerprint[1] is not None
+
+
+def _warm(ticker: str) -> tuple:
+    """Warm one ticker (worker thread); returns the source fingerprint it was built from"""
+    from api.services.profiler_service import ProfilerService
+    fingerprint = _sources(ticker)
+    if _has_data(fingerprint):
+        ProfilerService.prewarm_cache(ticker)
+    return fingerprint
+
+
+async def _warm_ticker(ticker: str):
+    state = _status[ticker]
+    while True:
+        _rerun.discard(ticker)
+        state.update(status="warming", started_at=time.time(), error=None)
+        started = time.perf_counter()
+        try:
+            fingerprint = await executor.run_in_thread(LANE, _warm, ticker)
+            state.update(
+                status="ready" if _has_data(fingerprint) else "missing",
+                fingerprint=fingerprint,
+                seconds=round(time.perf_counter() - started, 3),
+                warmed_at=time.time(),
+                runs=state["runs"] + 1,
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[Warmup] {ticker} failed: {e}")
+            state.update(
+                status="failed", error=str(e), fingerprint=_sources(ticker),
+                seconds=round(time.perf_counter() - started, 3), runs=state["runs"] + 1,
+            )
+        if ticker not in _rerun:
+            break
+    if state["status"] == "ready":
+        print(f"[Warmup] {ticker} ready in {state['seconds']}s")
+
+
+def schedule(ticker: Optional[str] = None):
+    """(Re-)warm one configured ticker, or all of them, in the background"""
+    if ticker is not None:
+        from api.services.profiler_service import ProfilerService
+        ticker = ProfilerService._normalize_ticker(ticker)
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return  # No server loop (scripts): nothing to schedule on
+    for t in _tickers():
+        if (ticker is not None and t != ticker) or t not in _status:
+            continue
+        task = _tasks.get(t)
+        if task is not None and not task.done():
+            _rerun.add(t)
+            continue
+        _status[t]["status"] = "pending"
+        _tasks[t] = asyncio.create_task(_warm_ticker(t))
+
+
+async def _watch():
+    while True:
+        await asyncio.sleep(POLL_SECONDS)
+        for ticker in _tickers():
+            # One failing check (file replaced mid-scan, ...) must not end the watcher
+            try:
+                state = _status[ticker]
+                if state["status"] in ("pending", "warming"):
+                    continue
+                fingerprint = await executor.run_in_thread(LANE, _sources, ticker)
+                if fingerprint != state["fingerprint"]:
+                    print(f"[Warmup] {ticker} source files changed, re-warming")
+                    schedule(ticker)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[Warmup] Watching {ticker} failed: {e}")
+
+
+def start():
+    """Schedule the initial warm-up (call from the startup hook; returns immediately)"""
+    global _watcher, _started_at
+    _started_at = time.time()
+    for ticker in _tickers():
+        _status[ticker] = {
+            "status": "pending", "started_at": None, "warmed_at": None,
+            "seconds": None, "runs": 0, "error": None, "fingerprint": None,
+        }
+    # Tasks queue on the lane in creation order = priority order
+    schedule()
+    if POLL_SECONDS > 0 and _tickers():
+        _watcher = asyncio.create_task(_watch())
+
+
+def stop():
+    global _watcher
+    if _watcher is not None:
+        _watcher.cancel()
+        _watcher = None
+    for task in _tasks.values():
+        task.cancel()
+    _tasks.clear()
+
+
+def status() -> Dict[str, Any]:
+    """Readiness (no ticker pending/warming) and per-ticker warm state"""
+    tickers = {
+        ticker: {k: v for k, v in state.items() if k != "fingerprint"}
+        for ticker, state in _status.items()
+    }
+    ready = all(state["status"] not in ("pending", "warming") for state in tickers.values())
+    return {"ready": ready, "started_at": _started_at, "tickers": tickers}
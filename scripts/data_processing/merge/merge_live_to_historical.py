@@ -1,8 +1,12 @@
 
 import pandas as pd
 from pathlib import Path
+import os
+import sys
 import time
-import shutil
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'utils'))
+import data_utils
 
 def merge_live_to_historical(ticker="NQ1", live_symbol="-NQ"):
     """
@@ -22,11 +26,8 @@ def merge_live_to_historical(ticker="NQ1", live_symbol="-NQ"):
         print("Live file not found.")
         return
 
-    # Backup
-    backup_path = data_dir / "backup" / f"{ticker}_1m_pre_merge.parquet"
-    backup_path.parent.mkdir(parents=True, exist_ok=True)
-    shutil.copy(hist_path, backup_path)
-    print(f"Backed up to {backup_path}")
+    # Backup (file or partitioned directory)
+    data_utils.create_backup(str(hist_path))
 
     # Load
     df_hist = pd.read_parquet(hist_path)
@@ -55,21 +56,9 @@ def merge_live_to_historical(ticker="NQ1", live_symbol="-NQ"):
     print(f"New rows to add: {len(new_data):,}")
     
     if len(new_data) > 0:
-        # Concat
-        # Ensure Hist has same columns order
-        df_hist = df_hist[cols]
-        combined = pd.concat([df_hist, new_data])
-        
-        # Sort
-        combined = combined.sort_values('time')
-        
-        # Drop duplicates just in case
-        combined = combined.drop_duplicates(subset=['time'], keep='last')
-        
-        print(f"Combined: {len(combined):,} rows")
-        
-        # Save
-        combined.to_parquet(hist_path)
+        # Upsert into the historical dataset - only the partition(s) holding
+        # the new bars are rewritten, not the whole history
+        data_utils.safe_append_parquet(new_data, str(hist_path))
         print("Saved successfully.")
         
         # Also need to trigger chunk update? 
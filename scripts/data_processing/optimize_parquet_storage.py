@@ -1,55 +1,68 @@
-import pandas as pd
-from pathlib import Path
+"""
+Rewrite bar files into the canonical parquet layout used by the API:
+- time-sorted, int64 'time' column in seconds
+- zstd compression, row-group statistics, fixed row-group size
+- intraday files partitioned by year (data/NQ1_1m.parquet/2024.parquet ...)
+
+Range reads then only decode the partitions / row groups that overlap the
+requested window, and live merges only rewrite the current year.
+
+Usage:
+    python scripts/data_processing/optimize_parquet_storage.py
+    python scripts/data_processing/optimize_parquet_storage.py --ticker NQ1 --dry-run
+    python scripts/data_processing/optimize_parquet_storage.py --partition month
+"""
+
+import argparse
 import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'utils'))
+import data_utils
+from api.services.parquet_store import dataset_size, default_partitioning, is_partitioned
 
-def optimize_parquet():
-    data_dir = Path("data")
-    # Targets that failed
-    targets = ["ES1_1m.parquet", "CL1_1m.parquet", "NQ1_1m.parquet"]
-    
-    for filename in targets:
-        path = data_dir / filename
-        if not path.exists():
-            print(f"Skipping {filename}: Not found")
+
+def optimize_parquet(ticker=None, partition="auto", dry_run=False):
+    data_dir = Path(data_utils.DATA_DIR)
+    pattern = f"{ticker}_*.parquet" if ticker else "*.parquet"
+
+    for path in sorted(data_dir.glob(pattern)):
+        # Live streaming files are owned by the streamer and stay as-is
+        if path.name.startswith("live_storage_"):
+            continue
+
+        scheme = default_partitioning(path) if partition == "auto" else partition
+        layout = "directory" if is_partitioned(path) else "file"
+        old_size = dataset_size(path) / (1024 * 1024)
+        print(f"{path.name}: {layout}, {old_size:.2f} MB -> {scheme or 'single file'}")
+
+        if dry_run:
             continue
-            
-        old_size = path.stat().st_size / (1024 * 1024)
-        print(f"Reading {filename} ({old_size:.2f} MB)...")
-        
+
         try:
             df = pd.read_parquet(path)
-            
-            # Save with 'brotli' compression (high ratio, slower)
-            # Check if pyarrow supports it (standard in modern envs)
-            temp_path = path.with_suffix(".temp.parquet")
-            
-            # Brotli is usually best for static storage. Zstd is good too.
-            # trying 'brotli' first.
-            df.to_parquet(temp_path, compression='brotli')
-            
-            new_size = temp_path.stat().st_size / (1024 * 1024)
-            reduction = old_size - new_size
-            pct = (reduction / old_size) * 100
-            
-            print(f"  -> Compressed: {new_size:.2f} MB")
-            print(f"  -> Reduction: {reduction:.2f} MB ({pct:.1f}%)")
-            
-            if new_size < 100:
-                print("  ✅ Access granted (Under 100MB)")
-                
-                # Replace original
-                path.unlink()
-                temp_path.rename(path)
-            else:
-                print("  ⚠️ Still over 100MB (GitHub Limit)")
-                temp_path.unlink() # Discard temp if not useful? 
-                # Actually keep it if it's smaller, but warn user.
-                # If we keep it, we replace.
-                # But let's verify if Brotli actually helps enough.
-                # If Brotli doesn't work, we basically must use LFS.
-                
+            data_utils.create_backup(str(path))
+            data_utils.safe_save_parquet(df, str(path), partition=scheme)
+
+            new_size = dataset_size(path) / (1024 * 1024)
+            print(f"  -> {len(df):,} rows, {new_size:.2f} MB")
         except Exception as e:
             print(f"  ❌ Error: {e}")
 
+
 if __name__ == "__main__":
-    optimize_parquet()
+    parser = argparse.ArgumentParser(description="Rewrite bar files into the partitioned parquet layout")
+    parser.add_argument("--ticker", help="Only this ticker (e.g. NQ1); default all")
+    parser.add_argument("--partition", default="auto", choices=["auto", "year", "month", "none"],
+                        help="Partitioning scheme (auto = year for intraday, single file for daily+)")
+    parser.add_argument("--dry-run", action="store_true", help="List files and target layout only")
+    args = parser.parse_args()
+
+    optimize_parquet(
+        ticker=args.ticker,
+        partition=None if args.partition == "none" else args.partition,
+        dry_run=args.dry_run,
+    )
@@ -0,0 +1,102 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from api.services.indicators import calculate_indicators_arrays
+from api.services.indicator_state import IndicatorSessionStore, StaleBarError
+
+
+# Incremental sessions (api/services/indicator_state.py) must give appended
+# bars the same values as a full recompute over the extended window.
+RTOL = 1e-9
+INDICATORS = ["vwap", "sma_20", "ema_9", "ema_200", "atr_14", "rsi_14", "bbands_20", "macd"]
+
+
+def make_bars(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 15000 + np.cumsum(rng.normal(0, 5, n))
+    return pd.DataFrame({
+        "time": 1733184000 + 60 * np.arange(n),
+        "open": close + rng.normal(0, 2, n),
+        "high": close + rng.uniform(0, 10, n),
+        "low": close - rng.uniform(0, 10, n),
+        "close": close,
+        "volume": rng.integers(1, 500, n).astype(float),
+    })
+
+
+def compare(label, expected, actual):
+    ok = True
+    for key, values in expected.items():
+        values = np.asarray(values, dtype=np.float64)
+        got = np.asarray(actual.get(key, []), dtype=np.float64)
+        if len(got) != len(values) or not np.array_equal(np.isnan(values), np.isnan(got)):
+            print(f"  FAIL {label:<34} {key}: NaN/length mismatch")
+            ok = False
+            continue
+        mask = ~np.isnan(values)
+        scale = np.maximum(np.abs(values[mask]), 1.0)
+        err = float(np.max(np.abs(values[mask] - got[mask]) / scale)) if mask.any() else 0.0
+        if err > RTOL:
+            print(f"  FAIL {label:<34} {key}: max rel err {err:.2e}")
+            ok = False
+    if ok:
+        print(f"  PASS {label}")
+    return ok
+
+
+def check(label, df, start, step):
+    """Prime on df[:start], append the rest `step` bars at a time"""
+    store = IndicatorSessionStore()
+    handle = store.create(INDICATORS, df.iloc[:start])
+    session = store.get(handle)
+    appended = {}
+    for i in range(start, len(df), step):
+        for key, values in session.append(df.iloc[i:i + step]).items():
+            appended.setdefault(key, []).extend(values.tolist())
+    full = calculate_indicators_arrays(df, INDICATORS)
+    return compare(label, {k: v[start:] for k, v in full.items()}, appended)
+
+
+df = make_bars(5_000)
+all_ok = True
+all_ok &= check("prime 4000, append 1 at a time", df, 4000, 1)
+all_ok &= check("prime 4000, append 7 at a time", df, 4000, 7)
+all_ok &= check("prime 5 (inside lookbacks)", df.iloc[:600], 5, 1)
+all_ok &= check("prime 1", df.iloc[:400], 1, 3)
+
+# Forming bar: send the last bar with interim values, then its final values
+store = IndicatorSessionStore()
+session = store.get(store.create(INDICATORS, df.iloc[:3000]))
+forming = df.iloc[3000:3001].copy()
+for close in (15000.0, 14990.0):
+    forming[["close", "high", "low"]] = close
+    session.append(forming)
+values = session.append(df.iloc[3000:3002])
+full = calculate_indicators_arrays(df.iloc[:3002], INDICATORS)
+all_ok &= compare("forming bar replaced", {k: v[3000:] for k, v in full.items()}, values)
+
+try:
+    session.append(df.iloc[10:11])
+    print("  FAIL stale bar accepted")
+    all_ok = False
+except StaleBarError:
+    print("  PASS stale bar rejected")
+
+# Cost per appended bar vs recomputing the window
+big = make_bars(200_000, seed=1)
+session = store.get(store.create(INDICATORS, big.iloc[:-1]))
+t0 = time.perf_counter()
+session.append(big.iloc[-1:])
+t_append = time.perf_counter() - t0
+t0 = time.perf_counter()
+calculate_indicators_arrays(big, INDICATORS)
+t_full = time.perf_counter() - t0
+print(f"\n200k bars: append 1 bar {t_append * 1000:.2f} ms, full recompute {t_full * 1000:.1f} ms")
+
+print("\nALL PASS" if all_ok else "\nFAILURES")
+sys.exit(0 if all_ok else 1)
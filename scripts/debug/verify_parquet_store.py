@@ -0,0 +1,71 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from api.services.parquet_store import write_bars, append_bars
+from api.services.data_loader import _read_history
+
+
+# Bar frames in the layouts the download scripts produce must round-trip
+# through parquet_store (write_bars/append_bars) and load_parquet's reader
+# with the same bars and a plain 'time' column in Unix seconds.
+START = 1704067200  # 2024-01-01 00:00 UTC
+
+
+def make_bars(n, start=START):
+    seconds = start + 60 * np.arange(n)
+    close = 15000 + np.arange(n, dtype=float)
+    return seconds, pd.DataFrame({
+        "open": close, "high": close + 1, "low": close - 1, "close": close,
+        "volume": np.ones(n),
+    })
+
+
+def layouts(n, start=START):
+    seconds, bars = make_bars(n, start)
+    index = pd.DatetimeIndex(pd.to_datetime(seconds, unit="s", utc=True))
+    return seconds, {
+        "time column": bars.assign(time=seconds),
+        "DatetimeIndex named time": bars.set_axis(index.rename("time")),
+        "DatetimeIndex named time + time column": bars.set_axis(index.rename("time")).assign(time=seconds),
+        "DatetimeIndex named datetime (US/Eastern)": bars.set_axis(index.tz_convert("US/Eastern").rename("datetime")),
+    }
+
+
+def check(label, path, expected_seconds):
+    try:
+        df = _read_history(Path(path))
+    except Exception as e:
+        print(f"  FAIL {label:<48} read: {e}")
+        return False
+    got = df["time"].to_numpy()
+    if len(got) != len(expected_seconds) or not np.array_equal(got, expected_seconds):
+        print(f"  FAIL {label:<48} {len(got)} bars, expected {len(expected_seconds)}")
+        return False
+    print(f"  PASS {label}")
+    return True
+
+
+all_ok = True
+seconds, frames = layouts(500)
+new_seconds, new_frames = layouts(100, start=START + 60 * 450)  # 50 overlapping bars
+with tempfile.TemporaryDirectory() as tmp:
+    for k, (label, frame) in enumerate(frames.items()):
+        for partition in (None, "year"):
+            path = os.path.join(tmp, f"layout{k}_{partition}_1m.parquet")
+            try:
+                write_bars(frame, path, partition=partition)
+                all_ok &= check(f"write {label} ({partition})", path, seconds)
+                append_bars(new_frames[label], path, partition=partition)
+                all_ok &= check(f"append {label} ({partition})", path, np.union1d(seconds, new_seconds))
+            except Exception as e:
+                print(f"  FAIL {label} ({partition}): {e}")
+                all_ok = False
+
+print("\nALL PASS" if all_ok else "\nFAILURES")
+sys.exit(0 if all_ok else 1)
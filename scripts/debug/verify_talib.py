@@ -1,11 +1,104 @@
-import talib
+import os
+import sys
+
 import numpy as np
 import pandas as pd
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from api.services import ta_fallback
+
 try:
     print("Attempting to import talib...")
+    import talib
     data = np.random.random(100)
     sma = talib.SMA(data, timeperiod=14)
     print("SUCCESS: TA-Lib imported and calculated SMA.")
 except Exception as e:
     print(f"FAILURE: {e}")
+    print("Parity check against the NumPy fallback needs TA-Lib installed.")
+    sys.exit(1)
+
+
+# Parity: api/services/ta_fallback.py must match TA-Lib (NaN positions exact,
+# values to a relative tolerance) for every indicator the API serves.
+RTOL = 1e-9
+
+
+def make_bars(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 15000 + np.cumsum(rng.normal(0, 5, n))
+    high = close + rng.uniform(0, 10, n)
+    low = close - rng.uniform(0, 10, n)
+    # Flat stretch exercises the zero-variance / zero-movement branches
+    close[n // 2:n // 2 + 60] = close[n // 2]
+    high[n // 2:n // 2 + 60] = close[n // 2]
+    low[n // 2:n // 2 + 60] = close[n // 2]
+    return high, low, close
+
+
+def compare(name, expected, actual, atol=0.0):
+    expected = np.asarray(expected, dtype=np.float64)
+    actual = np.asarray(actual, dtype=np.float64)
+    same_nan = np.array_equal(np.isnan(expected), np.isnan(actual))
+    mask = ~np.isnan(expected) & ~np.isnan(actual)
+    scale = np.maximum(np.abs(expected[mask]), 1.0)
+    diff = np.maximum(np.abs(expected[mask] - actual[mask]) - atol, 0.0)
+    err = float(np.max(diff / scale)) if mask.any() else 0.0
+    ok = same_nan and err <= RTOL
+    print(f"  {'PASS' if ok else 'FAIL'} {name:<28} max rel err {err:.2e}{'' if same_nan else '  (NaN mismatch)'}")
+    return ok
+
+
+def run_suite(label, high, low, close):
+    print(f"\n[{label}] {len(close):,} bars, recursive filter: {'scipy' if ta_fallback.lfilter else 'numpy'}")
+    ok = True
+    for p in (1, 2, 5, 9, 20, 50, 200):
+        ok &= compare(f"SMA({p})", talib.SMA(close, timeperiod=p), ta_fallback.SMA(close, timeperiod=p))
+        ok &= compare(f"EMA({p})", talib.EMA(close, timeperiod=p), ta_fallback.EMA(close, timeperiod=p))
+        ok &= compare(f"ATR({p})", talib.ATR(high, low, close, timeperiod=p), ta_fallback.ATR(high, low, close, timeperiod=p))
+        if p < 2:
+            continue
+        ok &= compare(f"RSI({p})", talib.RSI(close, timeperiod=p), ta_fallback.RSI(close, timeperiod=p))
+        # TA-Lib flushes variances below 1e-8 to zero, but computes them from
+        # running sums of x^2, whose rounding noise is itself ~1e-8 at futures
+        # prices; the exact window variance can land on the other side of the
+        # cut-off, so bands may differ by up to nbdev * sqrt(1e-8)
+        for i, band in enumerate(("upper", "mid", "lower")):
+            ok &= compare(
+                f"BBANDS({p}).{band}",
+                talib.BBANDS(close, timeperiod=p, nbdevup=2.0, nbdevdn=2.0, matype=0)[i],
+                ta_fallback.BBANDS(close, timeperiod=p, nbdevup=2.0, nbdevdn=2.0, matype=0)[i],
+                atol=2.0 * 1e-4,
+            )
+    for fast, slow, signal in ((12, 26, 9), (5, 35, 5), (26, 12, 9)):
+        for i, part in enumerate(("line", "signal", "hist")):
+            ok &= compare(
+                f"MACD({fast},{slow},{signal}).{part}",
+                talib.MACD(close, fastperiod=fast, slowperiod=slow, signalperiod=signal)[i],
+                ta_fallback.MACD(close, fastperiod=fast, slowperiod=slow, signalperiod=signal)[i],
+            )
+    # Inputs shorter than the lookback
+    short = close[:10]
+    ok &= compare("EMA(20) short input", talib.EMA(short, timeperiod=20), ta_fallback.EMA(short, timeperiod=20))
+    ok &= compare("MACD short input", talib.MACD(short)[0], ta_fallback.MACD(short)[0])
+    return ok
+
+
+suites = [("random walk", *make_bars(200_000))]
+parquet = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "NQ1_1m.parquet")
+if os.path.exists(parquet):
+    df = pd.read_parquet(parquet, columns=["high", "low", "close"])
+    suites.append(("NQ1 1m", df["high"].to_numpy(float), df["low"].to_numpy(float), df["close"].to_numpy(float)))
+
+all_ok = True
+scipy_lfilter = ta_fallback.lfilter
+for label, high, low, close in suites:
+    all_ok &= run_suite(label, high, low, close)
+    if scipy_lfilter is not None:
+        # Also check the pure NumPy recurrence
+        ta_fallback.lfilter = None
+        all_ok &= run_suite(label, high, low, close)
+        ta_fallback.lfilter = scipy_lfilter
+
+print("\nALL PASS" if all_ok else "\nPARITY FAILURES")
+sys.exit(0 if all_ok else 1)
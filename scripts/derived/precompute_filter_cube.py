@@ -0,0 +1,72 @@
+import time
+import sys
+import os
+from pathlib import Path
+
+# Setup path so the API services import from the project root
+sys.path.append(os.getcwd())
+
+from api.services.profiler_service import ProfilerService
+from api.services.data_loader import DATA_DIR
+from api.services import filter_cube
+
+
+def precompute_filter_cube(ticker="NQ1", bucket_minutes=5):
+    """
+    Build data/{ticker}_filter_cube.arrow: filtered stats and price model of
+    every target session x filter combination (see api/services/filter_cube.py).
+    Run after precompute_profiler (the cube is tied to the profiler JSON).
+    """
+    ticker = ProfilerService._normalize_ticker(ticker)
+    print(f"Building filter cube for {ticker} ({bucket_minutes}m buckets)...")
+    start = time.time()
+
+    history = ProfilerService._sessions(ticker, days=10000)
+    if isinstance(history, dict):
+        print(f"Error: {history['error']}")
+        return
+    bitmap = ProfilerService._session_bitmap(ticker, history)
+
+    combos = list(filter_cube.combinations())
+    rows = []
+    models = {}  # (target, matched dates) -> model; many combinations match the same dates
+    for target in filter_cube.TARGET_SESSIONS:
+        for filters, broken_filters in combos:
+            mask = bitmap.match(target, filters, broken_filters)
+            model_key = (target, mask.tobytes())
+            if model_key not in models:
+                model = ProfilerService._filtered_model(ticker, history, bitmap, mask, target, bucket_minutes)
+                if "error" in model:
+                    print(f"Error: {model['error']}")
+                    return
+                models[model_key] = model
+            rows.append({
+                "key": filter_cube.cube_key(target, filters, broken_filters),
+                "mask": mask,
+                "stats": bitmap.target_stats(mask, target),
+                "model": models[model_key],
+            })
+        print(f"  {target}: {len(combos)} combinations ({time.time() - start:.1f}s)")
+
+    output_file = filter_cube.cube_path(DATA_DIR, ticker)
+    filter_cube.write_cube(
+        output_file, ProfilerService._sessions_fingerprint(ticker), bucket_minutes, len(bitmap.dates), rows
+    )
+    size_mb = output_file.stat().st_size / 1024 / 1024
+    print(f"Saved {len(rows)} combinations ({len(models)} distinct paths, {size_mb:.1f} MB) "
+          f"to {output_file} in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    tickers = ["NQ1", "ES1", "GC1", "CL1", "RTY1", "YM1"]
+
+    if len(sys.argv) > 1:
+        target = sys.argv[1]
+        bucket = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+        if target.upper() == "ALL":
+            for t in tickers:
+                precompute_filter_cube(t, bucket)
+        else:
+            precompute_filter_cube(target, bucket)
+    else:
+        precompute_filter_cube("NQ1")
@@ -6,6 +6,10 @@ For each day, computes:
 - P12 levels (overnight 18:00-06:00 High/Low/Mid)
 - Time-based opens (Daily 18:00, Midnight 00:00, 07:30)
 - First touch time for each level during the day
+
+save_level_touches writes the JSON and, next to it, the columnar
+{ticker}_level_touches.arrow (touch minutes + first hit per session, see
+api/services/level_touches.py) that the API memory-maps.
 """
 
 import pandas as pd
@@ -57,19 +61,15 @@ def compute_level_touches(ticker: str) -> dict:
     if 'time' in df.columns:
         df = df.drop(columns=['time'])
     
-    # Add trading_date column (day that starts at 18:00)
-    def get_trading_date(ts):
-        if ts.time() >= time(18, 0):
-            return (ts + timedelta(days=1)).date()
-        else:
-            return ts.date()
-    
-    df['trading_date'] = df.index.map(get_trading_date)
+    # Trading days (starting at 18:00) as row offsets from the session index
+    from api.services import session_index
+    index = session_index.for_ticker(ticker, df.index)
     
     # Group by trading date
     daily_data = {}
     
-    for trading_date, group in df.groupby('trading_date'):
+    for trading_date, lo, hi in zip(session_index.date_strings(index.dates), index.day_lo, index.day_hi):
+        group = df.iloc[lo:hi]
         if len(group) < 100:  # Skip days with insufficient data
             continue
         
@@ -95,7 +95,7 @@ def compute_level_touches(ticker: str) -> dict:
         # 08:00 open (NY1 Open)
         open_0800 = get_price_at_time(time(8, 0), group)
         
-        daily_data[str(trading_date)] = {
+        daily_data[trading_date] = {
             'high': float(group['high'].max()),
             'low': float(group['low'].min()),
             'mid': float((group['high'].max() + group['low'].min()) / 2),
@@ -376,6 +376,23 @@ def compute_level_touches(ticker: str) -> dict:
     return results
 
 
+def save_level_touches(ticker: str, results: dict, data_dir: Path = DATA_DIR) -> Path:
+    """Write {ticker}_level_touches.json and its precomputed .arrow companion"""
+    from api.services import level_touches
+    from api.services.bar_store import file_fingerprint
+
+    output_path = Path(data_dir) / f'{ticker}_level_touches.json'
+    with open(output_path, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    # Tied to the JSON just written: the API ignores it once the JSON changes
+    table = level_touches.build_table(results)
+    level_touches.write_table(
+        level_touches.touches_path(data_dir, ticker), file_fingerprint(output_path), table
+    )
+    return output_path
+
+
 def main():
     ticker = 'NQ1'
     print(f"Computing level touch data for {ticker}...")
@@ -418,10 +435,8 @@ def main():
     print(f"  P12 Mid:  {100*p12m_hits/p12_total:.1f}% ({p12m_hits}/{p12_total})")
     print(f"  P12 Low:  {100*p12l_hits/p12_total:.1f}% ({p12l_hits}/{p12_total})")
     
-    # Save to JSON
-    output_path = DATA_DIR / f'{ticker}_level_touches.json'
-    with open(output_path, 'w') as f:
-        json.dump(results, f, indent=2)
+    # Save to JSON (+ Arrow first-hit table)
+    output_path = save_level_touches(ticker, results)
     print(f"\nSaved to {output_path}")
 
 
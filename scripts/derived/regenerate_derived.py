@@ -13,6 +13,7 @@ sys.path.append(os.getcwd())
 from scripts.utils import data_utils
 from scripts.market_data import update_intraday
 from scripts.derived import precompute_profiler as profiler
+from scripts.derived import precompute_filter_cube as filter_cube
 from scripts.derived import precompute_level_touches as level_touches
 from scripts.derived import precompute_range_dist as range_dist
 from scripts.derived import precompute_hod_lod as hod_lod
@@ -104,14 +105,18 @@ def regenerate_all(ticker="ES1"):
     print("  - Profiler Stats (Recomputing)...")
     profiler.precompute_ticker(ticker)
     
+    print("  - Profiler Filter Cube...")
+    try:
+        filter_cube.precompute_filter_cube(ticker)
+    except Exception as e:
+        print(f"    Error in Filter Cube: {e}")
+    
     print("  - Level Touches...")
     if best_tf == "1m":
         try:
             results = level_touches.compute_level_touches(ticker)
-            output_path = Path("data") / f'{ticker}_level_touches.json'
-            with open(output_path, 'w') as f:
-                json.dump(results, f, indent=2)
-            print(f"    Saved {output_path}")
+            output_path = level_touches.save_level_touches(ticker, results, Path("data"))
+            print(f"    Saved {output_path} (+ .arrow)")
         except Exception as e:
             print(f"    Error in Level Touches: {e}")
     else:
@@ -130,8 +130,11 @@ def update_ticker_intraday(ticker_key, interval, period):
     else:
         combined = new_df
 
-    # 4. Save
-    data_utils.safe_save_parquet(combined, filepath)
+    # 4. Save (only the partitions that received new bars are rewritten)
+    if not old_df.empty:
+        data_utils.safe_append_parquet(new_df, filepath)
+    else:
+        data_utils.safe_save_parquet(combined, filepath)
     print(f"Update complete. New count: {len(combined)} rows.")
 
 
@@ -1,21 +1,29 @@
 import os
+import sys
 import shutil
 import glob
 from datetime import datetime
 import pandas as pd
 
 # Go up 3 levels: scripts/utils/data_utils.py -> scripts/utils -> scripts -> root
-DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data"))
+PROJECT_ROOT = os.path.abspath(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+DATA_DIR = os.path.join(PROJECT_ROOT, "data")
 BACKUP_DIR = os.path.join(DATA_DIR, "backup")
 
+# Bar files are written through the API's parquet store (canonical layout)
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+from api.services.parquet_store import write_bars, append_bars, stored_partitioning
+
 def ensure_backup_dir():
     if not os.path.exists(BACKUP_DIR):
         os.makedirs(BACKUP_DIR)
 
 def create_backup(filepath):
     """
-    Creates a timestamped backup of the given file in data/backup/
-    Returns the path to the backup file.
+    Creates a timestamped backup of the given file (or partitioned
+    dataset directory) in data/backup/
+    Returns the path to the backup.
     """
     if not os.path.exists(filepath):
         print(f"Warning: File {filepath} does not exist, skipping backup.")
@@ -29,37 +37,43 @@ def create_backup(filepath):
     backup_path = os.path.join(BACKUP_DIR, backup_name)
     
     try:
-        shutil.copy2(filepath, backup_path)
+        if os.path.isdir(filepath):
+            shutil.copytree(filepath, backup_path)
+        else:
+            shutil.copy2(filepath, backup_path)
         print(f"✅ Backup created: {backup_name}")
         return backup_path
     except Exception as e:
         print(f"❌ Backup failed for {filename}: {e}")
         raise e
 
-def safe_save_parquet(df, filepath):
+def safe_save_parquet(df, filepath, partition=None):
     """
-    Safely saves a DataFrame to parquet:
-    1. Writes to .tmp file
-    2. Verifies file exists
-    3. Renames to target filepath (atomic-ish on POSIX, replace on Windows)
+    Safely saves a DataFrame of bars to parquet.
+    Delegates to parquet_store.write_bars, which writes to a hidden temp file
+    and renames it into place, so readers never see a half-written file.
+    Writes a single file unless a partition scheme ("year", "month", "auto")
+    is passed (see optimize_parquet_storage.py).
     """
-    tmp_path = filepath + ".tmp"
     try:
-        # Write to temp
-        df.to_parquet(tmp_path)
-        
-        # Verify
-        if not os.path.exists(tmp_path):
-            raise Exception("Temp file write failed")
-            
-        # Rename (Replace)
-        if os.path.exists(filepath):
-            os.remove(filepath)
-        os.rename(tmp_path, filepath)
+        write_bars(df, filepath, partition=partition)
         print(f"✅ Successfully saved: {os.path.basename(filepath)}")
-        
     except Exception as e:
         print(f"❌ Save failed: {e}")
-        if os.path.exists(tmp_path):
-            os.remove(tmp_path)
+        raise e
+
+def safe_append_parquet(df, filepath, partition=None):
+    """
+    Upserts new bars into an existing parquet dataset (new bars win over
+    existing bars with the same time).
+    A single file is rewritten in full; a partitioned dataset keeps its
+    layout and only the partitions touched by df are rewritten.
+    """
+    if partition is None:
+        partition = stored_partitioning(filepath)
+    try:
+        written = append_bars(df, filepath, partition=partition)
+        print(f"✅ Appended {len(df):,} rows to {os.path.basename(filepath)} ({written} partition(s) rewritten)")
+    except Exception as e:
+        print(f"❌ Append failed: {e}")
         raise e